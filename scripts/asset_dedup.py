@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复资源检测
+找出构建站点中字节完全相同的资源，以及共享大段代码的相似资源
+
+- 完全重复：按内容 SHA-256 分组（调用方可先按大小筛选，只有大小相同的文件才需要摘要）
+- 近似重复：内容定义分块（Gear 滚动哈希），按块哈希建立倒排索引，
+  统计每对文件共享的字节数，避免两两比较
+"""
+
+import hashlib
+import random
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# 分块参数：平均约 2KB 一块，块边界只取决于内容，插入/删除只影响附近的块。
+# 判定取哈希的高位：Gear 哈希的第 k 位只受最近 k+1 个字节影响，
+# 高位覆盖 32 字节窗口，低位在重复性强的代码里几乎不会命中
+MIN_CHUNK = 256
+MAX_CHUNK = 16 * 1024
+CHUNK_MASK = ((1 << 11) - 1) << 21
+
+# 固定种子的 Gear 表，保证不同运行、不同进程结果一致
+_rng = random.Random(0x5A3F)
+GEAR = [_rng.getrandbits(32) for _ in range(256)]
+
+# 近似重复判定：共享字节数和占较小文件的比例都达到阈值
+MIN_SHARED_BYTES = 4 * 1024
+MIN_SIMILARITY = 0.3
+
+# 出现在过多文件中的块（如通用许可证头）不参与配对，避免组合爆炸
+MAX_CHUNK_FANOUT = 50
+
+
+def content_chunks(data: bytes) -> List[Tuple[str, int]]:
+    """内容定义分块，返回 [(块哈希, 块长度)]"""
+    chunks = []
+    start = 0
+    h = 0
+    n = len(data)
+    i = 0
+    gear = GEAR
+    while i < n:
+        h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+        i += 1
+        length = i - start
+        if (length >= MIN_CHUNK and (h & CHUNK_MASK) == 0) or length >= MAX_CHUNK:
+            chunks.append((hashlib.blake2b(data[start:i], digest_size=8).hexdigest(), length))
+            start = i
+            h = 0
+    if start < n:
+        chunks.append((hashlib.blake2b(data[start:], digest_size=8).hexdigest(), n - start))
+    return chunks
+
+
+def fingerprint_file(file_path: Path, rel_path: str, chunked: bool = True) -> Dict:
+    """计算文件的内容摘要和（可选）分块指纹"""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return {
+        'path': rel_path,
+        'size': len(data),
+        'digest': hashlib.sha256(data).hexdigest(),
+        'chunks': content_chunks(data) if chunked else []
+    }
+
+
+def find_exact_duplicates(fingerprints: List[Dict]) -> List[Dict]:
+    """
+    按内容摘要分组，返回包含两个及以上文件的组
+
+    wasted_bytes 为除保留一份外其余副本的总大小。
+    """
+    groups = defaultdict(list)
+    for fp in fingerprints:
+        groups[fp['digest']].append(fp)
+
+    duplicates = []
+    for digest, members in groups.items():
+        if len(members) < 2:
+            continue
+        size = members[0]['size']
+        duplicates.append({
+            'digest': digest,
+            'size': size,
+            'count': len(members),
+            'wasted_bytes': size * (len(members) - 1),
+            'paths': sorted(m['path'] for m in members)
+        })
+    return sorted(duplicates, key=lambda d: (-d['wasted_bytes'], d['paths']))
+
+
+def find_near_duplicates(fingerprints: List[Dict]) -> List[Dict]:
+    """
+    找出共享大段内容但不完全相同的文件对
+
+    每个文件的块先去重，再通过块哈希倒排索引累加每对文件共享的字节数。
+    """
+    index = defaultdict(list)
+    for i, fp in enumerate(fingerprints):
+        for chunk_hash, length in dict(fp['chunks']).items():
+            index[chunk_hash].append((i, length))
+
+    shared = defaultdict(int)
+    for postings in index.values():
+        if len(postings) < 2 or len(postings) > MAX_CHUNK_FANOUT:
+            continue
+        for a in range(len(postings)):
+            for b in range(a + 1, len(postings)):
+                i, length = postings[a]
+                j = postings[b][0]
+                if fingerprints[i]['digest'] != fingerprints[j]['digest']:
+                    shared[(i, j)] += length
+
+    near = []
+    for (i, j), shared_bytes in shared.items():
+        a, b = fingerprints[i], fingerprints[j]
+        similarity = shared_bytes / min(a['size'], b['size'])
+        if shared_bytes >= MIN_SHARED_BYTES and similarity >= MIN_SIMILARITY:
+            # 路径和大小按同一顺序排列
+            pair = sorted([a, b], key=lambda fp: fp['path'])
+            near.append({
+                'paths': [fp['path'] for fp in pair],
+                'sizes': [fp['size'] for fp in pair],
+                'shared_bytes': shared_bytes,
+                'similarity': similarity
+            })
+    return sorted(near, key=lambda n: (-n['shared_bytes'], n['paths']))
@@ -95,6 +95,12 @@ if errorlevel 1 (
 echo [INFO] 构建成功！
 echo [INFO] 输出目录: site\
 
+REM 把 img 标签改写为响应式 picture / srcset（变体由 optimize-images.py 生成）
+python scripts\responsive-images.py
+if errorlevel 1 (
+    echo [WARNING] 响应式图片改写失败，页面保持原始图片标签
+)
+
 REM 显示构建统计
 if exist "site" (
     for /f %%a in ('dir /s /b site ^| find /c /v ""') do set FILE_COUNT=%%a
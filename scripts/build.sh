@@ -103,6 +103,11 @@ build() {
         print_info "构建成功！"
         print_info "输出目录: site/"
         
+        # 把 <img> 改写为响应式 <picture> / srcset（变体由 optimize-images.py 生成）
+        if ! python3 scripts/responsive-images.py; then
+            print_warning "响应式图片改写失败，页面保持原始 <img>"
+        fi
+        
         # 显示构建统计
         if [ -d "site" ]; then
             FILE_COUNT=$(find site -type f | wc -l)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩编码注册表
+test-performance.py（传输大小评估）、measure-load-time.py（加载时间模型）和
+throttled_server.py / fetch_client.py（实测）共用
+
+编码名形如 gzip-6 / br-11，未安装可选压缩库时对应编码不可用。
+"""
+
+import zlib
+from pathlib import Path
+from typing import Callable, Dict
+
+# 可选压缩库：未安装时对应编码不参与评估
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 流式读取的块大小：峰值内存与文件大小无关
+CHUNK_SIZE = 256 * 1024
+
+
+class BrotliStream:
+    """把 brotli.Compressor 适配为 compress()/flush() 流式接口"""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+# 编码名 -> 流式压缩器工厂（返回对象需提供 compress()/flush()）
+# wbits=31 生成 gzip 格式（头部 + 尾部与 gzip.compress 一致）
+COMPRESSORS: Dict[str, Callable] = {
+    'gzip-6': lambda: zlib.compressobj(6, zlib.DEFLATED, 31),  # 服务器实时压缩的常用级别
+    'gzip-9': lambda: zlib.compressobj(9, zlib.DEFLATED, 31),
+}
+if BROTLI_AVAILABLE:
+    COMPRESSORS['br-11'] = lambda: BrotliStream(11)  # CDN 预压缩静态资源
+if ZSTD_AVAILABLE:
+    COMPRESSORS['zstd-3'] = lambda: zstandard.ZstdCompressor(level=3).compressobj()
+
+# 编码名 -> HTTP Content-Encoding
+CONTENT_ENCODINGS = {'gzip-6': 'gzip', 'gzip-9': 'gzip', 'br-11': 'br', 'zstd-3': 'zstd'}
+
+# 压缩率测试和 gzip_size 字段使用的基准编码
+BASELINE_ENCODING = 'gzip-9'
+
+# 不压缩传输（identity）
+IDENTITY = 'identity'
+
+# 服务器会压缩的文本类型；图片、字体等已压缩格式按原始大小传输
+COMPRESSIBLE_SUFFIXES = {'.html', '.css', '.js', '.mjs', '.json', '.svg', '.xml', '.txt', '.map'}
+
+
+def is_compressible(path: str) -> bool:
+    """按扩展名判断服务器是否会压缩该文件"""
+    return Path(path).suffix.lower() in COMPRESSIBLE_SUFFIXES
+
+
+def compressed_size(data: bytes, encoding: str) -> int:
+    """内存中内容在指定编码下的大小（identity 为原始大小）"""
+    if encoding == IDENTITY:
+        return len(data)
+    compressor = COMPRESSORS[encoding]()
+    return len(compressor.compress(data)) + len(compressor.flush())
+
+
+def file_compressed_size(file_path: Path, encoding: str) -> int:
+    """分块读取文件，返回指定编码下的大小"""
+    if encoding == IDENTITY:
+        return file_path.stat().st_size
+    compressor = COMPRESSORS[encoding]()
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            size += len(compressor.compress(chunk))
+    return size + len(compressor.flush())
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """压缩内存中的内容（identity 原样返回）"""
+    if encoding == IDENTITY:
+        return data
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+class _BrotliDecoder:
+    """把 brotli.Decompressor 适配为 decompress() 流式接口"""
+
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        return self._decompressor.process(chunk)
+
+
+class _IdentityDecoder:
+    @staticmethod
+    def decompress(chunk: bytes) -> bytes:
+        return chunk
+
+
+def decompressor(content_encoding: str):
+    """按 HTTP Content-Encoding 返回流式解压器（提供 decompress()）"""
+    if content_encoding in ('', IDENTITY):
+        return _IdentityDecoder()
+    if content_encoding == 'gzip':
+        return zlib.decompressobj(31)
+    if content_encoding == 'br' and BROTLI_AVAILABLE:
+        return _BrotliDecoder()
+    if content_encoding == 'zstd' and ZSTD_AVAILABLE:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"不支持的 Content-Encoding: {content_encoding}")
@@ -83,10 +83,14 @@ deploy_github_pages() {
         exit 1
     fi
     
-    # 使用 mkdocs gh-deploy 命令
+    # 构建网站（包括构建后的响应式图片改写；mkdocs gh-deploy 会重新构建并跳过这一步）
+    print_info "构建网站..."
+    ./scripts/build.sh build
+    
+    # 把 site/ 推送到 gh-pages 分支（ghp-import 随 MkDocs 安装，参数与 mkdocs gh-deploy 相同）
     print_info "开始部署..."
     
-    if mkdocs gh-deploy --clean --message "Deploy: $(date '+%Y-%m-%d %H:%M:%S')"; then
+    if ghp-import --no-jekyll --push --force --message "Deploy: $(date '+%Y-%m-%d %H:%M:%S')" site; then
         print_info "部署成功！"
         print_info "网站将在几分钟后更新"
         
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器式页面抓取客户端
+用 asyncio 抓取一个页面及其子资源并记录真实的时间，供 measure-real-load.py
+与 network_sim 的估算比较
+
+- 每个源最多 max_connections 个 HTTP/1.1 keep-alive 连接（浏览器默认 6 个），
+  连接空闲时按优先级和发现顺序发送下一个请求
+- HTML 边下载边解析（类似预加载扫描器），样式表下载完成后解析其中的 @import、字体和图片
+- 资源提取、阻塞分类和优先级与 measure-load-time.py 相同（resource_graph）
+- 外部资源不抓取（离线），记录在 skipped 中
+"""
+
+import asyncio
+import codecs
+import heapq
+import posixpath
+from typing import Callable, Dict, List, Optional, Tuple
+
+from compression import decompressor
+from resource_graph import (
+    RENDER_BLOCKING, HtmlReferenceExtractor, Reference, classify, extract_css_references, is_external,
+    request_priority, resolve_url
+)
+
+# 浏览器发送的 Accept-Encoding
+ACCEPT_ENCODING = 'gzip, deflate, br, zstd'
+
+READ_SIZE = 64 * 1024
+
+
+class _Request:
+    """一个子资源请求的状态和计时"""
+    __slots__ = ('path', 'kind', 'offset', 'parent', 'cls', 'priority', 'seq', 'on_chunk', 'on_done',
+                 'start', 'ttfb', 'end', 'size', 'status', 'encoding', 'error')
+
+    def __init__(self, path: str, kind: str, offset: int, parent: Optional[str], cls: str,
+                 priority: int, seq: int):
+        self.path = path
+        self.kind = kind
+        self.offset = offset
+        self.parent = parent
+        self.cls = cls
+        self.priority = priority
+        self.seq = seq
+        self.on_chunk: Optional[Callable[[bytes, int], None]] = None
+        self.on_done: Optional[Callable[[bytes], None]] = None
+        self.start = self.ttfb = self.end = 0.0
+        self.size = 0
+        self.status = 0
+        self.encoding = ''
+        self.error = ''
+
+
+class FetchClient:
+    """
+    抓取 host:port 上的页面（路径相对站点根目录）
+
+    每次 fetch_page() 使用新的连接（冷启动，与 network_sim 的单页模拟对应）。
+    """
+
+    def __init__(self, host: str, port: int, max_connections: int = 6,
+                 accept_encoding: str = ACCEPT_ENCODING):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.accept_encoding = accept_encoding
+
+    async def fetch_page(self, page_path: str) -> Dict:
+        """
+        抓取页面及其子资源
+
+        返回 {'waterfall': [...], 'skipped': [外部资源]}。瀑布图每个请求一条
+        {path, kind, size, offset, blocking, parent, priority, origin, start, ttfb, end, status, encoding, error}，
+        在 network_sim.simulate_page() 的输出格式上增加了优先级、状态码和编码（size 为实际传输字节，时间从请求 HTML 开始计），
+        可直接交给 network_sim.paint_times()。连接失败、被重置或响应不完整的请求 status 为 0，
+        error 为原因；被取消（如调用方超时）时关闭所有连接。
+        """
+        return await _PageLoad(self, page_path).run()
+
+
+class _PageLoad:
+    """单次页面加载：连接池、请求队列和资源发现"""
+
+    def __init__(self, client: FetchClient, page_path: str):
+        self.client = client
+        self.page_path = page_path
+        self.base_dir = posixpath.dirname(page_path)
+        self.loop = asyncio.get_running_loop()
+        self.t0 = 0.0
+        self.requests: List[_Request] = []
+        self.pending: List[Tuple[int, int, _Request]] = []   # 堆：(优先级, 发现顺序, 请求)
+        self.idle: List = []
+        self.open_connections = 0
+        self.outstanding = 0
+        self.done = asyncio.Event()
+        self.classes: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.tasks = set()
+
+    async def run(self) -> Dict:
+        self.t0 = self.loop.time()
+        html = self._add(self.page_path, 'html', 0, None, RENDER_BLOCKING, priority=0)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        extractor = HtmlReferenceExtractor()
+        state = {'stream': None}
+
+        def on_html_chunk(chunk: bytes, received: int):
+            # 每块只解析新到达的文本（增量提取），不重复扫描已收到的部分
+            if state['stream'] is None:
+                state['stream'] = decompressor(html.encoding)
+            extractor.feed(decoder.decode(state['stream'].decompress(chunk)))
+            self._request_references(extractor.take(), received)
+
+        def on_html_done(body: bytes):
+            extractor.feed(decoder.decode(b'', final=True))
+            extractor.close()
+            self._request_references(extractor.take(), html.size)
+
+        html.on_chunk = on_html_chunk
+        html.on_done = on_html_done
+
+        try:
+            await self.done.wait()
+        finally:
+            # 正常结束时只剩已完成的任务；被取消时中止仍在进行的请求（由其关闭各自的连接）
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            for _, writer in self.idle:
+                writer.close()
+            await asyncio.gather(*(writer.wait_closed() for _, writer in self.idle), return_exceptions=True)
+        return {
+            'waterfall': [
+                {
+                    'path': r.path,
+                    'kind': r.kind,
+                    'size': r.size,
+                    'offset': r.offset,
+                    'blocking': r.cls == RENDER_BLOCKING,
+                    'parent': r.parent,
+                    'priority': r.priority,
+                    'origin': '',
+                    'start': r.start,
+                    'ttfb': r.ttfb,
+                    'end': r.end,
+                    'status': r.status,
+                    'encoding': r.encoding,
+                    'error': r.error
+                }
+                for r in self.requests
+            ],
+            'skipped': self.skipped
+        }
+
+    def _request_references(self, references: List[Reference], received: int):
+        """发送 HTML 中新发现的引用（received 为发现时已收到的字节数）"""
+        for ref in references:
+            path = resolve_url(ref.url, self.base_dir)
+            if path in self.classes or path in self.skipped:
+                continue
+            if is_external(path):
+                self.skipped.append(path)
+                continue
+            cls = classify(ref.kind, ref.attrs, ref.in_head)
+            self._add(path, ref.kind, received, None, cls)
+
+    def _scan_css(self, request: _Request, body: bytes):
+        """样式表下载完成：发送其中引用的样式表、字体和图片"""
+        css = decompressor(request.encoding).decompress(body).decode('utf-8', errors='replace')
+        base_dir = posixpath.dirname(request.path)
+        for ref in extract_css_references(css):
+            path = resolve_url(ref.url, base_dir)
+            if path in self.classes or path in self.skipped:
+                continue
+            if is_external(path):
+                self.skipped.append(path)
+                continue
+            cls = classify(ref.kind, ref.attrs, False, request.cls)
+            self._add(path, ref.kind, request.offset, request.path, cls)
+
+    def _add(self, path: str, kind: str, offset: int, parent: Optional[str], cls: str,
+             priority: Optional[int] = None) -> _Request:
+        self.classes[path] = cls
+        if priority is None:
+            priority = request_priority(kind, cls)
+        request = _Request(path, kind, offset, parent, cls, priority, len(self.requests))
+        if kind == 'css':
+            request.on_done = lambda body, r=request: self._scan_css(r, body)
+        self.requests.append(request)
+        heapq.heappush(self.pending, (priority, request.seq, request))
+        self.outstanding += 1
+        self._pump()
+        return request
+
+    def _pump(self):
+        """有空闲连接（或还能新建连接）时，按优先级和发现顺序发送请求"""
+        while self.pending and (self.idle or self.open_connections < self.client.max_connections):
+            request = heapq.heappop(self.pending)[2]
+            conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                self.open_connections += 1
+            task = asyncio.ensure_future(self._fetch(request, conn))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _fetch(self, request: _Request, conn):
+        request.start = self.loop.time() - self.t0
+        writer = conn[1] if conn is not None else None
+        chunks = []
+        released = False   # 连接已放回空闲池（之后的失败与连接无关）
+        cancelled = False
+        try:
+            if conn is None:
+                conn = await asyncio.open_connection(self.client.host, self.client.port)
+            reader, writer = conn
+            writer.write((f'GET /{request.path} HTTP/1.1\r\n'
+                          f'Host: {self.client.host}:{self.client.port}\r\n'
+                          f'Accept-Encoding: {self.client.accept_encoding}\r\n'
+                          f'Connection: keep-alive\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            head = await reader.readuntil(b'\r\n\r\n')
+            request.ttfb = self.loop.time() - self.t0
+            lines = head.decode('latin-1').split('\r\n')
+            status = int(lines[0].split()[1])
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            request.status = status
+            request.encoding = headers.get('content-encoding', '')
+
+            length = int(headers.get('content-length', 0))
+            while request.size < length:
+                chunk = await reader.read(min(READ_SIZE, length - request.size))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b''.join(chunks), length)
+                request.size += len(chunk)
+                chunks.append(chunk)
+                if request.on_chunk is not None and request.status == 200:
+                    request.on_chunk(chunk, request.size)
+            request.end = self.loop.time() - self.t0
+
+            self.idle.append(conn)
+            released = True
+            if request.on_done is not None and request.status == 200:
+                request.on_done(b''.join(chunks))
+        except asyncio.CancelledError:
+            cancelled = True
+            if writer is not None and not released:
+                writer.close()
+            raise
+        except Exception as e:
+            # 连接被拒绝或重置、响应不完整或无法解析、解压或解析失败：记为失败请求
+            if not released:
+                request.end = self.loop.time() - self.t0
+                if writer is not None:
+                    writer.close()
+                self.open_connections -= 1
+            request.status = 0
+            request.error = f'{type(e).__name__}: {e}'
+        finally:
+            # 无论成败都要计入，否则 run() 不会结束；被取消时 run() 正在收尾，不再调度新请求
+            if not cancelled:
+                self._finish()
+
+    def _finish(self):
+        """一个请求结束（成功或失败）：发送排队的请求，全部结束时唤醒 run()"""
+        self.outstanding -= 1
+        self._pump()
+        if self.outstanding == 0:
+            self.done.set()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应式图片变体
+optimize-images.py 为每张位图按宽度阶梯生成 WebP / AVIF 变体，并在图片目录写入索引
+image-variants.json（随 docs/ 复制到 site/）；构建后 responsive-images.py 按索引把
+<img> 改写为 <picture> / srcset，test-performance.py 在报告中列出每张图片的变体。
+
+变体命名：board.jpg -> board-480w.webp、board-480w.avif；原尺寸为 board.webp、board.avif。
+索引中的路径相对索引文件所在目录：
+
+    {"version": 1, "images": {"hardware/board.jpg": {"width": 2000, "height": 1280,
+        "sources": {"avif": [[480, "hardware/board-480w.avif"], ..., [2000, "hardware/board.avif"]],
+                    "webp": [...]}}}}
+"""
+
+import json
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from resource_graph import TAG_PATTERN, is_external, parse_attrs, resolve_url
+
+# 索引文件名（每个图片目录一个）
+VARIANTS_INDEX = 'image-variants.json'
+INDEX_VERSION = 1
+
+# 默认宽度阶梯（px）
+DEFAULT_WIDTHS = [480, 960, 1440, 2000]
+
+# 变体格式，按 <source> 顺序排列：浏览器使用第一个支持的格式
+FORMATS = ['avif', 'webp']
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+# Material 主题正文栏在最宽布局下的宽度（px）：.md-grid 61rem 减去左右侧栏各 12.1rem，
+# 宽屏下 1rem = 20px；侧栏在 76.25em 以下收起，正文接近全屏宽
+CONTENT_WIDTH = 736
+WIDE_LAYOUT_MEDIA = '(min-width: 76.25em)'
+
+
+def variant_path(image_path: Path, width: Optional[int], fmt: str) -> Path:
+    """变体文件路径；width 为 None 时为原尺寸变体"""
+    suffix = f'-{width}w' if width is not None else ''
+    return image_path.with_name(f'{image_path.stem}{suffix}.{fmt}')
+
+
+def variant_pattern(image_path: Path) -> re.Pattern:
+    """匹配该图片所有宽度变体的文件名（用于清理阶梯变化后的旧变体）"""
+    return re.compile(re.escape(image_path.stem) + r'-\d+w\.(?:' + '|'.join(FORMATS) + r')$')
+
+
+def variant_collisions(image_paths: List[Path]) -> Dict[Path, Path]:
+    """
+    变体文件名冲突的图片 -> 与之冲突的另一张图片
+
+    变体名只取文件名主干：board.png 和 board.jpg 都会写 board.webp；a-100w.png 的
+    a-100w.webp 又会被当作 a.jpg 的宽度变体清理。主干按小写比较（大小写不敏感的文件系统上同样冲突）。
+    """
+    groups: Dict[Tuple[Path, str], List[Path]] = {}
+    for path in sorted(image_paths):
+        groups.setdefault((path.parent, path.stem.lower()), []).append(path)
+    collisions = {}
+    for (parent, stem), paths in groups.items():
+        clashing = list(paths)
+        base = re.fullmatch(r'(.+)-\d+w', stem)
+        if base:
+            clashing += groups.get((parent, base.group(1)), [])
+        if len(clashing) < 2:
+            continue
+        for path in clashing:
+            collisions.setdefault(path, next(other for other in clashing if other != path))
+    return collisions
+
+
+def ladder(width: int, widths: List[int]) -> List[int]:
+    """小于原图宽度的阶梯宽度（原尺寸单独作为最大候选）"""
+    return sorted(w for w in set(widths) if w < width)
+
+
+def index_entry(image_path: Path, width: int, height: int, widths: List[int], base_dir: Path) -> Optional[Dict]:
+    """按磁盘上实际存在的变体生成索引条目（路径相对 base_dir）；没有变体时返回 None"""
+    sources = {}
+    for fmt in FORMATS:
+        candidates = [(w, variant_path(image_path, w, fmt)) for w in ladder(width, widths)]
+        candidates.append((width, variant_path(image_path, None, fmt)))
+        existing = [[w, path.relative_to(base_dir).as_posix()] for w, path in candidates if path.exists()]
+        if existing:
+            sources[fmt] = existing
+    if not sources:
+        return None
+    return {'width': width, 'height': height, 'sources': sources}
+
+
+def save_index(index_path: Path, images: Dict[str, Dict]):
+    """写入索引（没有任何变体时删除索引文件；内容不变时不重写，避免无意义的 diff）"""
+    if not images:
+        if index_path.exists():
+            index_path.unlink()
+        return
+    content = json.dumps({'version': INDEX_VERSION, 'images': images}, indent=2, sort_keys=True) + '\n'
+    if index_path.exists() and index_path.read_text(encoding='utf-8') == content:
+        return
+    index_path.write_text(content, encoding='utf-8')
+
+
+def load_site_variants(site_dir: Path) -> Dict[str, Dict]:
+    """
+    读取 site/ 中所有变体索引，键和变体路径转为相对 site/ 的路径
+
+    返回 {图片路径: {width, height, sources: {格式: [[宽度, 路径], ...]}}}。
+    """
+    variants = {}
+    for index_path in sorted(site_dir.rglob(VARIANTS_INDEX)):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            continue
+        base = index_path.parent.relative_to(site_dir).as_posix()
+        for key, entry in data.get('images', {}).items():
+            sources = {
+                fmt: [[w, posixpath.normpath(posixpath.join(base, path))] for w, path in candidates]
+                for fmt, candidates in entry['sources'].items()
+            }
+            variants[posixpath.normpath(posixpath.join(base, key))] = dict(entry, sources=sources)
+    return variants
+
+
+def sizes_for(display_width: int, content_width: int = CONTENT_WIDTH) -> str:
+    """
+    <img> 的 sizes：宽屏下占满正文栏（不超过图片显示宽度），窄屏下占满视口；
+    比正文栏窄的图片按自身宽度显示，视口更窄时缩到视口宽度
+    """
+    if display_width >= content_width:
+        return f'{WIDE_LAYOUT_MEDIA} {content_width}px, 100vw'
+    return f'(max-width: {display_width}px) 100vw, {display_width}px'
+
+
+def pick_candidate(candidates: List[List], required_width: int) -> List:
+    """按 srcset 的选择规则取候选：不小于所需像素宽度的最小变体，都不够时取最大的"""
+    for candidate in sorted(candidates):
+        if candidate[0] >= required_width:
+            return candidate
+    return max(candidates)
+
+
+def _page_url(path: str, page_dir: str) -> str:
+    """site/ 中的路径 -> 相对页面的 URL"""
+    return quote(posixpath.relpath(path, page_dir or '.'))
+
+
+def picture_markup(img_tag: str, attrs: Dict[str, str], entry: Dict, page_dir: str,
+                   sizes: Optional[str] = None) -> str:
+    """把一个 <img> 标签包装为带 AVIF / WebP <source> 的 <picture>，原 <img> 作为回退"""
+    display_width = entry['width']
+    if attrs.get('width', '').isdigit():
+        display_width = int(attrs['width'])
+    sizes = sizes or sizes_for(display_width)
+
+    parts = ['<picture>']
+    for fmt in FORMATS:
+        candidates = entry['sources'].get(fmt)
+        if not candidates:
+            continue
+        srcset = ', '.join(f'{_page_url(path, page_dir)} {w}w' for w, path in candidates)
+        parts.append(f'<source type="{MIME_TYPES[fmt]}" srcset="{srcset}" sizes="{sizes}">')
+    if 'width' not in attrs and 'height' not in attrs:
+        # 预留宽高比，避免图片加载后布局偏移
+        img_tag = f'<img width="{entry["width"]}" height="{entry["height"]}"' + img_tag[len('<img'):]
+    parts.append(img_tag)
+    parts.append('</picture>')
+    return ''.join(parts)
+
+
+def rewrite_images(html: str, page_path: str, variants: Dict[str, Dict],
+                   sizes: Optional[str] = None) -> Tuple[str, List[str]]:
+    """
+    把页面中有变体的 <img> 改写为 <picture>
+
+    已在 <picture> 中或已有 srcset 的 <img> 保持不变，因此可以重复执行。
+    返回 (新的 HTML, 改写的图片路径)。
+    """
+    page_dir = posixpath.dirname(page_path)
+    pieces = []
+    rewritten = []
+    last = 0
+    in_picture = False
+    for match in TAG_PATTERN.finditer(html):
+        if match.group(5) is None:
+            continue  # 注释、脚本、样式
+        closing, tag = match.group(4), match.group(5).lower()
+        if tag == 'picture':
+            in_picture = not closing
+            continue
+        if tag != 'img' or closing or in_picture:
+            continue
+        attrs = parse_attrs(match.group(6))
+        src = attrs.get('src')
+        if not src or 'srcset' in attrs or is_external(src) or src.startswith('data:'):
+            continue
+        path = resolve_url(unquote(src), page_dir)
+        entry = variants.get(path)
+        if entry is None:
+            continue
+        pieces.append(html[last:match.start()])
+        pieces.append(picture_markup(match.group(0), attrs, entry, page_dir, sizes))
+        last = match.end()
+        rewritten.append(path)
+    if not rewritten:
+        return html, []
+    pieces.append(html[last:])
+    return ''.join(pieces), rewritten
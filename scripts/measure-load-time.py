@@ -13,16 +13,35 @@ import os
 import sys
 import time
 import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import statistics
 
+from compression import COMPRESSORS, IDENTITY, compressed_size, file_compressed_size, is_compressible
+from network_sim import (
+    DISTRIBUTIONS, NUMPY_AVAILABLE, PROTOCOLS, Jitter, NetworkConditions, Resource,
+    load_profiles, monte_carlo, paint_times, profile_matrix, quantile_ci, simulate_page
+)
+from resource_graph import (
+    RENDER_BLOCKING, ResourceGraph, classify, is_external, request_priority
+)
+from perf_budgets import Budgets, find_regressions
+from perf_history import HISTORY_PATH, PerformanceHistory
+from third_party import THIRD_PARTY_PATH, ThirdPartyManifest, origin_of
+from session_sim import CachePolicy, read_click_log, simulate_session, synthetic_clicks
+from site_changes import changed_site_pages, load_mkdocs_config, nav_html_pages
+
 # 设置 UTF-8 输出
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# 加载时间报告路径（增量模式从这里读取上次结果）
+REPORT_PATH = Path('load-time-report.json')
+
 # 颜色输出
 class Colors:
     GREEN = '\033[92m'
@@ -57,143 +76,279 @@ def format_time(seconds: float) -> str:
     else:
         return f"{seconds:.2f} s"
 
-def estimate_load_time(html_path: Path, site_dir: Path) -> Dict:
+class AssetIndex:
     """
-    估算页面加载时间
+    site/ 下所有文件的大小索引
     
-    基于以下因素：
-    1. HTML 文件大小
-    2. 引用的 CSS 文件数量和大小
-    3. 引用的 JavaScript 文件数量和大小
-    4. 引用的图片数量和大小
+    构建时用 os.scandir 扫描一次（scandir 的目录项自带大小，无需逐个 stat），
+    之后所有页面共享；graph 为基于该索引的资源引用图，
+    同一主题 CSS 引用的字体和图片在各页面间只解析一次。
     
-    假设网络条件：
-    - 带宽: 10 Mbps (典型的家庭宽带)
-    - 延迟: 50ms (每个资源请求)
-    - 并发连接: 6 (浏览器默认)
+    传输大小按 encoding 计算（文本资源压缩，图片等按原始大小），每个资源只压缩一次。
+    外部资源（完整 URL）的大小取自 third_party 清单，清单中没有的按 0 字节计。
     """
     
-    # 读取 HTML 文件
-    with open(html_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    html_size = html_path.stat().st_size
-    
-    # 解析资源引用（简化版本）
-    css_files = []
-    js_files = []
-    img_files = []
-    
-    # 查找 CSS 引用
-    import re
-    css_pattern = r'href="([^"]+\.css)"'
-    for match in re.finditer(css_pattern, html_content):
-        css_path = match.group(1)
-        # 转换为绝对路径
-        if css_path.startswith('..'):
-            css_full_path = (html_path.parent / css_path).resolve()
-        else:
-            css_full_path = site_dir / css_path.lstrip('/')
-        
-        if css_full_path.exists():
-            css_files.append(css_full_path.stat().st_size)
-    
-    # 查找 JS 引用
-    js_pattern = r'src="([^"]+\.js)"'
-    for match in re.finditer(js_pattern, html_content):
-        js_path = match.group(1)
-        if js_path.startswith('..'):
-            js_full_path = (html_path.parent / js_path).resolve()
-        else:
-            js_full_path = site_dir / js_path.lstrip('/')
-        
-        if js_full_path.exists():
-            js_files.append(js_full_path.stat().st_size)
-    
-    # 查找图片引用
-    img_pattern = r'src="([^"]+\.(png|jpg|jpeg|gif|svg|webp))"'
-    for match in re.finditer(img_pattern, html_content):
-        img_path = match.group(1)
-        if img_path.startswith('..'):
-            img_full_path = (html_path.parent / img_path).resolve()
-        else:
-            img_full_path = site_dir / img_path.lstrip('/')
+    def __init__(self, site_dir: Path, encoding: str = IDENTITY,
+                 third_party: Optional[ThirdPartyManifest] = None):
+        self.site_dir = site_dir
+        self.encoding = encoding
+        self.third_party = third_party or ThirdPartyManifest()
+        self.sizes: Dict[str, int] = {}
+        self._transfer: Dict[str, int] = {}
+        self._scan(str(site_dir), '')
+        self.graph = ResourceGraph(site_dir, self.sizes.__contains__)
+    
+    def _scan(self, directory: str, prefix: str):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    self._scan(entry.path, rel_path + '/')
+                elif entry.is_file():
+                    self.sizes[rel_path] = entry.stat().st_size
+    
+    def pages(self) -> List[str]:
+        """所有 HTML 页面（首页在前，其余按路径排序）"""
+        return sorted((p for p in self.sizes if p.endswith('.html')),
+                      key=lambda p: (p != 'index.html', p))
+    
+    def raw_size(self, path: str) -> int:
+        """资源的原始大小"""
+        if is_external(path):
+            return (self.third_party.sizes(path, self.encoding) or (0, 0))[0]
+        return self.sizes[path]
+    
+    def transfer_size(self, path: str) -> int:
+        """资源在 encoding 下的传输大小（记忆化）"""
+        if path not in self._transfer:
+            if is_external(path):
+                self._transfer[path] = (self.third_party.sizes(path, self.encoding) or (0, 0))[1]
+            elif self.encoding == IDENTITY or not is_compressible(path):
+                self._transfer[path] = self.sizes[path]
+            else:
+                self._transfer[path] = file_compressed_size(self.site_dir / path, self.encoding)
+        return self._transfer[path]
+    
+    def precompress(self):
+        """
+        预先计算所有 CSS/JS 的传输大小，并解析所有样式表的引用
         
-        if img_full_path.exists():
-            img_files.append(img_full_path.stat().st_size)
-    
-    # 计算加载时间
-    BANDWIDTH_MBPS = 10  # 10 Mbps
-    BANDWIDTH_BPS = BANDWIDTH_MBPS * 1024 * 1024 / 8  # 转换为字节/秒
-    LATENCY_MS = 50  # 每个请求 50ms 延迟
-    MAX_CONCURRENT = 6  # 最大并发连接数
-    
-    # HTML 加载时间（阻塞渲染）
-    html_download_time = html_size / BANDWIDTH_BPS
-    html_latency = LATENCY_MS / 1000
-    html_load_time = html_download_time + html_latency
-    
-    # CSS 加载时间（阻塞渲染）
-    css_total_size = sum(css_files)
-    css_count = len(css_files)
-    css_batches = (css_count + MAX_CONCURRENT - 1) // MAX_CONCURRENT
-    css_download_time = css_total_size / BANDWIDTH_BPS
-    css_latency = css_batches * (LATENCY_MS / 1000)
-    css_load_time = css_download_time + css_latency
-    
-    # JavaScript 加载时间（可能阻塞渲染）
-    js_total_size = sum(js_files)
-    js_count = len(js_files)
-    js_batches = (js_count + MAX_CONCURRENT - 1) // MAX_CONCURRENT
-    js_download_time = js_total_size / BANDWIDTH_BPS
-    js_latency = js_batches * (LATENCY_MS / 1000)
-    js_load_time = js_download_time + js_latency
-    
-    # 图片加载时间（不阻塞渲染，但影响 LCP）
-    img_total_size = sum(img_files)
-    img_count = len(img_files)
-    img_batches = (img_count + MAX_CONCURRENT - 1) // MAX_CONCURRENT
-    img_download_time = img_total_size / BANDWIDTH_BPS
-    img_latency = img_batches * (LATENCY_MS / 1000)
-    img_load_time = img_download_time + img_latency
-    
-    # FCP (First Contentful Paint) = HTML + CSS + 关键 JS
-    fcp_time = html_load_time + css_load_time + js_load_time * 0.5  # 假设 50% 的 JS 是关键的
-    
-    # LCP (Largest Contentful Paint) = FCP + 最大图片
-    lcp_time = fcp_time + (max(img_files) / BANDWIDTH_BPS if img_files else 0)
+        在分发到进程池之前调用，结果随索引传给各 worker，
+        主题资源不会在每个 worker 中重复压缩和解析。
+        """
+        for path in self.sizes:
+            if path.endswith(('.css', '.js')):
+                self.transfer_size(path)
+        for url in self.third_party.resources:
+            self.transfer_size(url)
+        self.graph.prime([path for path in self.sizes if path.endswith('.css')])
+    
+    def read_page(self, page_path: str) -> Tuple[str, int, int]:
+        """读取页面，返回 (HTML 文本, 原始大小, 传输大小)"""
+        with open(self.site_dir / page_path, 'rb') as f:
+            raw = f.read()
+        if self.encoding == IDENTITY:
+            return raw.decode('utf-8'), len(raw), len(raw)
+        return raw.decode('utf-8'), len(raw), compressed_size(raw, self.encoding)
+
+def find_page_resources(html_content: str, html_size: int, page_path: str, assets: AssetIndex,
+                        classes: Optional[Dict[str, str]] = None,
+                        inline: Optional[List] = None) -> List[Resource]:
+    """
+    找出页面会请求的全部资源（路径相对 site/，外部资源为完整 URL），按被发现的顺序返回
+    
+    由 resource_graph 提取：样式表、脚本、预加载、图片（含 srcset / <picture>），
+    以及样式表中 @import、url() 引用的字体和图片（递归，parent 为所属样式表）。
+    html_size 与资源的 size 均为传输大小（按 assets.encoding）。
+
+    是否阻塞首次渲染由 resource_graph.classify() 按属性和位置判断：
+    <head> 中的同步脚本和 media 匹配屏幕的样式表阻塞；async / defer / module 脚本、
+    <body> 中的同步脚本、print 等样式表和预加载不阻塞。
+    指定 classes 时写入每个资源的分类；inline 收集内联脚本（不产生请求）。
+    外部资源在各自的源上建立连接（origin），大小取自第三方清单。
+    同一文件被多次引用时只请求一次。
+    """
+    # 字符位置按比例换算为字节位置（用于判断 HTML 下载到哪里时发现资源）
+    scale = html_size / max(len(html_content), 1)
+    classes = {} if classes is None else classes
+    resources = []
+    for node in assets.graph.page_resources(html_content, page_path, inline):
+        kind = node.kind
+        parent_class = classes[node.parent] if node.parent is not None else None
+        cls = classify(kind, node.attrs, node.in_head, parent_class)
+        classes[node.path] = cls
+        resources.append(Resource(
+            path=node.path,
+            kind=kind,
+            size=assets.transfer_size(node.path),
+            offset=int(node.offset * scale),
+            blocking=cls == RENDER_BLOCKING,
+            priority=request_priority(kind, cls),
+            origin=origin_of(node.path) if node.external else '',
+            parent=node.parent
+        ))
+    return resources
+
+def blocking_contributions(html_path: str, html_size: int, resources: List[Resource],
+                           conditions: NetworkConditions, fcp: float) -> List[Dict]:
+    """
+    每个阻塞渲染的资源对 FCP 的贡献：去掉该资源（连同其 @import 和引用的子资源）
+    后重新模拟，FCP 减少的时间。按贡献从大到小排列。
+    """
+    contributions = []
+    for resource in resources:
+        if not resource.blocking:
+            continue
+        removed = {resource.path}
+        for r in resources:
+            if r.parent in removed:
+                removed.add(r.path)
+        rest = [r for r in resources if r.path not in removed]
+        without = paint_times(simulate_page(html_path, html_size, rest, conditions))['fcp_time']
+        contributions.append({
+            'path': resource.path,
+            'kind': resource.kind,
+            'size': resource.size,
+            'contribution': max(fcp - without, 0.0)
+        })
+    return sorted(contributions, key=lambda c: -c['contribution'])
+
+def blocking_resources(waterfall: List[Dict]) -> List[Dict]:
+    """阻塞渲染的子资源（不含 HTML），按完成时间从晚到早排列：第一个即关键路径终点"""
+    blocking = [w for w in waterfall[1:] if w['blocking']]
+    return [
+        {'path': w['path'], 'kind': w['kind'], 'size': w['size']}
+        for w in sorted(blocking, key=lambda w: -w['end'])
+    ]
+
+def estimate_load_time(html_path: Path, site_dir: Path,
+                       conditions: NetworkConditions = NetworkConditions(),
+                       assets: Optional[AssetIndex] = None, contributions: bool = False) -> Dict:
+    """
+    估算页面加载时间
+    
+    解析 HTML 及其样式表引用的全部资源，用 network_sim 的离散事件模拟
+    得到每个资源的开始、首字节和完成时间（瀑布图），再由关键路径推导：
+    - FCP: HTML 和所有阻塞渲染的资源（见 find_page_resources）全部到达的时间
+    - LCP: FCP 与最大图片到达时间中较晚者
+    
+    render_blocking 列出阻塞首次渲染的资源（按完成时间从晚到早）；contributions 为 True 时
+    附带各自对 FCP 的贡献（每个阻塞资源需要额外模拟一次，只在输出贡献时计算）。
+    resource_classes 为各阻塞分类的资源数（inline 为内联脚本数）。
+    
+    各类资源的 *_load_time 为该类最后一个资源完成的时间。
+    *_size 为原始文件大小；模拟使用 assets.encoding 下的传输大小，
+    合计见 transfer_size。测试多个页面时应传入共享的 assets 索引。
+    
+    页面引用外部资源时，third_party_delay 为它们给 FCP 增加的时间
+    （与去掉所有外部资源后重新模拟的 FCP 之差）。
+    """
+    assets = assets or AssetIndex(site_dir)
+    
+    rel_path = html_path.relative_to(site_dir).as_posix()
+    html_content, html_size, html_transfer = assets.read_page(rel_path)
+    classes: Dict[str, str] = {}
+    inline: List = []
+    resources = find_page_resources(html_content, html_transfer, rel_path, assets, classes, inline)
+    
+    waterfall = simulate_page(rel_path, html_transfer, resources, conditions)
+    paint = paint_times(waterfall)
+    class_counts: Dict[str, int] = {}
+    for cls in classes.values():
+        class_counts[cls] = class_counts.get(cls, 0) + 1
+    if inline:
+        class_counts['inline'] = len(inline)
+    
+    third_party = [r for r in resources if r.origin]
+    third_party_delay = 0.0
+    if third_party:
+        first_party = [r for r in resources if not r.origin]
+        baseline = paint_times(simulate_page(rel_path, html_transfer, first_party, conditions))
+        third_party_delay = paint['fcp_time'] - baseline['fcp_time']
+    
+    def finished(kind: str) -> float:
+        return max((w['end'] for w in waterfall if w['kind'] == kind), default=0.0)
+    
+    def total_size(kind: str) -> int:
+        return sum(assets.raw_size(r.path) for r in resources if r.kind == kind)
+    
+    def count(kind: str) -> int:
+        return sum(1 for r in resources if r.kind == kind)
     
     return {
         'html_size': html_size,
-        'css_count': css_count,
-        'css_size': css_total_size,
-        'js_count': js_count,
-        'js_size': js_total_size,
-        'img_count': img_count,
-        'img_size': img_total_size,
-        'html_load_time': html_load_time,
-        'css_load_time': css_load_time,
-        'js_load_time': js_load_time,
-        'img_load_time': img_load_time,
-        'fcp_time': fcp_time,
-        'lcp_time': lcp_time
+        'css_count': count('css'),
+        'css_size': total_size('css'),
+        'js_count': count('js'),
+        'js_size': total_size('js'),
+        'img_count': count('img'),
+        'img_size': total_size('img'),
+        'font_count': count('font'),
+        'font_size': total_size('font'),
+        'transfer_size': sum(w['size'] for w in waterfall),
+        'encoding': assets.encoding,
+        'html_load_time': finished('html'),
+        'css_load_time': finished('css'),
+        'js_load_time': finished('js'),
+        'img_load_time': finished('img'),
+        'font_load_time': finished('font'),
+        'third_party_count': len(third_party),
+        'third_party_bytes': sum(r.size for r in third_party),
+        'third_party_origins': sorted({r.origin for r in third_party}),
+        'third_party_unknown': [r.path for r in third_party if r.path not in assets.third_party],
+        'third_party_delay': third_party_delay,
+        'render_blocking': (
+            blocking_contributions(rel_path, html_transfer, resources, conditions, paint['fcp_time'])
+            if contributions else blocking_resources(waterfall)
+        ),
+        'resource_classes': class_counts,
+        **paint,
+        'waterfall': waterfall
     }
 
-def test_page_load_times(site_dir: Path) -> List[Dict]:
+def print_waterfall(result: Dict, width: int = 40):
+    """打印页面的请求瀑布图（- 为建立连接和等待首字节，# 为下载）"""
+    waterfall = result['waterfall']
+    total = max(w['end'] for w in waterfall) or 1.0
+    scale = width / total
+    print(f"    资源{' ' * 44}开始  首字节    完成")
+    for w in waterfall:
+        start, ttfb, end = (round(w[k] * scale) for k in ('start', 'ttfb', 'end'))
+        bar = ' ' * start + '-' * (ttfb - start) + '#' * max(end - ttfb, 1)
+        name = w['path'] if len(w['path']) <= 42 else '…' + w['path'][-41:]
+        marker = '*' if w['blocking'] else ' '
+        print(f"   {marker}{name:<44} {w['start'] * 1000:>5.0f}ms {w['ttfb'] * 1000:>5.0f}ms "
+              f"{w['end'] * 1000:>5.0f}ms |{bar:<{width}}|")
+    print(f"    * 阻塞渲染；关键路径终点: {result['critical_resource']}")
+
+def print_render_blocking(result: Dict, indent: str = '  '):
+    """打印阻塞首次渲染的资源及各自对 FCP 的贡献（已计算时）"""
+    blocking = result['render_blocking']
+    classes = result['resource_classes']
+    summary = '，'.join(f"{cls} {n}" for cls, n in sorted(classes.items()))
+    print(f"{indent}资源分类: {summary or '-'}")
+    if not blocking:
+        print(f"{indent}阻塞首次渲染: 无（仅 HTML）")
+        return
+    print(f"{indent}阻塞首次渲染:")
+    for item in blocking:
+        if 'contribution' in item:
+            print(f"{indent}  +{item['contribution'] * 1000:>5.0f} ms  {item['path']} ({item['size'] / 1024:.1f} KB)")
+        else:
+            print(f"{indent}  {item['path']} ({item['size'] / 1024:.1f} KB)")
+
+def test_page_load_times(site_dir: Path, budgets: Budgets, conditions: NetworkConditions,
+                         assets: AssetIndex, show_waterfall: bool = False) -> List[Dict]:
     """测试所有页面的加载时间"""
     print_header("页面加载时间测试")
     
-    # 性能要求
-    INDEX_FCP_LIMIT = 1.5  # 首页 FCP < 1.5s
-    CONTENT_FCP_LIMIT = 2.0  # 内容页 FCP < 2.0s
-    
     results = []
     
     # 测试首页
     index_path = site_dir / 'index.html'
     if index_path.exists():
         print(f"{Colors.BOLD}测试首页加载时间...{Colors.END}")
-        index_result = estimate_load_time(index_path, site_dir)
+        index_result = estimate_load_time(index_path, site_dir, conditions, assets, contributions=True)
         index_result['path'] = 'index.html'
         index_result['is_index'] = True
         results.append(index_result)
@@ -202,13 +357,27 @@ def test_page_load_times(site_dir: Path) -> List[Dict]:
         print(f"  CSS: {index_result['css_count']} 个文件, {index_result['css_size'] / 1024:.1f} KB")
         print(f"  JavaScript: {index_result['js_count']} 个文件, {index_result['js_size'] / 1024:.1f} KB")
         print(f"  图片: {index_result['img_count']} 个, {index_result['img_size'] / 1024:.1f} KB")
+        print(f"  字体: {index_result['font_count']} 个, {index_result['font_size'] / 1024:.1f} KB")
+        print(f"  传输合计: {index_result['transfer_size'] / 1024:.1f} KB ({index_result['encoding']})")
+        if index_result['third_party_count']:
+            print(f"  第三方: {index_result['third_party_count']} 个, "
+                  f"{index_result['third_party_bytes'] / 1024:.1f} KB "
+                  f"({', '.join(index_result['third_party_origins'])})，"
+                  f"FCP +{index_result['third_party_delay'] * 1000:.0f} ms")
         print(f"  FCP 时间: {format_time(index_result['fcp_time'])}")
         print(f"  LCP 时间: {format_time(index_result['lcp_time'])}")
+        print_render_blocking(index_result)
+        if show_waterfall:
+            print_waterfall(index_result)
         
-        if index_result['fcp_time'] <= INDEX_FCP_LIMIT:
-            print_success(f"首页 FCP 符合要求 (< {INDEX_FCP_LIMIT}s)")
+        # 性能要求（首页 FCP 默认 < 1.5s，见 performance-budgets.yml）
+        index_fcp_limit = budgets.limits_for('index.html').get('max_fcp_s')
+        if index_fcp_limit is None:
+            pass
+        elif index_result['fcp_time'] <= index_fcp_limit:
+            print_success(f"首页 FCP 符合要求 (< {index_fcp_limit}s)")
         else:
-            print_error(f"首页 FCP 超标: {format_time(index_result['fcp_time'])} > {INDEX_FCP_LIMIT}s")
+            print_error(f"首页 FCP 超标: {format_time(index_result['fcp_time'])} > {index_fcp_limit}s")
         print()
     
     # 测试内容页面（采样）
@@ -225,7 +394,7 @@ def test_page_load_times(site_dir: Path) -> List[Dict]:
     for page_path in sample_pages:
         full_path = site_dir / page_path
         if full_path.exists():
-            result = estimate_load_time(full_path, site_dir)
+            result = estimate_load_time(full_path, site_dir, conditions, assets, contributions=True)
             result['path'] = page_path
             result['is_index'] = False
             results.append(result)
@@ -233,17 +402,209 @@ def test_page_load_times(site_dir: Path) -> List[Dict]:
             print(f"\n  {page_path}")
             print(f"    FCP: {format_time(result['fcp_time'])}", end='')
             
-            if result['fcp_time'] <= CONTENT_FCP_LIMIT:
+            # 内容页 FCP 默认 < 2.0s，可按路径覆盖
+            content_fcp_limit = budgets.limits_for(page_path).get('max_fcp_s')
+            if content_fcp_limit is None or result['fcp_time'] <= content_fcp_limit:
                 print(f" {Colors.GREEN}✓{Colors.END}")
-            elif result['fcp_time'] <= CONTENT_FCP_LIMIT * 1.2:
+            elif result['fcp_time'] <= content_fcp_limit * 1.2:
                 print(f" {Colors.YELLOW}⚠{Colors.END}")
             else:
                 print(f" {Colors.RED}✗{Colors.END}")
+            if show_waterfall:
+                print_render_blocking(result, indent='    ')
+                print_waterfall(result)
     
     return results
 
-def analyze_load_time_results(results: List[Dict]):
-    """分析加载时间结果"""
+# 进程池 worker 的共享状态（由 _init_worker 在每个 worker 中设置一次）
+_worker_state: Dict = {}
+
+def _init_worker(site_dir: Path, conditions: NetworkConditions, assets: AssetIndex,
+                 contributions: bool = False):
+    _worker_state.update(site_dir=site_dir, conditions=conditions, assets=assets,
+                         contributions=contributions)
+
+def _estimate_page(page_path: str) -> Dict:
+    """估算单个页面（在 worker 中运行，使用共享的资源索引）"""
+    site_dir = _worker_state['site_dir']
+    result = estimate_load_time(
+        site_dir / page_path, site_dir, _worker_state['conditions'], _worker_state['assets'],
+        _worker_state['contributions']
+    )
+    result['path'] = page_path
+    result['is_index'] = page_path == 'index.html'
+    return result
+
+def test_all_pages(site_dir: Path, budgets: Budgets, conditions: NetworkConditions,
+                   assets: AssetIndex, jobs: int = 1, contributions: bool = False) -> List[Dict]:
+    """
+    测试站点中的所有页面
+    
+    页面分发到进程池；资源索引只扫描一次，随 worker 初始化传入。
+    结果顺序与页面顺序一致（首页在前）。contributions 为 True 时计算阻塞资源对 FCP 的贡献。
+    """
+    print_header("页面加载时间测试（全部页面）")
+    
+    pages = assets.pages()
+    print(f"正在估算 {len(pages)} 个页面（{jobs} 个进程）...")
+    assets.precompress()
+    
+    start = time.perf_counter()
+    results = []
+    
+    def collect(result: Dict):
+        results.append(result)
+        done = len(results)
+        if done % 100 == 0 or done == len(pages):
+            rate = done / max(time.perf_counter() - start, 1e-9)
+            print(f"\r  页面: {done}/{len(pages)} ({rate:.1f} 页/秒)", end='', flush=True)
+    
+    if jobs > 1 and len(pages) > 1:
+        # 按每个 worker 约 4 批切分，减少进程间通信开销
+        chunksize = max(1, len(pages) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(site_dir, conditions, assets, contributions)) as executor:
+            for result in executor.map(_estimate_page, pages, chunksize=chunksize):
+                collect(result)
+    else:
+        _init_worker(site_dir, conditions, assets, contributions)
+        for page_path in pages:
+            collect(_estimate_page(page_path))
+    if pages:
+        print()
+    
+    # 只列出最慢的页面，完整结果见报告
+    print(f"\n{Colors.BOLD}FCP 最慢的页面:{Colors.END}")
+    for result in sorted(results, key=lambda r: r['fcp_time'], reverse=True)[:10]:
+        limit = budgets.limits_for(result['path']).get('max_fcp_s')
+        if limit is None or result['fcp_time'] <= limit:
+            mark = f"{Colors.GREEN}✓{Colors.END}"
+        elif result['fcp_time'] <= limit * 1.2:
+            mark = f"{Colors.YELLOW}⚠{Colors.END}"
+        else:
+            mark = f"{Colors.RED}✗{Colors.END}"
+        print(f"  {format_time(result['fcp_time']):>8}  {result['path']} {mark}")
+    
+    return results
+
+def test_changed_pages(site_dir: Path, since: Optional[str], conditions: NetworkConditions,
+                       assets: AssetIndex, show_waterfall: bool = False,
+                       contributions: bool = False) -> Optional[List[Dict]]:
+    """
+    增量模式：只估算有变更的页面，并合并到上次的加载时间报告
+
+    无法增量分析时返回 None（回退到全量测试）。--waterfall 时变更页面附带阻塞资源对 FCP 的贡献。
+    """
+    print_header("页面加载时间测试（增量）")
+    
+    if not REPORT_PATH.exists():
+        print_warning(f"未找到上次的报告 {REPORT_PATH}，执行全量测试")
+        return None
+    
+    plan = changed_site_pages(since)
+    if plan is None:
+        print_warning("配置、主题或静态资源有变更，执行全量测试")
+        return None
+    
+    with open(REPORT_PATH, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    changed, removed = plan
+    print(f"相对 {since or 'HEAD'} 有 {len(changed)} 个页面变更，{len(removed)} 个页面删除\n")
+    
+    # 上次的 p75（*_p75、*_p75_ci）不沿用：重新估算的页面只有点估计，
+    # 指定 --samples 时 test_monte_carlo 会对合并后的全部页面重新采样
+    merged = {
+        r['path']: {k: v for k, v in r.items() if not k.startswith(('fcp_p75', 'lcp_p75'))}
+        for r in previous['results']
+    }
+    if not contributions:
+        # 同理，本次不计算贡献时也不沿用上次的贡献
+        for r in merged.values():
+            r['render_blocking'] = [
+                {k: v for k, v in item.items() if k != 'contribution'} for item in r.get('render_blocking', [])
+            ]
+    for page_path in removed:
+        merged.pop(page_path, None)
+    
+    for page_path in changed:
+        full_path = site_dir / page_path
+        if not full_path.exists():
+            print_warning(f"{page_path}: 构建结果不存在，请先运行 'mkdocs build'")
+            continue
+        result = estimate_load_time(full_path, site_dir, conditions, assets, contributions)
+        result['path'] = page_path
+        result['is_index'] = page_path == 'index.html'
+        merged[page_path] = result
+        print(f"  {page_path}")
+        print(f"    FCP: {format_time(result['fcp_time'])}")
+        print(f"    LCP: {format_time(result['lcp_time'])}")
+        if show_waterfall:
+            print_render_blocking(result, indent='    ')
+            print_waterfall(result)
+    
+    # 首页在前，其余按路径排序
+    return sorted(merged.values(), key=lambda r: (not r['is_index'], r['path']))
+
+def budget_value(result: Dict, metric: str) -> Tuple[float, str]:
+    """
+    用于预算判断的 FCP / LCP（metric 为 'fcp' 或 'lcp'）及其说明
+    
+    有蒙特卡洛采样（--samples）时取 p75（与 Core Web Vitals 一致），否则取点估计。
+    """
+    if f'{metric}_p75' in result:
+        return result[f'{metric}_p75'], 'p75'
+    return result[f'{metric}_time'], ''
+
+def check_budgets(results: List[Dict], budgets: Budgets) -> List[str]:
+    """按各页面的预算检查 FCP / LCP（有采样时按 p75），返回超标描述"""
+    violations = []
+    for r in results:
+        limits = budgets.limits_for(r['path'])
+        for metric in ('fcp', 'lcp'):
+            limit = limits.get(f'max_{metric}_s')
+            value, label = budget_value(r, metric)
+            if limit is not None and value > limit:
+                name = f"{metric.upper()} {label}".rstrip()
+                violations.append(f"{r['path']}: {name} {format_time(value)} > {limit}s")
+    return violations
+
+def test_regressions(results: List[Dict], baseline_path: Path, budgets: Budgets) -> List[str]:
+    """与基线加载时间报告比较，返回 FCP / LCP 增长超过 max_regression_pct 的描述"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    messages = []
+    for metric, key in [('FCP', 'fcp_time'), ('LCP', 'lcp_time')]:
+        regressions = find_regressions(
+            results, baseline.get('results', []), lambda r: r[key], budgets,
+            floor_key='regression_floor_ms', floor_scale=0.001
+        )
+        for reg in regressions:
+            messages.append(
+                f"{reg['path']}: {metric} {format_time(reg['baseline'])} → {format_time(reg['current'])} "
+                f"(+{reg['change_pct']:.1f}%，阈值 {reg['limit_pct']}%)"
+            )
+    return messages
+
+def percentile(values: List[float], pct: float) -> float:
+    """线性插值百分位数（pct 为 0-100）"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def distribution(values: List[float]) -> Dict:
+    """站点范围的分布：p50 / p75 / p95 / 最大值"""
+    return {
+        'p50': percentile(values, 50),
+        'p75': percentile(values, 75),
+        'p95': percentile(values, 95),
+        'max': max(values)
+    }
+
+def analyze_load_time_results(results: List[Dict], budgets: Budgets):
+    """分析加载时间结果，并按预算判断各页面（有蒙特卡洛采样时按 p75）"""
     print_header("加载时间分析")
     
     if not results:
@@ -270,11 +631,18 @@ def analyze_load_time_results(results: List[Dict]):
     print(f"  平均: {format_time(avg_lcp)}")
     print(f"  最大: {format_time(max_lcp)}")
     
+    print(f"\n{Colors.BOLD}分布 ({len(results)} 个页面):{Colors.END}")
+    print(f"  {'':<4} {'p50':>9} {'p75':>9} {'p95':>9} {'max':>9}")
+    for label, values in [('FCP', fcp_times), ('LCP', lcp_times)]:
+        dist = distribution(values)
+        print(f"  {label:<4} " + ' '.join(f"{format_time(dist[k]):>9}" for k in ('p50', 'p75', 'p95', 'max')))
+    
     # 找出最慢的页面
     slowest_page = max(results, key=lambda x: x['fcp_time'])
     print(f"\n{Colors.BOLD}最慢页面:{Colors.END}")
     print(f"  路径: {slowest_page['path']}")
     print(f"  FCP: {format_time(slowest_page['fcp_time'])}")
+    print(f"  关键路径终点: {slowest_page.get('critical_resource', '-')}")
     print(f"  原因分析:")
     if slowest_page['css_size'] > 100 * 1024:
         print(f"    - CSS 文件较大 ({slowest_page['css_size'] / 1024:.1f} KB)")
@@ -282,26 +650,293 @@ def analyze_load_time_results(results: List[Dict]):
         print(f"    - JavaScript 文件较大 ({slowest_page['js_size'] / 1024:.1f} KB)")
     if slowest_page['js_count'] > 10:
         print(f"    - JavaScript 文件数量多 ({slowest_page['js_count']} 个)")
+    if slowest_page.get('third_party_delay', 0) > 0.1:
+        print(f"    - 第三方资源使 FCP 增加 {format_time(slowest_page['third_party_delay'])}")
+    
+    analyze_third_party(results)
+    analyze_render_blocking(results)
+    
+    sampled = all('fcp_p75' in r for r in results)
+    print(f"\n{Colors.BOLD}预算判断（{'各页面 p75' if sampled else '点估计，使用 --samples 按 p75 判断'}）:{Colors.END}")
+    violations = check_budgets(results, budgets)
+    if not violations:
+        print_success(f"{len(results)} 个页面均符合 FCP/LCP 预算")
+    for violation in violations:
+        print_warning(violation)
+
+def render_blocking_summary(results: List[Dict]) -> List[Dict]:
+    """
+    按资源汇总阻塞首次渲染的页面数和对 FCP 的贡献（按总贡献从大到小）
 
-def generate_load_time_report(results: List[Dict]):
+    只有所有页面都计算了贡献时才汇总贡献，否则只统计页面数（按页面数从多到少）。
+    """
+    per_resource: Dict[str, List[Optional[float]]] = {}
+    for r in results:
+        for item in r.get('render_blocking', []):
+            per_resource.setdefault(item['path'], []).append(item.get('contribution'))
+    if not all(v is not None for values in per_resource.values() for v in values):
+        summary = [{'path': path, 'pages': len(values)} for path, values in per_resource.items()]
+        return sorted(summary, key=lambda s: (-s['pages'], s['path']))
+    summary = [
+        {
+            'path': path,
+            'pages': len(values),
+            'mean_contribution': statistics.mean(values),
+            'max_contribution': max(values)
+        }
+        for path, values in per_resource.items()
+    ]
+    return sorted(summary, key=lambda s: -s['mean_contribution'] * s['pages'])
+
+def analyze_render_blocking(results: List[Dict], top: int = 10):
+    """打印全站阻塞首次渲染的资源"""
+    summary = render_blocking_summary(results)
+    if not summary:
+        return
+    print(f"\n{Colors.BOLD}阻塞首次渲染的资源:{Colors.END}")
+    if 'mean_contribution' not in summary[0]:
+        print(f"  {'页面数':>5}  资源（使用 --contributions 计算对 FCP 的贡献）")
+        for item in summary[:top]:
+            print(f"  {item['pages']:>8}  {item['path']}")
+        return
+    print(f"  {'页面数':>5} {'平均贡献':>8} {'最大贡献':>8}  资源")
+    for item in summary[:top]:
+        print(f"  {item['pages']:>8} {format_time(item['mean_contribution']):>12} "
+              f"{format_time(item['max_contribution']):>12}  {item['path']}")
+
+def third_party_summary(results: List[Dict]) -> Optional[Dict]:
+    """站点范围的第三方资源统计；没有页面引用外部资源时返回 None"""
+    affected = [r for r in results if r.get('third_party_count')]
+    if not affected:
+        return None
+    return {
+        'pages': len(affected),
+        'origins': sorted({o for r in affected for o in r['third_party_origins']}),
+        'bytes': distribution([r['third_party_bytes'] for r in affected]),
+        'fcp_delay': distribution([r['third_party_delay'] for r in affected]),
+        'unknown': sorted({u for r in affected for u in r['third_party_unknown']})
+    }
+
+def analyze_third_party(results: List[Dict]):
+    """打印第三方资源的字节数和给关键路径增加的延迟"""
+    summary = third_party_summary(results)
+    if summary is None:
+        return
+    print(f"\n{Colors.BOLD}第三方资源 ({summary['pages']}/{len(results)} 个页面):{Colors.END}")
+    print(f"  源: {', '.join(summary['origins'])}")
+    print(f"  {'':<10} {'p50':>9} {'p95':>9} {'max':>9}")
+    sizes = summary['bytes']
+    print(f"  {'传输字节':<6} " + ' '.join(f"{sizes[k] / 1024:>6.1f} KB" for k in ('p50', 'p95', 'max')))
+    delays = summary['fcp_delay']
+    print(f"  {'FCP 增加':<8} " + ' '.join(f"{format_time(delays[k]):>9}" for k in ('p50', 'p95', 'max')))
+    for url in summary['unknown']:
+        print_warning(f"第三方清单中没有 {url}，按 0 字节计（只计连接开销）")
+
+def generate_load_time_report(results: List[Dict], conditions: NetworkConditions,
+                              matrix: Optional[Dict] = None, session: Optional[Dict] = None,
+                              monte_carlo_report: Optional[Dict] = None):
     """生成加载时间报告"""
-    report_path = Path('load-time-report.json')
+    report_path = REPORT_PATH
     
     report = {
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
         'test_conditions': {
-            'bandwidth_mbps': 10,
-            'latency_ms': 50,
-            'max_concurrent': 6
+            'bandwidth_mbps': conditions.bandwidth_bps * 8 / 1024 / 1024,
+            'latency_ms': conditions.rtt_s * 1000,
+            'max_concurrent': conditions.max_connections if conditions.protocol != 'h2' else 1,
+            'protocol': conditions.protocol,
+            'encoding': results[0]['encoding'] if results else None
+        },
+        'summary': {
+            'pages': len(results),
+            'fcp': distribution([r['fcp_time'] for r in results]) if results else None,
+            'lcp': distribution([r['lcp_time'] for r in results]) if results else None,
+            'third_party': third_party_summary(results),
+            'render_blocking': render_blocking_summary(results)
         },
         'results': results
     }
+    if matrix is not None:
+        report['profile_matrix'] = matrix
+    if session is not None:
+        report['session'] = session
+    if monte_carlo_report is not None:
+        report['monte_carlo'] = monte_carlo_report
     
     with open(report_path, 'w', encoding='utf-8') as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
     
     print_success(f"加载时间报告已保存到: {report_path}")
 
+def test_network_profiles(results: List[Dict], profiles: Dict[str, NetworkConditions],
+                          rows: int = 15) -> Dict:
+    """
+    按多个网络配置估算所有页面的 FCP / LCP
+    
+    一次向量化计算得到页面 × 配置矩阵；控制台显示各配置的 p75 和
+    最慢配置下最慢的页面，完整矩阵写入报告。
+    """
+    print_header("多网络配置矩阵")
+    
+    matrix = profile_matrix([r['waterfall'] for r in results], profiles)
+    names = list(profiles)
+    
+    for c, name in enumerate(names):
+        cond = profiles[name]
+        fcp = matrix['fcp'][:, c].tolist()
+        lcp = matrix['lcp'][:, c].tolist()
+        print(f"  {name:<12} {cond.bandwidth_bps * 8 / 1024 / 1024:>6.1f} Mbps {cond.rtt_s * 1000:>4.0f} ms "
+              f"{cond.protocol:<8}  FCP p75 {format_time(percentile(fcp, 75)):>8}  "
+              f"LCP p75 {format_time(percentile(lcp, 75)):>8}")
+    
+    # 以最慢配置排序，显示最慢的页面
+    slowest = int(matrix['fcp'].mean(axis=0).argmax())
+    order = matrix['fcp'][:, slowest].argsort()[::-1][:rows]
+    print(f"\n{Colors.BOLD}FCP / LCP（按 {names[slowest]} 下的 FCP 排序，前 {len(order)} 个页面）:{Colors.END}")
+    print(f"  {'页面':<38}" + ''.join(f" {name[:15]:>17}" for name in names))
+    for p in order:
+        path = results[p]['path']
+        path = path if len(path) <= 40 else '…' + path[-39:]
+        cells = ''.join(
+            f" {format_time(matrix['fcp'][p, c]):>8}/{format_time(matrix['lcp'][p, c]):<8}"
+            for c in range(len(names))
+        )
+        print(f"  {path:<40}{cells}")
+    
+    return {
+        'profiles': {
+            name: {
+                'bandwidth_mbps': cond.bandwidth_bps * 8 / 1024 / 1024,
+                'latency_ms': cond.rtt_s * 1000,
+                'protocol': cond.protocol
+            }
+            for name, cond in profiles.items()
+        },
+        'pages': [r['path'] for r in results],
+        'fcp': matrix['fcp'].round(4).tolist(),
+        'lcp': matrix['lcp'].round(4).tolist()
+    }
+
+def test_monte_carlo(results: List[Dict], conditions: NetworkConditions, samples: int,
+                     jitter: Jitter, seed: int = 0) -> Dict:
+    """
+    在抖动的网络条件下对所有页面采样 FCP / LCP
+    
+    每个页面写入 fcp_p75 / lcp_p75 及 95% 置信区间（*_p75_ci），供按 p75 判断预算；
+    返回报告中的 monte_carlo 字段：全站（所有页面 × 样本）的 p50 / p75 / p95 及置信区间。
+    """
+    print_header(f"蒙特卡洛采样 ({samples} 次/页面)")
+    print(f"  RTT: {conditions.rtt_s * 1000:.0f} ms × {jitter.distribution}(±{jitter.rtt_spread})")
+    print(f"  带宽: {conditions.bandwidth_bps * 8 / 1024 / 1024:.1f} Mbps × "
+          f"{jitter.distribution}(±{jitter.bandwidth_spread})\n")
+    
+    sampled = monte_carlo([r['waterfall'] for r in results], conditions, samples, jitter, seed)
+    
+    summary = {}
+    print(f"  {'':<4} {'p50':>24} {'p75':>24} {'p95':>24}")
+    for metric in ('fcp', 'lcp'):
+        values = sampled[metric]
+        p75, low, high = quantile_ci(values, 0.75)
+        for r, value, lo, hi in zip(results, p75.tolist(), low.tolist(), high.tolist()):
+            r[f'{metric}_p75'] = value
+            r[f'{metric}_p75_ci'] = [lo, hi]
+        
+        summary[metric] = {}
+        cells = []
+        for name, q in (('p50', 0.50), ('p75', 0.75), ('p95', 0.95)):
+            value, lo, hi = (float(v) for v in quantile_ci(values.ravel(), q))
+            summary[metric][name] = {'value': value, 'ci': [lo, hi]}
+            cells.append(f"{format_time(value)} [{format_time(lo)}, {format_time(hi)}]")
+        print(f"  {metric.upper():<4} " + ' '.join(f"{cell:>24}" for cell in cells))
+    print(f"\n  方括号内为 95% 置信区间；共 {len(results)} 个页面 × {samples} 个样本")
+    
+    return {
+        'samples': samples,
+        'seed': seed,
+        'jitter': jitter._asdict(),
+        **summary
+    }
+
+def session_sequence(source: str, assets: AssetIndex, steps: int, seed: int) -> Tuple[str, List[str], bool]:
+    """
+    会话的页面序列：nav 为导航顺序，synthetic 为合成点击序列，其余视为点击记录文件
+    
+    返回 (序列描述, 页面序列, 是否启用 navigation.instant)。
+    """
+    config = load_mkdocs_config() if Path('mkdocs.yml').exists() else {}
+    theme = config.get('theme')
+    features = (theme.get('features') or []) if isinstance(theme, dict) else []
+    instant = 'navigation.instant' in features
+    
+    known = set(assets.pages())
+    nav = [p for p in nav_html_pages(config) if p in known] or assets.pages()
+    if source == 'nav':
+        return '导航顺序', nav, instant
+    if source == 'synthetic':
+        return f'合成点击 (seed={seed})', synthetic_clicks(nav, steps, seed), instant
+    
+    sequence, skipped = read_click_log(Path(source), known)
+    for url in skipped:
+        print_warning(f"点击记录中的页面不存在，已跳过: {url}")
+    return f'点击记录 {source}', sequence, instant
+
+def test_sessions(site_dir: Path, assets: AssetIndex, conditions: NetworkConditions,
+                  source: str, steps: int = 20, seed: int = 0,
+                  cache_policy: Optional[CachePolicy] = None) -> Optional[Dict]:
+    """模拟多页面会话，比较冷缓存与热缓存下每一步的延迟和传输字节"""
+    print_header("会话模拟")
+    
+    label, sequence, instant = session_sequence(source, assets, steps, seed)
+    if not sequence:
+        print_error("会话没有可访问的页面")
+        return None
+    
+    pages: Dict[str, Tuple[int, List[Resource]]] = {}
+    
+    def load_page(page_path: str) -> Tuple[int, List[Resource]]:
+        if page_path not in pages:
+            html_content, _, html_transfer = assets.read_page(page_path)
+            pages[page_path] = (html_transfer, find_page_resources(html_content, html_transfer, page_path, assets))
+        return pages[page_path]
+    
+    cold = simulate_session(sequence, load_page, conditions, instant, False, cache_policy)
+    warm = simulate_session(sequence, load_page, conditions, instant, True, cache_policy)
+    
+    print(f"序列: {label}，{len(sequence)} 步，navigation.instant {'已启用' if instant else '未启用'}\n")
+    # 表头中的中文字符占两列宽度，按显示宽度对齐
+    print(f"  {'#':>3} {'页面':<40} {'冷缓存 LCP':>9} {'传输':>8} {'热缓存 LCP':>9} {'传输':>8}")
+    for i, (c, w) in enumerate(zip(cold['steps'], warm['steps']), 1):
+        path = c['path'] if len(c['path']) <= 42 else '…' + c['path'][-41:]
+        print(f"  {i:>3} {path:<42} {format_time(c['lcp_time']):>12} {c['bytes'] / 1024:>9.1f}K "
+              f"{format_time(w['lcp_time']):>12} {w['bytes'] / 1024:>9.1f}K")
+    
+    print(f"\n{Colors.BOLD}会话合计:{Colors.END}")
+    for name, session in [('冷缓存', cold), ('热缓存', warm)]:
+        print(f"  {name}: 总耗时 {format_time(session['total_time'])}，"
+              f"传输 {session['total_bytes'] / 1024:.1f} KB，"
+              f"304 验证 {session['revalidations']} 次，"
+              f"平均每步 {format_time(session['total_time'] / len(sequence))}")
+    
+    return {
+        'sequence': label,
+        'instant': instant,
+        'conditions': conditions.protocol,
+        'cold': cold,
+        'warm': warm
+    }
+
+def record_history(history_path: Path, results: List[Dict]):
+    """把本次各页面的模拟加载时间追加到历史记录"""
+    metrics = ['html_size', 'css_size', 'js_size', 'img_size', 'fcp_time', 'lcp_time']
+    history = PerformanceHistory(history_path)
+    try:
+        run_id = history.record_run(
+            'load-time', ((r['path'], 'html', {m: r[m] for m in metrics}) for r in results)
+        )
+    finally:
+        history.close()
+    print_success(f"已记录到性能历史: {history_path} (运行 #{run_id})")
+
 def provide_performance_recommendations(results: List[Dict]):
     """提供性能优化建议"""
     print_header("性能优化建议")
@@ -378,8 +1013,165 @@ def provide_performance_recommendations(results: List[Dict]):
             print(f"     • {action}")
         print()
 
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='页面加载时间测量工具')
+    parser.add_argument(
+        '--changed-only',
+        action='store_true',
+        help='只测试相对 HEAD 有变更的页面，并合并到上次的加载时间报告'
+    )
+    parser.add_argument(
+        '--since',
+        metavar='GIT_REF',
+        help='只测试相对指定 git 引用有变更的页面（隐含 --changed-only）'
+    )
+    parser.add_argument(
+        '--all-pages',
+        action='store_true',
+        help='测试站点中的所有页面（默认只测试首页和 5 个示例页面）'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='--all-pages 时并行估算的进程数（默认: 1，0 表示使用全部 CPU 核心）'
+    )
+    parser.add_argument(
+        '--protocol',
+        choices=PROTOCOLS,
+        default='http/1.1',
+        help='模拟的 HTTP 协议：http/1.1 每个源最多 6 个连接，h2 单连接多路复用（默认: http/1.1）'
+    )
+    parser.add_argument(
+        '--matrix',
+        action='store_true',
+        help='按多个网络配置（slow-3g、fast-3g、4g、cable、broadband 及自定义）估算，输出页面 × 配置矩阵'
+    )
+    parser.add_argument(
+        '--profiles',
+        type=Path,
+        metavar='FILE',
+        help='自定义网络配置文件（YAML，profiles 下每项含 bandwidth_mbps、rtt_ms），隐含 --matrix'
+    )
+    parser.add_argument(
+        '--encoding',
+        choices=[IDENTITY] + list(COMPRESSORS),
+        default='gzip-6',
+        help='HTML/CSS/JS 的传输编码（默认: gzip-6，即服务器实时压缩；identity 为不压缩）'
+    )
+    parser.add_argument(
+        '--cache-policy',
+        type=Path,
+        metavar='FILE',
+        help='会话模拟的缓存策略文件（YAML；默认所有资源 max-age + ETag，回访时 304 验证）'
+    )
+    parser.add_argument(
+        '--session',
+        metavar='SOURCE',
+        help='模拟多页面会话：nav（按导航顺序）、synthetic（合成点击序列）或点击记录文件'
+             '（每行一个 URL 路径）'
+    )
+    parser.add_argument(
+        '--session-steps',
+        type=int,
+        default=20,
+        help='合成点击序列的步数（默认: 20）'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='合成点击序列和蒙特卡洛采样的随机种子（默认: 0）'
+    )
+    parser.add_argument(
+        '--samples',
+        type=int,
+        default=0,
+        metavar='N',
+        help='蒙特卡洛采样：每个页面在抖动的网络条件下采样 N 次，报告 p50/p75/p95 及置信区间，并按 p75 判断预算'
+    )
+    parser.add_argument(
+        '--jitter-distribution',
+        choices=DISTRIBUTIONS,
+        default=Jitter().distribution,
+        help='RTT 和带宽的抖动分布（默认: lognormal）'
+    )
+    parser.add_argument(
+        '--rtt-jitter',
+        type=float,
+        default=Jitter().rtt_spread,
+        help=f'RTT 抖动幅度（lognormal 为对数标准差，uniform 为相对幅度；默认: {Jitter().rtt_spread}）'
+    )
+    parser.add_argument(
+        '--bandwidth-jitter',
+        type=float,
+        default=Jitter().bandwidth_spread,
+        help=f'带宽抖动幅度（默认: {Jitter().bandwidth_spread}）'
+    )
+    parser.add_argument(
+        '--waterfall',
+        action='store_true',
+        help='打印每个测试页面的请求瀑布图（隐含 --contributions）'
+    )
+    parser.add_argument(
+        '--contributions',
+        action='store_true',
+        help='--all-pages / --changed-only 时也计算每个阻塞渲染的资源对 FCP 的贡献'
+             '（每个阻塞资源多模拟一次；默认的采样页面测试总是计算）'
+    )
+    parser.add_argument(
+        '--budgets',
+        type=Path,
+        help='性能预算文件（默认: performance-budgets.yml，不存在时使用内置预算）'
+    )
+    parser.add_argument(
+        '--third-party',
+        type=Path,
+        help=f'第三方资源大小清单（默认: {THIRD_PARTY_PATH}，不存在时外部资源按 0 字节计）'
+    )
+    parser.add_argument(
+        '--baseline',
+        type=Path,
+        metavar='REPORT',
+        help='基线加载时间报告；FCP/LCP 增长超过 max_regression_pct 时测试失败'
+    )
+    parser.add_argument(
+        '--history',
+        type=Path,
+        default=HISTORY_PATH,
+        help=f'性能历史数据库（默认: {HISTORY_PATH}）'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='不记录本次运行到性能历史'
+    )
+    args = parser.parse_args()
+    if args.since:
+        args.changed_only = True
+    if args.profiles:
+        args.matrix = True
+        if not args.profiles.exists():
+            parser.error(f"网络配置文件不存在: {args.profiles}")
+    if args.cache_policy and not args.cache_policy.exists():
+        parser.error(f"缓存策略文件不存在: {args.cache_policy}")
+    if args.session not in (None, 'nav', 'synthetic') and not Path(args.session).exists():
+        parser.error(f"点击记录文件不存在: {args.session}")
+    if args.matrix and not NUMPY_AVAILABLE:
+        parser.error("--matrix 需要 NumPy: pip install numpy")
+    if args.samples < 0:
+        parser.error("--samples 不能为负数")
+    if args.samples and not NUMPY_AVAILABLE:
+        parser.error("--samples 需要 NumPy: pip install numpy")
+    if args.baseline and not args.baseline.exists():
+        parser.error(f"基线报告不存在: {args.baseline}")
+    return args
+
 def main():
     """主函数"""
+    args = parse_args()
+    
     print(f"{Colors.BOLD}{Colors.BLUE}")
     print("=" * 80)
     print("页面加载时间测量工具".center(80))
@@ -392,14 +1184,44 @@ def main():
         print_error("错误: site 目录不存在，请先运行 'mkdocs build' 构建站点")
         sys.exit(1)
     
+    budgets = Budgets.load(args.budgets)
+    conditions = NetworkConditions(protocol=args.protocol)
+    assets = AssetIndex(site_dir, args.encoding, ThirdPartyManifest.load(args.third_party))
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
     # 测试页面加载时间
-    results = test_page_load_times(site_dir)
+    results = None
+    if args.changed_only:
+        results = test_changed_pages(site_dir, args.since, conditions, assets, args.waterfall,
+                                     args.contributions or args.waterfall)
+    if results is None and args.all_pages:
+        results = test_all_pages(site_dir, budgets, conditions, assets, jobs,
+                                 args.contributions or args.waterfall)
+    if results is None:
+        results = test_page_load_times(site_dir, budgets, conditions, assets, args.waterfall)
+    
+    # 蒙特卡洛采样（之后的预算判断按 p75）
+    monte_carlo_report = None
+    if args.samples and results:
+        jitter = Jitter(args.jitter_distribution, args.rtt_jitter, args.bandwidth_jitter)
+        monte_carlo_report = test_monte_carlo(results, conditions, args.samples, jitter, args.seed)
     
     # 分析结果
-    analyze_load_time_results(results)
+    analyze_load_time_results(results, budgets)
+    
+    matrix = None
+    if args.matrix and results:
+        matrix = test_network_profiles(results, load_profiles(args.profiles))
+    
+    session = None
+    if args.session:
+        session = test_sessions(site_dir, assets, conditions, args.session, args.session_steps, args.seed,
+                                CachePolicy.load(args.cache_policy))
     
     # 生成报告
-    generate_load_time_report(results)
+    generate_load_time_report(results, conditions, matrix, session, monte_carlo_report)
+    if not args.no_history:
+        record_history(args.history, results)
     
     # 提供优化建议
     provide_performance_recommendations(results)
@@ -407,9 +1229,6 @@ def main():
     # 总结
     print_header("测试总结")
     
-    INDEX_FCP_LIMIT = 1.5
-    CONTENT_FCP_LIMIT = 2.0
-    
     index_result = next((r for r in results if r['is_index']), None)
     content_results = [r for r in results if not r['is_index']]
     
@@ -417,28 +1236,45 @@ def main():
     failed = 0
     
     if index_result:
-        if index_result['fcp_time'] <= INDEX_FCP_LIMIT:
-            print_success(f"首页 FCP: {format_time(index_result['fcp_time'])} < {INDEX_FCP_LIMIT}s")
+        index_violations = check_budgets([index_result], budgets)
+        if not index_violations:
+            value, label = budget_value(index_result, 'fcp')
+            print_success(f"首页 FCP {label}: {format_time(value)} 符合预算".replace(' :', ':'))
             passed += 1
         else:
-            print_error(f"首页 FCP: {format_time(index_result['fcp_time'])} > {INDEX_FCP_LIMIT}s")
+            for violation in index_violations:
+                print_error(violation)
             failed += 1
     
-    content_passed = sum(1 for r in content_results if r['fcp_time'] <= CONTENT_FCP_LIMIT)
-    content_failed = len(content_results) - content_passed
+    content_violations = check_budgets(content_results, budgets)
     
-    if content_passed == len(content_results):
-        print_success(f"所有 {len(content_results)} 个内容页面 FCP < {CONTENT_FCP_LIMIT}s")
+    if not content_violations:
+        print_success(f"所有 {len(content_results)} 个内容页面符合 FCP/LCP 预算")
         passed += 1
     else:
-        print_warning(f"{content_passed}/{len(content_results)} 个内容页面 FCP < {CONTENT_FCP_LIMIT}s")
-        if content_failed > 0:
+        for violation in content_violations:
+            print_warning(violation)
+        failed += 1
+    
+    # 回归检查：明确要求与基线比较时，回归会使脚本返回非零
+    regressions = []
+    if args.baseline:
+        regressions = test_regressions(results, args.baseline, budgets)
+        if not regressions:
+            print_success(f"相对基线 {args.baseline} 没有超过阈值的回归")
+            passed += 1
+        else:
+            for message in regressions:
+                print_error(message)
             failed += 1
     
     print(f"\n通过: {Colors.GREEN}{passed}{Colors.END}")
     print(f"失败: {Colors.RED}{failed}{Colors.END}")
     
-    if failed == 0:
+    if regressions:
+        print(f"\n{Colors.RED}{Colors.BOLD}✗ 加载时间相对基线出现回归{Colors.END}")
+        return 1
+    elif failed == 0:
         print(f"\n{Colors.GREEN}{Colors.BOLD}✓ 所有加载时间测试通过！{Colors.END}")
         return 0
     else:
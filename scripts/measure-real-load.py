@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面加载实测脚本
+在本机启动限速 HTTP 服务器（throttled_server.py）提供 site/，用浏览器式的抓取客户端
+（fetch_client.py）加载页面并记录真实的 FCP / LCP，再与 network_sim 对同一组资源的估算比较，
+用于验证 measure-load-time.py 的模型
+
+- 网络条件默认与 measure-load-time.py 相同（10 Mbps、50ms RTT）
+- 只实现 HTTP/1.1：每个源最多 6 个连接，不模拟 HTTP/2 多路复用
+- 外部资源（CDN 等）不抓取，实测和估算都不包含
+- 每个页面先加载一次预热（服务器压缩缓存），之后取多次实测的中位数
+"""
+
+import asyncio
+import sys
+import time
+import json
+import argparse
+import statistics
+from pathlib import Path
+from typing import Dict, List
+
+from compression import COMPRESSORS, IDENTITY
+from fetch_client import FetchClient
+from network_sim import NetworkConditions, Resource, paint_times, simulate_page
+from throttled_server import ThrottledServer
+
+# 设置 UTF-8 输出
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 实测报告路径
+REPORT_PATH = Path('real-load-report.json')
+
+# 每 Mbps 对应的字节/秒（与 network_sim 一致）
+_MBPS = 1024 * 1024 / 8
+
+# 单次页面加载（HTML 及全部子资源）的默认超时（秒）
+DEFAULT_TIMEOUT = 60.0
+
+# 颜色输出
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+def print_header(text: str):
+    """打印标题"""
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'=' * 80}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{text:^80}{Colors.END}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'=' * 80}{Colors.END}\n")
+
+def print_success(text: str):
+    """打印成功信息"""
+    print(f"{Colors.GREEN}✓ {text}{Colors.END}")
+
+def print_warning(text: str):
+    """打印警告信息"""
+    print(f"{Colors.YELLOW}⚠ {text}{Colors.END}")
+
+def print_error(text: str):
+    """打印错误信息"""
+    print(f"{Colors.RED}✗ {text}{Colors.END}")
+
+def format_time(seconds: float) -> str:
+    """格式化时间"""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    else:
+        return f"{seconds:.2f} s"
+
+def estimate(waterfall: List[Dict], conditions: NetworkConditions) -> List[Dict]:
+    """用 network_sim 模拟实测到的同一组资源（大小和发现位置取实测值）"""
+    html = waterfall[0]
+    resources = [
+        Resource(path=w['path'], kind=w['kind'], size=w['size'], offset=w['offset'],
+                 blocking=w['blocking'], priority=w['priority'], parent=w['parent'])
+        for w in waterfall[1:]
+    ]
+    return simulate_page(html['path'], html['size'], resources, conditions)
+
+def relative_error(measured: float, estimated: float) -> float:
+    """估算相对实测的误差（%）"""
+    return (estimated - measured) / measured * 100 if measured > 0 else 0.0
+
+def print_waterfall(waterfall: List[Dict], width: int = 40):
+    """打印实测瀑布图（- 为建立连接和等待首字节，# 为下载）"""
+    total = max(w['end'] for w in waterfall) or 1.0
+    scale = width / total
+    print(f"    资源{' ' * 44}开始  首字节    完成")
+    for w in waterfall:
+        start, ttfb, end = (round(w[k] * scale) for k in ('start', 'ttfb', 'end'))
+        bar = ' ' * start + '-' * (ttfb - start) + '#' * max(end - ttfb, 1)
+        name = w['path'] if len(w['path']) <= 42 else '…' + w['path'][-41:]
+        marker = '*' if w['blocking'] else ('!' if w['status'] != 200 else ' ')
+        print(f"   {marker}{name:<44} {w['start'] * 1000:>5.0f}ms {w['ttfb'] * 1000:>5.0f}ms "
+              f"{w['end'] * 1000:>5.0f}ms |{bar:<{width}}|")
+    print("    * 阻塞渲染；! 请求失败")
+
+async def measure_page(client: FetchClient, page: str, conditions: NetworkConditions,
+                       runs: int, timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """
+    实测一个页面：预热一次后加载 runs 次，取 FCP 为中位数的一次，
+    并与 network_sim 对同一组资源的估算比较
+
+    每次加载超过 timeout 秒未完成、或 HTML 请求本身失败时，返回 status 为 0 并带 error 的结果。
+    """
+    loads = []
+    for run in range(runs + 1):
+        try:
+            load = await asyncio.wait_for(client.fetch_page(page), timeout)
+        except asyncio.TimeoutError:
+            return {'page': page, 'status': 0, 'error': f'加载超过 {timeout:g} 秒未完成'}
+        html = load['waterfall'][0]
+        if html['error']:
+            return {'page': page, 'status': 0, 'error': html['error']}
+        if run:
+            loads.append((paint_times(load['waterfall'])['fcp_time'], load))
+    loads.sort(key=lambda item: item[0])
+    load = loads[(len(loads) - 1) // 2][1]
+
+    waterfall = load['waterfall']
+    measured = paint_times(waterfall)
+    estimated = paint_times(estimate(waterfall, conditions))
+    fcp_runs = [fcp for fcp, _ in loads]
+    return {
+        'page': page,
+        'status': waterfall[0]['status'],
+        'requests': len(waterfall),
+        'transfer_bytes': sum(w['size'] for w in waterfall),
+        'failed': [w['path'] for w in waterfall if w['status'] != 200],
+        'error': '',
+        'skipped_external': load['skipped'],
+        'fcp_time': measured['fcp_time'],
+        'lcp_time': measured['lcp_time'],
+        'fcp_spread': max(fcp_runs) - min(fcp_runs),
+        'critical_resource': measured['critical_resource'],
+        'estimated_fcp': estimated['fcp_time'],
+        'estimated_lcp': estimated['lcp_time'],
+        'fcp_error_pct': relative_error(measured['fcp_time'], estimated['fcp_time']),
+        'lcp_error_pct': relative_error(measured['lcp_time'], estimated['lcp_time']),
+        'waterfall': waterfall
+    }
+
+async def measure_pages(site_dir: Path, pages: List[str], conditions: NetworkConditions,
+                        encodings: List[str], shared_link: bool, runs: int,
+                        show_waterfall: bool, timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """启动限速服务器并依次实测页面"""
+    server = ThrottledServer(site_dir, conditions, encodings, shared_link)
+    port = await server.start()
+    client = FetchClient('127.0.0.1', port, conditions.max_connections)
+    results = []
+    try:
+        for page in pages:
+            result = await measure_page(client, page, conditions, runs, timeout)
+            results.append(result)
+            if result['error']:
+                print_error(f"{page}: {result['error']}")
+                continue
+            if result['status'] != 200:
+                print_error(f"{page}: HTTP {result['status']}")
+                continue
+            print(f"{Colors.BOLD}{page}{Colors.END}  "
+                  f"{result['requests']} 个请求，{result['transfer_bytes'] / 1024:.1f} KB")
+            print(f"  FCP 实测 {format_time(result['fcp_time']):>9}  估算 {format_time(result['estimated_fcp']):>9}"
+                  f"  误差 {result['fcp_error_pct']:+.1f}%  （多次实测相差 {result['fcp_spread'] * 1000:.0f} ms）")
+            print(f"  LCP 实测 {format_time(result['lcp_time']):>9}  估算 {format_time(result['estimated_lcp']):>9}"
+                  f"  误差 {result['lcp_error_pct']:+.1f}%")
+            if result['failed']:
+                print_warning(f"  {len(result['failed'])} 个资源请求失败: {', '.join(result['failed'][:5])}")
+            if result['skipped_external']:
+                print(f"  跳过 {len(result['skipped_external'])} 个外部资源（实测和估算均不包含）")
+            if show_waterfall:
+                print_waterfall(result['waterfall'])
+            print()
+    finally:
+        await server.close()
+    return {'results': results, 'server': server.stats}
+
+async def serve(site_dir: Path, conditions: NetworkConditions, encodings: List[str],
+                shared_link: bool, port: int):
+    """只启动限速服务器（供浏览器手动访问），Ctrl+C 退出"""
+    server = ThrottledServer(site_dir, conditions, encodings, shared_link)
+    port = await server.start(port=port)
+    print_success(f"限速服务器: http://127.0.0.1:{port}/ （Ctrl+C 退出）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+def generate_report(measurement: Dict, conditions: NetworkConditions, encodings: List[str],
+                    shared_link: bool, runs: int):
+    """生成实测报告"""
+    results = [r for r in measurement['results'] if r['status'] == 200]
+    report = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'test_conditions': {
+            'bandwidth_mbps': conditions.bandwidth_bps / _MBPS,
+            'latency_ms': conditions.rtt_s * 1000,
+            'max_concurrent': conditions.max_connections,
+            'protocol': conditions.protocol,
+            'encodings': encodings or [IDENTITY],
+            'bandwidth_scope': 'link' if shared_link else 'connection',
+            'runs': runs
+        },
+        'summary': {
+            'pages': len(results),
+            'mean_abs_fcp_error_pct': statistics.mean(abs(r['fcp_error_pct']) for r in results) if results else None,
+            'mean_abs_lcp_error_pct': statistics.mean(abs(r['lcp_error_pct']) for r in results) if results else None,
+            'server': measurement['server']
+        },
+        'results': measurement['results']
+    }
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_success(f"实测报告已保存到: {REPORT_PATH}")
+    return report
+
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    defaults = NetworkConditions()
+    parser = argparse.ArgumentParser(description='页面加载实测工具（本机限速服务器）')
+    parser.add_argument(
+        'pages',
+        nargs='*',
+        default=['index.html'],
+        help='要实测的页面（相对 site/，默认: index.html）'
+    )
+    parser.add_argument(
+        '--bandwidth-mbps',
+        type=float,
+        default=defaults.bandwidth_bps / _MBPS,
+        help=f'带宽（默认: {defaults.bandwidth_bps / _MBPS:g} Mbps）'
+    )
+    parser.add_argument(
+        '--rtt-ms',
+        type=float,
+        default=defaults.rtt_s * 1000,
+        help=f'往返延迟（默认: {defaults.rtt_s * 1000:g} ms）'
+    )
+    parser.add_argument(
+        '--encodings',
+        nargs='+',
+        choices=[IDENTITY] + list(COMPRESSORS),
+        default=['gzip-6'],
+        help='服务器支持的压缩编码，按顺序取第一个客户端接受的（默认: gzip-6；identity 为不压缩）'
+    )
+    parser.add_argument(
+        '--bandwidth-scope',
+        choices=['link', 'connection'],
+        default='link',
+        help='带宽限制范围：link 所有连接共享（与模型一致），connection 每个连接单独限速（默认: link）'
+    )
+    parser.add_argument(
+        '--runs',
+        type=int,
+        default=3,
+        help='预热后每个页面的实测次数，取中位数（默认: 3）'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        metavar='PCT',
+        help='估算 FCP/LCP 与实测相差超过该百分比时失败'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f'单次页面加载的超时时间（秒，默认: {DEFAULT_TIMEOUT:g}），超时的页面记为失败'
+    )
+    parser.add_argument(
+        '--waterfall',
+        action='store_true',
+        help='打印每个页面的实测瀑布图'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='只启动限速服务器，供浏览器手动访问'
+    )
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8000,
+        help='--serve 时监听的端口（默认: 8000；实测时使用随机端口）'
+    )
+    args = parser.parse_args()
+    if args.bandwidth_mbps <= 0 or args.rtt_ms < 0:
+        parser.error("带宽必须为正数，RTT 不能为负数")
+    if args.runs < 1:
+        parser.error("--runs 至少为 1")
+    if args.timeout <= 0:
+        parser.error("--timeout 必须为正数")
+    return args
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    site_dir = Path('site')
+    if not site_dir.exists():
+        print_error("错误: site 目录不存在，请先运行 'mkdocs build' 构建站点")
+        sys.exit(1)
+
+    conditions = NetworkConditions(bandwidth_bps=args.bandwidth_mbps * _MBPS, rtt_s=args.rtt_ms / 1000)
+    encodings = [e for e in args.encodings if e != IDENTITY]
+    shared_link = args.bandwidth_scope == 'link'
+
+    if args.serve:
+        try:
+            asyncio.run(serve(site_dir, conditions, encodings, shared_link, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    print_header("页面加载实测")
+    print(f"网络条件: {args.bandwidth_mbps:g} Mbps，RTT {args.rtt_ms:g} ms，HTTP/1.1 每源 "
+          f"{conditions.max_connections} 个连接，编码 {', '.join(encodings) or IDENTITY}\n")
+
+    measurement = asyncio.run(measure_pages(site_dir, args.pages, conditions, encodings, shared_link,
+                                            args.runs, args.waterfall, args.timeout))
+    report = generate_report(measurement, conditions, encodings, shared_link, args.runs)
+
+    failed = [r for r in measurement['results'] if r['status'] != 200]
+    if args.tolerance is not None:
+        failed += [r for r in measurement['results'] if r['status'] == 200 and
+                   max(abs(r['fcp_error_pct']), abs(r['lcp_error_pct'])) > args.tolerance]
+    summary = report['summary']
+    if summary['pages']:
+        print(f"平均误差: FCP {summary['mean_abs_fcp_error_pct']:.1f}%，LCP {summary['mean_abs_lcp_error_pct']:.1f}%")
+    if failed:
+        print_error(f"{len(failed)} 个页面实测失败或误差超出容限")
+        sys.exit(1)
+    print_success("实测完成")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面加载网络模拟
+离散事件模拟浏览器加载一个页面时的网络行为，输出每个资源的瀑布图
+
+- 每个源（origin）一个连接池：HTTP/1.1 最多 6 个连接、每个连接同时只处理一个请求；
+  HTTP/2 只建一个连接，所有请求在其上多路复用
+- 新连接需要 handshake_rtts 个 RTT（TCP + TLS），每个请求再需要 1 个 RTT 得到首字节；
+  第三方源（origin 非空）的第一个连接之前还要 dns_rtts 个 RTT 解析域名
+  （页面所在源的 DNS 视为已解析）
+- 正在传输的资源平分带宽（不模拟 TCP 慢启动）
+- 子资源在 HTML 下载到其引用位置时被发现（预加载扫描器），按优先级和发现顺序排队；
+  样式表引用的字体、图片和 @import 在该样式表下载完成后才被发现
+
+profile_matrix() 用同一模型的闭式近似，以 NumPy 数组一次计算所有页面 × 网络配置；
+monte_carlo() 用同一近似对随机抖动的网络条件批量采样。
+"""
+
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 浮点误差容限（字节 / 秒）
+_EPS = 1e-9
+
+# 抖动分布
+DISTRIBUTIONS = ['lognormal', 'uniform']
+
+
+class NetworkConditions(NamedTuple):
+    """网络条件"""
+    bandwidth_bps: float = 10 * 1024 * 1024 / 8   # 10 Mbps，典型家庭宽带
+    rtt_s: float = 0.050                          # 往返延迟 50ms
+    protocol: str = 'http/1.1'                    # 'http/1.1' 或 'h2'
+    max_connections: int = 6                      # HTTP/1.1 每个源的最大连接数
+    handshake_rtts: int = 2                       # 新连接的握手往返数（TCP + TLS 1.3）
+    dns_rtts: int = 1                             # 第三方源的 DNS 解析往返数
+
+
+PROTOCOLS = ['http/1.1', 'h2']
+
+# 每 Mbps 对应的字节/秒（与 NetworkConditions 默认值的换算一致）
+_MBPS = 1024 * 1024 / 8
+
+# 内置网络配置（带宽与 RTT 取自 WebPageTest 的同名预设）
+NETWORK_PROFILES: Dict[str, NetworkConditions] = {
+    'slow-3g': NetworkConditions(bandwidth_bps=0.4 * _MBPS, rtt_s=0.400),
+    'fast-3g': NetworkConditions(bandwidth_bps=1.6 * _MBPS, rtt_s=0.150),
+    '4g': NetworkConditions(bandwidth_bps=9 * _MBPS, rtt_s=0.170),
+    'cable': NetworkConditions(bandwidth_bps=5 * _MBPS, rtt_s=0.028),
+    'broadband': NetworkConditions(),
+}
+
+
+def load_profiles(path: Optional[Path] = None) -> Dict[str, NetworkConditions]:
+    """
+    内置网络配置，加上配置文件中的自定义配置（同名时覆盖内置配置）
+
+    配置文件格式:
+        profiles:
+          campus-wifi:
+            bandwidth_mbps: 2
+            rtt_ms: 300
+            protocol: h2          # 可选，默认 http/1.1
+            max_connections: 6    # 可选
+    """
+    profiles = dict(NETWORK_PROFILES)
+    if path is None:
+        return profiles
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    for name, spec in (config.get('profiles') or {}).items():
+        if 'bandwidth_mbps' not in spec or 'rtt_ms' not in spec:
+            raise ValueError(f"网络配置 {name} 缺少 bandwidth_mbps 或 rtt_ms")
+        protocol = spec.get('protocol', 'http/1.1')
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"网络配置 {name} 的协议未知: {protocol}")
+        profiles[name] = NetworkConditions(
+            bandwidth_bps=spec['bandwidth_mbps'] * _MBPS,
+            rtt_s=spec['rtt_ms'] / 1000,
+            protocol=protocol,
+            max_connections=spec.get('max_connections', 6),
+            handshake_rtts=spec.get('handshake_rtts', 2),
+            dns_rtts=spec.get('dns_rtts', 1)
+        )
+    return profiles
+
+
+class Resource(NamedTuple):
+    """页面引用的子资源"""
+    path: str
+    kind: str                 # css / js / img / font / other
+    size: int
+    offset: int = 0           # 在 HTML 中的字节位置（下载到这里时被发现）
+    blocking: bool = False    # 是否阻塞首次渲染
+    priority: int = 1         # 数值越小越先发送
+    origin: str = ''          # 空字符串表示与页面同源
+    parent: Optional[str] = None   # 引用它的样式表（由 HTML 直接引用时为 None）
+
+
+class _Transfer:
+    """模拟过程中的单个请求状态"""
+    __slots__ = ('resource', 'remaining', 'start', 'ttfb', 'end', 'connection')
+
+    def __init__(self, resource: Resource):
+        self.resource = resource
+        self.remaining = float(resource.size)
+        self.start: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.end: Optional[float] = None
+        self.connection: Optional[List] = None
+
+
+class _ConnectionPool:
+    """单个源的连接池；连接表示为 [可用时间, 是否占用]"""
+
+    def __init__(self, conditions: NetworkConditions, third_party: bool = False):
+        self.conditions = conditions
+        self.connections: List[List] = []
+        # 域名解析完成的时间（第一次建立连接时确定）
+        self.resolved: Optional[float] = None
+        self.dns_s = conditions.dns_rtts * conditions.rtt_s if third_party else 0.0
+
+    def _connect(self, now: float, busy: bool) -> List:
+        if self.resolved is None:
+            self.resolved = now + self.dns_s
+        c = self.conditions
+        conn = [max(now, self.resolved) + c.handshake_rtts * c.rtt_s, busy]
+        self.connections.append(conn)
+        return conn
+
+    def acquire(self, now: float) -> Optional[List]:
+        """取得一个可发送请求的连接；HTTP/1.1 连接用满时返回 None"""
+        c = self.conditions
+        if c.protocol == 'h2':
+            if not self.connections:
+                self._connect(now, False)
+            return self.connections[0]
+        for conn in self.connections:
+            if not conn[1]:
+                conn[1] = True
+                return conn
+        if len(self.connections) < c.max_connections:
+            return self._connect(now, True)
+        return None
+
+    @staticmethod
+    def release(conn: List, now: float):
+        conn[0] = max(conn[0], now)
+        conn[1] = False
+
+
+def simulate_page(html_path: str, html_size: int, resources: List[Resource],
+                  conditions: NetworkConditions = NetworkConditions()) -> List[Dict]:
+    """
+    模拟加载 HTML 及其子资源
+
+    返回瀑布图：每个请求一条 {path, kind, size, offset, blocking, parent, start, ttfb, end}（秒），
+    第一条是 HTML 本身，其余与 resources 顺序一致。
+    start 为请求进入连接的时间（含建立连接），ttfb 为收到首字节的时间。
+    """
+    transfers = [_Transfer(Resource(html_path, 'html', html_size, blocking=True, priority=0))]
+    transfers += [_Transfer(r) for r in resources]
+    html = transfers[0]
+
+    pools: Dict[str, _ConnectionPool] = {}
+    # 所属样式表也在本次请求中的资源等样式表下载完才被发现；
+    # 样式表已缓存（不请求）时按样式表在 HTML 中的位置发现
+    by_path = {t.resource.path: t for t in transfers}
+    dependent = [t for t in transfers[1:] if t.resource.parent in by_path]
+    undiscovered = sorted((t for t in transfers[1:] if t.resource.parent not in by_path),
+                          key=lambda t: t.resource.offset)
+    pending = [html]          # 已发现、等待连接
+    waiting: List[_Transfer] = []   # 已发送、等待首字节
+    active: List[_Transfer] = []    # 正在接收
+    now = 0.0
+
+    while pending or waiting or active or undiscovered or dependent:
+        # 发现：HTML 已接收到引用位置的资源
+        html_done = html.end is not None
+        received = html.resource.size - html.remaining if html in active or html_done else -1.0
+        while undiscovered and (html_done or undiscovered[0].resource.offset <= received + _EPS):
+            pending.append(undiscovered.pop(0))
+        for t in [t for t in dependent if by_path[t.resource.parent].end is not None]:
+            dependent.remove(t)
+            pending.append(t)
+
+        # 分配连接：按优先级，再按发现顺序
+        pending.sort(key=lambda t: t.resource.priority)
+        still_pending = []
+        for t in pending:
+            origin = t.resource.origin
+            if origin not in pools:
+                pools[origin] = _ConnectionPool(conditions, third_party=bool(origin))
+            pool = pools[origin]
+            conn = pool.acquire(now)
+            if conn is None:
+                still_pending.append(t)
+                continue
+            t.start = now
+            t.connection = conn
+            t.ttfb = max(now, conn[0]) + conditions.rtt_s
+            waiting.append(t)
+        pending = still_pending
+
+        # 下一个事件：首字节到达、传输完成或 HTML 到达下一个引用位置
+        rate = conditions.bandwidth_bps / len(active) if active else 0.0
+        candidates = [t.ttfb for t in waiting]
+        candidates += [now + t.remaining / rate for t in active]
+        if html in active and undiscovered:
+            candidates.append(now + max(0.0, undiscovered[0].resource.offset - received) / rate)
+        if not candidates:
+            break  # 剩余请求无法发送（不应发生）
+        next_time = max(now, min(candidates))
+
+        # 推进时间：在途传输平分带宽
+        for t in active:
+            t.remaining -= rate * (next_time - now)
+        now = next_time
+
+        for t in [t for t in waiting if t.ttfb <= now + _EPS]:
+            waiting.remove(t)
+            active.append(t)
+        for t in [t for t in active if t.remaining <= _EPS]:
+            active.remove(t)
+            t.remaining = 0.0
+            t.end = now
+            if conditions.protocol != 'h2':
+                _ConnectionPool.release(t.connection, now)
+
+    return [
+        {
+            'path': t.resource.path,
+            'kind': t.resource.kind,
+            'size': t.resource.size,
+            'offset': t.resource.offset,
+            'blocking': t.resource.blocking,
+            'parent': t.resource.parent,
+            'origin': t.resource.origin,
+            'start': t.start,
+            'ttfb': t.ttfb,
+            'end': t.end
+        }
+        for t in transfers
+    ]
+
+
+def paint_times(waterfall: List[Dict]) -> Dict:
+    """
+    由瀑布图推导 FCP / LCP
+
+    FCP：HTML 和所有阻塞渲染的资源都到达的时间（关键路径上最晚的一个）；
+    LCP：FCP 与最大图片到达时间中较晚者。
+    """
+    blocking = [w for w in waterfall if w['blocking']]
+    critical = max(blocking, key=lambda w: w['end'])
+    fcp = critical['end']
+
+    images = [w for w in waterfall if w['kind'] == 'img']
+    lcp = fcp
+    if images:
+        largest = max(images, key=lambda w: w['size'])
+        lcp = max(fcp, largest['end'])
+    return {
+        'fcp_time': fcp,
+        'lcp_time': lcp,
+        'critical_resource': critical['path']
+    }
+
+
+class Jitter(NamedTuple):
+    """
+    网络条件的随机抖动
+
+    lognormal：中位数等于基准值，spread 为对数标准差（0.5 约相当于一半的样本在 0.7–1.4 倍之间）；
+    uniform：在基准值的 [1 - spread, 1 + spread] 倍之间均匀分布。
+    """
+    distribution: str = 'lognormal'
+    rtt_spread: float = 0.35
+    bandwidth_spread: float = 0.5
+
+
+def sample_conditions(base: NetworkConditions, samples: int, jitter: Jitter = Jitter(),
+                      rng=None) -> Tuple:
+    """按抖动分布抽取 samples 组 (带宽, RTT)，返回两个一维数组"""
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("蒙特卡洛采样需要 NumPy: pip install numpy")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    def draw(value, spread):
+        if jitter.distribution == 'lognormal':
+            return value * rng.lognormal(0.0, spread, samples)
+        low = max(1 - spread, 0.05)
+        return value * rng.uniform(low, 1 + spread, samples)
+
+    return draw(base.bandwidth_bps, jitter.bandwidth_spread), draw(base.rtt_s, jitter.rtt_spread)
+
+
+def monte_carlo(waterfalls: List[List[Dict]], base: NetworkConditions, samples: int,
+                jitter: Jitter = Jitter(), seed: int = 0, batch: int = 256) -> Dict:
+    """
+    在抖动的网络条件下对所有页面采样 FCP / LCP，返回 {'fcp': 数组[页面, 样本], 'lcp': ...}
+
+    每批 batch 组条件与所有页面广播计算（profile_matrix 的闭式近似），限制中间数组的大小。
+    近似值按页面乘以校正系数：基准条件下 simulate_page 的结果 / 闭式近似的结果，
+    使采样分布以离散事件模拟为中心。固定种子保证结果可复现。
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("蒙特卡洛采样需要 NumPy: pip install numpy")
+
+    pages = _page_arrays(waterfalls)
+    network = dict(h2=base.protocol == 'h2', handshake=base.handshake_rtts,
+                   connections=base.max_connections)
+
+    # 校正系数 [页面, 1]
+    approx = _paint_arrays(pages, bw=base.bandwidth_bps, rtt=base.rtt_s, **network)
+    simulated = [paint_times(w) for w in waterfalls]
+    correction = {
+        metric: np.array([p[f'{metric}_time'] for p in simulated])[:, None] / np.maximum(approx[metric], _EPS)
+        for metric in ('fcp', 'lcp')
+    }
+
+    bandwidth, rtt = sample_conditions(base, samples, jitter, np.random.default_rng(seed))
+    result = {metric: np.empty((len(waterfalls), samples)) for metric in ('fcp', 'lcp')}
+    for start in range(0, samples, batch):
+        end = min(start + batch, samples)
+        paint = _paint_arrays(pages, bw=bandwidth[None, start:end], rtt=rtt[None, start:end], **network)
+        for metric in result:
+            result[metric][:, start:end] = paint[metric] * correction[metric]
+    return result
+
+
+def quantile_ci(values, q: float, confidence: float = 0.95, axis: int = -1) -> Tuple:
+    """
+    沿 axis 的 q 分位数（0-1）及其置信区间，返回 (估计值, 下限, 上限)
+
+    置信区间由顺序统计量给出（分位数的二项分布正态近似，不依赖分布形状）。
+    confidence 为 (0, 1) 之间的任意置信水平。
+    """
+    if not 0 < confidence < 1:
+        raise ValueError(f"置信水平必须在 0 和 1 之间: {confidence}")
+    ordered = np.sort(values, axis=axis)
+    n = ordered.shape[axis]
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half = z * np.sqrt(n * q * (1 - q))
+    low = int(np.clip(np.floor(n * q - half), 0, n - 1))
+    high = int(np.clip(np.ceil(n * q + half), 0, n - 1))
+    estimate = np.quantile(ordered, q, axis=axis)
+    return estimate, np.take(ordered, low, axis=axis), np.take(ordered, high, axis=axis)
+
+
+def profile_matrix(waterfalls: List[List[Dict]], profiles: Dict[str, NetworkConditions]) -> Dict:
+    """
+    所有页面 × 网络配置的 FCP / LCP（秒），返回 {'fcp': 数组[页面, 配置], 'lcp': ...}
+
+    waterfalls 为各页面 simulate_page() 的结果（只使用其中的资源大小、类型、
+    发现位置和发现顺序）。页面的资源被打包成补零的二维数组，与各配置的
+    带宽/RTT/连接数广播计算，不在 Python 中逐个页面或配置循环。
+
+    使用 simulate_page 调度模型的闭式近似：
+    - HTML 在 (握手 + 1) 个 RTT 后开始到达；子资源在新连接（HTTP/2 复用 HTML 的连接）
+      上再经 1 个 RTT 到达首字节，之后与仍在下载的 HTML 一起平分带宽
+    - HTTP/1.1 连接不足时，每多一轮请求增加 1 个 RTT
+    - FCP 为 HTML 到达、关键路径上所有字节（按发现顺序截至最后一个阻塞资源）到达，
+      以及最后一个阻塞资源被发现后单独下载完成三者中最晚者
+    - LCP 为 FCP 与截至最大图片的字节到达时间中较晚者
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("多网络配置矩阵需要 NumPy: pip install numpy")
+
+    conds = list(profiles.values())
+    return _paint_arrays(
+        _page_arrays(waterfalls),
+        bw=np.array([c.bandwidth_bps for c in conds])[None, :],
+        rtt=np.array([c.rtt_s for c in conds])[None, :],
+        h2=np.array([c.protocol == 'h2' for c in conds])[None, :],
+        handshake=np.array([c.handshake_rtts for c in conds])[None, :],
+        connections=np.array([c.max_connections for c in conds])[None, :]
+    )
+
+
+def _page_arrays(waterfalls: List[List[Dict]]) -> Dict:
+    """把各页面的瀑布图打包为按页面排列的关键路径统计（profile_matrix 的输入）"""
+    pages = len(waterfalls)
+    width = max([len(w) - 1 for w in waterfalls] + [1])
+    sizes = np.zeros((pages, width))
+    offsets = np.zeros((pages, width))
+    blocking = np.zeros((pages, width), dtype=bool)
+    images = np.zeros((pages, width), dtype=bool)
+    valid = np.zeros((pages, width), dtype=bool)
+    html_size = np.zeros(pages)
+    for p, waterfall in enumerate(waterfalls):
+        html_size[p] = waterfall[0]['size']
+        for r, w in enumerate(waterfall[1:]):
+            sizes[p, r] = w['size']
+            offsets[p, r] = w.get('offset', 0)
+            blocking[p, r] = w['blocking']
+            images[p, r] = w['kind'] == 'img'
+            valid[p, r] = True
+
+    # 每个页面的关键路径统计（按发现顺序）
+    order = np.arange(width)
+    last_blocking = np.where(blocking, order, -1).max(axis=1)
+    rows = np.arange(pages)
+    last_index = np.maximum(last_blocking, 0)
+    fcp_mask = valid & (order <= last_blocking[:, None])
+
+    largest = np.where(images, sizes, -1).argmax(axis=1)
+    lcp_mask = valid & ((order <= largest[:, None]) | blocking)
+
+    # 以下统计均为一维 [页面]，计算时补成列向量与配置广播
+    return {
+        'html_size': html_size,
+        'has_blocking': last_blocking >= 0,
+        'last_offset': offsets[rows, last_index],
+        'last_size': sizes[rows, last_index],
+        'fcp_bytes': (sizes * fcp_mask).sum(axis=1),
+        'fcp_count': blocking.sum(axis=1),
+        'has_image': images.any(axis=1),
+        'lcp_bytes': (sizes * lcp_mask).sum(axis=1),
+        'lcp_count': lcp_mask.sum(axis=1)
+    }
+
+
+def _paint_arrays(pages: Dict, bw, rtt, h2, handshake, connections) -> Dict:
+    """
+    闭式近似的 FCP / LCP，返回形状 [页面, 条件] 的数组
+
+    网络参数为形状 [1, 条件] 的数组（也可以是标量）。
+    """
+    def col(name):
+        return pages[name][:, None]
+
+    html_ttfb = (handshake + 1) * rtt
+    html_end = html_ttfb + col('html_size') / bw
+    sub_latency = (np.where(h2, 0, handshake) + 1) * rtt
+    sub_ready = html_ttfb + sub_latency
+    html_left = np.maximum(col('html_size') - sub_latency * bw, 0)
+
+    def waves(count):
+        return np.where(h2, np.minimum(count, 1), np.ceil(count / connections))
+
+    fcp_flow = sub_ready + np.maximum(waves(col('fcp_count')) - 1, 0) * rtt + (html_left + col('fcp_bytes')) / bw
+    fcp_late = html_ttfb + col('last_offset') / bw + sub_latency + col('last_size') / bw
+    fcp = np.where(col('has_blocking'), np.maximum.reduce([html_end, fcp_flow, fcp_late]), html_end)
+
+    lcp_flow = sub_ready + np.maximum(waves(col('lcp_count')) - 1, 0) * rtt + (html_left + col('lcp_bytes')) / bw
+    lcp = np.where(col('has_image'), np.maximum(fcp, lcp_flow), fcp)
+    return {'fcp': fcp, 'lcp': lcp}
@@ -4,13 +4,25 @@ Image Optimization Script for Zephyr Learning System
 
 This script optimizes images in the docs/assets/images directory:
 - Compresses PNG and JPEG images (requires Pillow)
-- Optimizes SVG files (built-in)
+- Minifies SVG files (built-in, see svg_minify.py); the rendered structure is
+  verified before a file is rewritten
 - Reports file size savings
+- Generates responsive WebP/AVIF variants (480/960/1440/2000w by default) and
+  indexes them in image-variants.json for scripts/responsive-images.py
+- Records content hashes in image-manifest.json (committed next to the
+  images) and skips unchanged images on later runs, including in fresh clones
+  and CI (JPEG is never re-encoded twice; stale WebP is rebuilt alone)
+- Optionally searches the JPEG/WebP quality per image for the smallest encode
+  that reaches a target SSIM (--target-ssim, requires NumPy)
 
 Usage:
     python scripts/optimize-images.py
     python scripts/optimize-images.py --dry-run
     python scripts/optimize-images.py --target-dir docs/assets/images/hardware
+    python scripts/optimize-images.py --jobs 0    # one worker per CPU core
+    python scripts/optimize-images.py --force     # ignore the manifest
+    python scripts/optimize-images.py --widths 640,1280
+    python scripts/optimize-images.py --target-ssim 0.99
 
 Note: For full image optimization (PNG/JPEG), install Pillow:
     pip install pillow
@@ -19,15 +31,21 @@ Note: For full image optimization (PNG/JPEG), install Pillow:
     pip install pillow --only-binary :all:
 """
 
+import io
 import os
 import sys
+import json
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # Try to import Pillow, but make it optional
 try:
-    from PIL import Image
+    from PIL import Image, features
     PILLOW_AVAILABLE = True
 except ImportError:
     PILLOW_AVAILABLE = False
@@ -36,21 +54,256 @@ except ImportError:
     print("  pip install pillow --only-binary :all:")
     print()
 
-import xml.etree.ElementTree as ET
+from image_quality import DEFAULT_TARGET_SSIM, NUMPY_AVAILABLE, search_quality
+from image_variants import (
+    CONTENT_WIDTH, DEFAULT_WIDTHS, FORMATS, VARIANTS_INDEX, index_entry, ladder, save_index, variant_path,
+    variant_collisions, variant_pattern
+)
+from svg_minify import SvgStructureError, minify_svg
+
+# AVIF needs Pillow >= 11.2 built with libavif, or the pillow-avif-plugin package
+AVIF_AVAILABLE = False
+if PILLOW_AVAILABLE:
+    AVIF_AVAILABLE = 'avif' in features.modules and features.check_module('avif')
+    if not AVIF_AVAILABLE:
+        try:
+            import pillow_avif  # noqa: F401  (registers the AVIF codec)
+            AVIF_AVAILABLE = True
+        except ImportError:
+            pass
+
+# Default manifest location (relative to the working directory). The manifest
+# is committed next to the images; mkdocs.yml excludes it from the site
+MANIFEST_PATH = Path('docs/assets/images/image-manifest.json')
+# Where earlier versions kept an uncommitted manifest; adopted when found
+LEGACY_MANIFEST_PATH = Path('image-manifest.json')
+
+# Encoder settings, recorded in the manifest: changing any of them
+# re-optimizes every affected PNG on the next run. JPEGs are lossy, so a
+# JPEG that is still the recorded output only gets its derived files rebuilt
+# (re-encoding it would compress its own compressed output); --force
+# re-encodes it
+RASTER_SETTINGS = {
+    'max_dimension': 2000,
+    'png': {'optimize': True, 'compress_level': 9},
+    'jpeg': {'quality': 85, 'optimize': True, 'progressive': True},
+    'webp': {'quality': 80, 'method': 6}
+}
+# 'minifier' is bumped whenever svg_minify.py changes its output
+SVG_SETTINGS = {'minifier': 1, 'precision': 3}
+# Responsive variants (the WebP ladder uses RASTER_SETTINGS['webp']); changing
+# these only regenerates derived files
+AVIF_SETTINGS = {'quality': 60}
+# Perceptual quality search (--target-ssim): JPEG/WebP qualities are searched
+# in this range and scored at the width images are displayed at (the content
+# column on a 2x screen); the fixed qualities above are reported as baseline
+QUALITY_SEARCH = {'min_quality': 40, 'max_quality': 95, 'score_width': CONTENT_WIDTH * 2}
+LOSSY_SUFFIXES = ('.jpg', '.jpeg')
+
+
+def file_digest(file_path: Path) -> str:
+    """SHA-256 of a file's content"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def file_record(file_path: Path) -> Dict:
+    """Hash, size and mtime of a file (the mtime only goes to the local stat cache)"""
+    stat = file_path.stat()
+    return {'hash': file_digest(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ImageManifest:
+    """
+    Content-hash manifest of optimized images
+    
+    Each entry records the source hash (before optimization), the output
+    (the file as written), the settings used and the derived files (WebP).
+    An image is fresh when its content still matches the recorded output and
+    the settings are unchanged.
+    
+    The manifest is committed, so it only holds hashes and sizes: a fresh
+    checkout recognizes already optimized images by content. File mtimes go
+    to a local, uncommitted stat cache next to it (image-manifest.local.json);
+    when size + mtime match, an unchanged tree is verified without reading
+    any file, otherwise the content hash decides.
+    """
+    
+    # Bump when the optimization logic changes; older manifests are ignored
+    VERSION = 1
+    
+    FRESH = 'fresh'
+    DERIVED = 'derived'  # image is fresh, but derived files are missing or stale
+    STALE = 'stale'
+    
+    def __init__(self, path: Path, entries: Optional[Dict[str, Dict]] = None,
+                 mtimes: Optional[Dict[str, List]] = None):
+        self.path = path
+        self.entries = entries or {}
+        self.mtimes = mtimes or {}  # file key -> [mtime_ns, hash] (local stat cache)
+        self.dirty = False
+        self.mtimes_dirty = False
+        # Manifests written before the stat cache was split off kept mtimes inline
+        for key, entry in self.entries.items():
+            self._take_mtimes(path.parent / key, entry)
+    
+    @property
+    def stat_path(self) -> Path:
+        """Local stat cache file (not committed)"""
+        return self.path.with_name(self.path.stem + '.local.json')
+    
+    @classmethod
+    def load(cls, path: Path) -> 'ImageManifest':
+        """Read a manifest; a missing, unreadable or outdated file gives an empty one"""
+        data = cls._read(path)
+        if data is None or data.get('version') != cls.VERSION:
+            return cls(path)
+        manifest = cls(path, data.get('images', {}))
+        mtimes = cls._read(manifest.stat_path)
+        if mtimes is not None and mtimes.get('version') == cls.VERSION:
+            manifest.mtimes.update(mtimes.get('files', {}))
+        return manifest
+    
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict]:
+        """Parse a JSON file; None when it is missing or unreadable"""
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable manifest {path}: {e}")
+            return None
+    
+    def adopt(self, other: 'ImageManifest') -> None:
+        """Take over the entries of a manifest stored elsewhere (re-keyed to this location)"""
+        for key, entry in other.entries.items():
+            self.entries[self.key(other.path.parent / key)] = entry
+            self.dirty = True
+    
+    def key(self, image_path: Path) -> str:
+        """Manifest key: image path relative to the manifest's directory"""
+        return Path(os.path.relpath(image_path.absolute(), self.path.absolute().parent)).as_posix()
+    
+    def status(self, image_path: Path, settings: Dict, derived_settings: Dict) -> str:
+        """FRESH, DERIVED or STALE"""
+        entry = self.entries.get(self.key(image_path))
+        if entry is None or not self._matches(image_path, entry['output']):
+            return self.STALE
+        if entry['settings'] != settings:
+            # Never re-encode a JPEG from its own lossy output; only its derived files follow the new settings
+            return self.DERIVED if image_path.suffix.lower() in LOSSY_SUFFIXES else self.STALE
+        if entry.get('derived_settings') != derived_settings:
+            return self.DERIVED
+        for name, record in entry['derived'].items():
+            if not self._matches(image_path.with_name(name), record):
+                return self.DERIVED
+        return self.FRESH
+    
+    def source_hash(self, image_path: Path) -> str:
+        """Recorded hash of the image before it was optimized"""
+        return self.entries[self.key(image_path)]['source']
+    
+    def _matches(self, file_path: Path, record: Dict) -> bool:
+        """Whether a file still has the recorded content (stat first, then hash)"""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False
+        if stat.st_size != record['size']:
+            return False
+        key = self.key(file_path)
+        if self.mtimes.get(key) == [stat.st_mtime_ns, record['hash']]:
+            return True
+        if file_digest(file_path) != record['hash']:
+            return False
+        # Same content with a new mtime (checkout, copy): refresh the fast path
+        self.mtimes[key] = [stat.st_mtime_ns, record['hash']]
+        self.mtimes_dirty = True
+        return True
+    
+    def _take_mtimes(self, image_path: Path, entry: Dict) -> None:
+        """Move the mtimes of an entry's files into the stat cache"""
+        files = [(image_path, entry['output'])]
+        files += [(image_path.with_name(name), record) for name, record in entry['derived'].items()]
+        for file_path, record in files:
+            mtime_ns = record.pop('mtime_ns', None)
+            if mtime_ns is not None:
+                self.mtimes[self.key(file_path)] = [mtime_ns, record['hash']]
+                self.mtimes_dirty = self.dirty = True
+    
+    def update(self, records: Dict[str, Dict]) -> None:
+        """Store entries produced by ImageOptimizer.record() (keyed by image path)"""
+        for image_path, entry in records.items():
+            key = self.key(Path(image_path))
+            previous = self.entries.get(key)
+            # Regenerating only the derived files leaves the JPEG untouched, so
+            # the quality it was searched at still applies
+            if (previous and 'jpeg' in previous.get('quality', {})
+                    and 'jpeg' not in entry.get('quality', {})
+                    and previous['output']['hash'] == entry['output']['hash']):
+                entry.setdefault('quality', {})['jpeg'] = previous['quality']['jpeg']
+            self._take_mtimes(Path(image_path), entry)
+            self.entries[key] = entry
+            self.dirty = True
+    
+    def save(self) -> None:
+        """Write the manifest if anything changed, dropping entries for deleted images"""
+        base_dir = self.path.parent
+        missing = [key for key in self.entries if not (base_dir / key).exists()]
+        for key in missing:
+            del self.entries[key]
+        stale = [key for key in self.mtimes if not (base_dir / key).exists()]
+        for key in stale:
+            del self.mtimes[key]
+        if self.dirty or missing:
+            self._write(self.path, {'version': self.VERSION, 'images': self.entries})
+            self.dirty = False
+        if self.mtimes_dirty or stale:
+            self._write(self.stat_path, {'version': self.VERSION, 'files': self.mtimes})
+            self.mtimes_dirty = False
+    
+    @staticmethod
+    def _write(path: Path, data: Dict) -> None:
+        """Write JSON atomically (stable key order and a final newline keep diffs small)"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, path)
 
 
 class ImageOptimizer:
     """Optimize images for web delivery"""
     
-    def __init__(self, dry_run: bool = False, verbose: bool = False):
+    def __init__(self, dry_run: bool = False, verbose: bool = False, jobs: int = 1,
+                 manifest: Optional[ImageManifest] = None, force: bool = False,
+                 widths: List[int] = DEFAULT_WIDTHS, target_ssim: Optional[float] = None):
         self.dry_run = dry_run
         self.verbose = verbose
+        self.jobs = jobs
+        self.widths = sorted(set(widths))
+        self.formats = [fmt for fmt in FORMATS if fmt != 'avif' or AVIF_AVAILABLE]
+        self.manifest = manifest
+        self.force = force
+        self.target_ssim = target_ssim
+        self.records: Dict[str, Dict] = {}
+        self.qualities: Dict[str, Dict] = {}
         self.stats = {
             'processed': 0,
+            'regenerated': 0,
+            'unchanged': 0,
             'skipped': 0,
             'errors': 0,
             'original_size': 0,
-            'optimized_size': 0
+            'optimized_size': 0,
+            'quality_searches': 0,
+            'quality_bytes': 0,
+            'baseline_bytes': 0
         }
     
     def optimize_directory(self, directory: Path) -> None:
@@ -65,29 +318,287 @@ class ImageOptimizer:
             print("No images found to optimize.")
             return
         
-        print(f"Found {len(image_files)} images to process.\n")
+        # Derived file names only use the stem, so board.png and board.jpg
+        # would overwrite each other's WebP and variants on every run
+        collisions = variant_collisions([path for path in image_files if path.suffix.lower() != '.svg'])
+        for image_path, other in sorted(collisions.items()):
+            print(f"❌ {image_path.name}: WebP/AVIF variant names clash with {other.name}, "
+                  f"rename one of them (skipped)")
+            self.stats['errors'] += 1
+        image_files = [path for path in image_files if path not in collisions]
+        
+        tasks = self.plan(image_files)
+        if self.stats['unchanged']:
+            print(f"Found {len(image_files)} images, {self.stats['unchanged']} unchanged since the last run.\n")
+        else:
+            print(f"Found {len(image_files)} images to process.\n")
+        
+        if self.jobs > 1 and len(tasks) > 1:
+            self.optimize_parallel(tasks)
+        else:
+            for image_path, source_hash in tasks:
+                self.run_task(image_path, source_hash)
+        
+        if self.manifest is not None and not self.dry_run:
+            self.manifest.update(self.records)
+            self.manifest.save()
+        if PILLOW_AVAILABLE and not self.dry_run:
+            self.write_variant_index(directory, image_files)
+        
+        self.print_summary()
+    
+    def plan(self, image_files: List[Path]) -> List[Tuple[Path, Optional[str]]]:
+        """
+        Check images against the manifest.
+        
+        Returns (image, source hash) tasks: the source hash is None for a full
+        optimization, or the recorded hash when only derived files (WebP and
+        responsive variants) are stale. Fresh images are counted as unchanged and dropped.
+        """
+        if self.manifest is None or self.force:
+            return [(path, None) for path in image_files]
         
+        tasks = []
         for image_path in image_files:
+            status = self.manifest.status(image_path, self.settings_for(image_path),
+                                          self.derived_settings(image_path))
+            if status == ImageManifest.FRESH:
+                if self.verbose:
+                    print(f"○ {image_path.name}: Unchanged")
+                self.stats['unchanged'] += 1
+            elif status == ImageManifest.DERIVED:
+                tasks.append((image_path, self.manifest.source_hash(image_path)))
+            else:
+                tasks.append((image_path, None))
+        return tasks
+    
+    def run_task(self, image_path: Path, source_hash: Optional[str]) -> None:
+        """Optimize an image, or only regenerate its derived files"""
+        if source_hash is None:
             self.optimize_image(image_path)
+        else:
+            self.regenerate_derived(image_path, source_hash)
+    
+    def optimize_parallel(self, tasks: List[Tuple[Path, Optional[str]]]) -> None:
+        """
+        Optimize images in a process pool.
         
-        self.print_summary()
+        Each worker optimizes one image with its own ImageOptimizer and returns
+        its stats, manifest records and captured output; the parent merges them
+        and prints each image's output as one block, in completion order.
+        """
+        crashed = []
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(tasks))) as executor:
+            futures = {
+                executor.submit(_optimize_in_worker, task, self.dry_run, self.verbose, self.widths,
+                                self.target_ssim): task
+                for task in tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    crashed.append(futures[future])
+                    continue
+                self.merge_result(*result)
+        
+        # A worker that dies (e.g. a decoder crash) breaks the whole pool, so
+        # every unfinished image lands here; retry them one pool each so only
+        # the culprit is reported as an error.
+        for task in crashed:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                try:
+                    result = executor.submit(_optimize_in_worker, task, self.dry_run, self.verbose,
+                                             self.widths, self.target_ssim).result()
+                except BrokenProcessPool:
+                    print(f"❌ Error processing {task[0].name}: worker process crashed")
+                    self.stats['errors'] += 1
+                    continue
+            self.merge_result(*result)
+    
+    def merge_result(self, stats: Dict[str, int], records: Dict[str, Dict], output: str) -> None:
+        """Add a worker's stats and manifest records to ours and print its output"""
+        for key, value in stats.items():
+            self.stats[key] += value
+        self.records.update(records)
+        print(output, end='', flush=True)
+    
+    def settings_for(self, image_path: Path) -> Dict:
+        """Settings an image is optimized with (compared against the manifest)"""
+        suffix = image_path.suffix.lower()
+        if suffix == '.svg':
+            return SVG_SETTINGS
+        if self.target_ssim is not None and suffix in LOSSY_SUFFIXES:
+            return dict(RASTER_SETTINGS, quality_search=self.quality_search_settings())
+        return RASTER_SETTINGS
+    
+    def quality_search_settings(self) -> Dict:
+        """Quality search parameters (only used with --target-ssim)"""
+        return dict(QUALITY_SEARCH, target_ssim=self.target_ssim)
+    
+    def derived_settings(self, image_path: Path) -> Dict:
+        """Settings derived files are generated with (compared against the manifest)"""
+        if image_path.suffix.lower() == '.svg':
+            return {}
+        settings = {'widths': self.widths, 'formats': self.formats}
+        if 'avif' in self.formats:
+            settings['avif'] = AVIF_SETTINGS
+        if self.target_ssim is not None:
+            settings['quality_search'] = self.quality_search_settings()
+        return settings
+    
+    def record(self, image_path: Path, source_hash: str, derived: List[Path]) -> None:
+        """Remember an optimized image and the files generated from it for the manifest"""
+        entry = {
+            'source': source_hash,
+            'output': file_record(image_path),
+            'settings': self.settings_for(image_path),
+            'derived_settings': self.derived_settings(image_path),
+            'derived': {path.name: file_record(path) for path in derived}
+        }
+        if str(image_path) in self.qualities:
+            entry['quality'] = self.qualities[str(image_path)]
+        self.records[str(image_path)] = entry
     
     def optimize_image(self, image_path: Path) -> None:
         """Optimize a single image"""
         try:
+            source_hash = file_digest(image_path)
+            derived = None
             if image_path.suffix.lower() == '.svg':
-                self.optimize_svg(image_path)
+                derived = self.optimize_svg(image_path)
             elif image_path.suffix.lower() in ['.png', '.jpg', '.jpeg']:
                 if PILLOW_AVAILABLE:
-                    self.optimize_raster(image_path)
+                    derived = self.optimize_raster(image_path)
                 else:
                     print(f"⊘ {image_path.name}: Skipped (Pillow not installed)")
                     self.stats['skipped'] += 1
+            if derived is not None and not self.dry_run:
+                self.record(image_path, source_hash, derived)
         except Exception as e:
             print(f"❌ Error processing {image_path.name}: {e}")
             self.stats['errors'] += 1
     
-    def optimize_svg(self, svg_path: Path) -> None:
+    def regenerate_derived(self, image_path: Path, source_hash: str) -> None:
+        """Rebuild the WebP and responsive variants of an image that is itself already optimized"""
+        if not PILLOW_AVAILABLE:
+            print(f"⊘ {image_path.name}: Skipped (Pillow not installed)")
+            self.stats['skipped'] += 1
+            return
+        
+        try:
+            if not self.dry_run:
+                with Image.open(image_path) as img:
+                    derived = self.save_derived(img, image_path)
+                self.record(image_path, source_hash, derived)
+            print(f"↻ {image_path.name}: Regenerated WebP and responsive variants")
+            self.stats['regenerated'] += 1
+        except Exception as e:
+            print(f"❌ Error regenerating WebP for {image_path.name}: {e}")
+            self.stats['errors'] += 1
+    
+    def save_derived(self, img, image_path: Path) -> List[Path]:
+        """
+        Write the full-size WebP and the responsive variants of an image.
+        
+        Each width of the ladder below the image's own width gets one file per
+        format (board-480w.webp, board-480w.avif); the full-size AVIF is
+        board.avif next to board.webp. Variants left over from an older ladder
+        are deleted. Returns the paths written.
+        """
+        webp_path = image_path.with_suffix('.webp')
+        webp_settings = RASTER_SETTINGS['webp']
+        if self.target_ssim is None:
+            img.save(webp_path, 'WEBP', **webp_settings)
+        else:
+            # The ladder variants reuse the quality found for the full-size WebP
+            result = self.search_quality(img, image_path, 'webp')
+            webp_path.write_bytes(result['data'])
+            webp_settings = dict(webp_settings, quality=result['quality'])
+        print(f"  Generated WebP: {webp_path.name} ({self.format_size(webp_path.stat().st_size)})")
+        derived = [webp_path]
+        
+        # Resampling needs a true-colour image (palette images would fall back
+        # to nearest-neighbour)
+        if img.mode not in ('RGB', 'RGBA'):
+            has_alpha = img.mode in ('LA', 'PA') or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        
+        if 'avif' in self.formats:
+            avif_path = variant_path(image_path, None, 'avif')
+            img.save(avif_path, 'AVIF', **AVIF_SETTINGS)
+            derived.append(avif_path)
+        
+        widths = ladder(img.width, self.widths)
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.Resampling.LANCZOS)
+            for fmt in self.formats:
+                path = variant_path(image_path, width, fmt)
+                if fmt == 'avif':
+                    resized.save(path, 'AVIF', **AVIF_SETTINGS)
+                else:
+                    resized.save(path, 'WEBP', **webp_settings)
+                derived.append(path)
+        
+        pattern = variant_pattern(image_path)
+        for stale in image_path.parent.iterdir():
+            if pattern.match(stale.name) and stale not in derived:
+                stale.unlink()
+        
+        if widths:
+            variant_bytes = sum(path.stat().st_size for path in derived[1:])
+            print(f"  Generated {len(derived) - 1} responsive variants "
+                  f"({', '.join(f'{w}w' for w in widths)}; {'/'.join(self.formats)}; "
+                  f"{self.format_size(variant_bytes)})")
+        return derived
+    
+    def write_variant_index(self, directory: Path, image_files: List[Path]) -> None:
+        """Index the variants on disk in image-variants.json for responsive-images.py"""
+        images = {}
+        for image_path in image_files:
+            if image_path.suffix.lower() == '.svg':
+                continue
+            try:
+                with Image.open(image_path) as img:
+                    width, height = img.size
+            except Exception:
+                continue  # Already reported while optimizing
+            entry = index_entry(image_path, width, height, self.widths, directory)
+            if entry is not None:
+                quality = self.recorded_quality(image_path)
+                if quality:
+                    entry['quality'] = quality
+                images[image_path.relative_to(directory).as_posix()] = entry
+        save_index(directory / VARIANTS_INDEX, images)
+    
+    def recorded_quality(self, image_path: Path) -> Optional[Dict]:
+        """Qualities chosen by the quality search for an image (this run or the manifest)"""
+        if self.manifest is not None:
+            entry = self.manifest.entries.get(self.manifest.key(image_path), {})
+        else:
+            entry = self.records.get(str(image_path), {})
+        return entry.get('quality')
+    
+    def search_quality(self, img, image_path: Path, fmt: str) -> Dict:
+        """Find the smallest JPEG/WebP encode reaching --target-ssim and remember its quality"""
+        options = dict(RASTER_SETTINGS[fmt])
+        baseline = options.pop('quality')
+        result = search_quality(img, fmt.upper(), options, self.target_ssim, baseline, **QUALITY_SEARCH)
+        self.qualities.setdefault(str(image_path), {})[fmt] = {
+            'quality': result['quality'], 'ssim': round(result['ssim'], 4)
+        }
+        self.stats['quality_searches'] += 1
+        self.stats['quality_bytes'] += result['size']
+        self.stats['baseline_bytes'] += result['baseline_size']
+        
+        note = '' if result['met'] else ', target not reached'
+        print(f"  {fmt.upper()} quality {result['quality']} (SSIM {result['ssim']:.4f}{note}): "
+              f"{self.format_size(result['size'])} vs {self.format_size(result['baseline_size'])} "
+              f"at quality {baseline}, {result['encodes']} encodes")
+        return result
+    
+    def optimize_svg(self, svg_path: Path) -> Optional[List[Path]]:
         """Optimize SVG file"""
         original_size = svg_path.stat().st_size
         self.stats['original_size'] += original_size
@@ -96,30 +607,27 @@ class ImageOptimizer:
             print(f"Processing SVG: {svg_path.name}")
         
         try:
-            # Parse SVG
-            tree = ET.parse(svg_path)
-            root = tree.getroot()
-            
-            # Remove comments and metadata
-            for element in root.iter():
-                if element.tag.endswith('metadata') or element.tag.endswith('comment'):
-                    root.remove(element)
+            data = svg_path.read_bytes()
+            try:
+                minified, changes = minify_svg(data, SVG_SETTINGS['precision'])
+            except SvgStructureError:
+                # The minifier must never change what is drawn; keep the original
+                print(f"⚠ {svg_path.name}: Minified output changes the rendered structure, keeping the original")
+                minified, changes = data, None
             
-            # Remove unnecessary attributes
-            unnecessary_attrs = ['id', 'inkscape:version', 'sodipodi:docname']
-            for element in root.iter():
-                for attr in unnecessary_attrs:
-                    if attr in element.attrib:
-                        del element.attrib[attr]
+            optimized_size = min(len(minified), original_size)
+            if not self.dry_run and len(minified) < original_size:
+                svg_path.write_bytes(minified)
             
-            if not self.dry_run:
-                # Write optimized SVG
-                tree.write(svg_path, encoding='utf-8', xml_declaration=True)
-            
-            optimized_size = svg_path.stat().st_size if not self.dry_run else original_size
             self.stats['optimized_size'] += optimized_size
             self.stats['processed'] += 1
             
+            if self.verbose and changes:
+                print(f"  Removed {changes['comments']} comments, {changes['editor_elements']} editor/metadata elements, "
+                      f"{changes['editor_attrs']} editor attributes, {changes['ids']} unused ids; "
+                      f"merged {changes['groups']} groups; rewrote {changes['attrs']} attribute values "
+                      f"(rendered structure verified)")
+            
             savings = original_size - optimized_size
             savings_pct = (savings / original_size * 100) if original_size > 0 else 0
             
@@ -130,12 +638,14 @@ class ImageOptimizer:
             else:
                 print(f"○ {svg_path.name}: Already optimized ({self.format_size(original_size)})")
                 self.stats['skipped'] += 1
+            return []
         
         except Exception as e:
             print(f"❌ Error optimizing SVG {svg_path.name}: {e}")
             self.stats['errors'] += 1
+            return None
     
-    def optimize_raster(self, image_path: Path) -> None:
+    def optimize_raster(self, image_path: Path) -> Optional[List[Path]]:
         """Optimize PNG/JPEG image"""
         original_size = image_path.stat().st_size
         self.stats['original_size'] += original_size
@@ -148,7 +658,7 @@ class ImageOptimizer:
             img = Image.open(image_path)
             
             # Check if image is too large
-            max_dimension = 2000
+            max_dimension = RASTER_SETTINGS['max_dimension']
             if img.width > max_dimension or img.height > max_dimension:
                 # Resize while maintaining aspect ratio
                 ratio = min(max_dimension / img.width, max_dimension / img.height)
@@ -160,20 +670,22 @@ class ImageOptimizer:
             if image_path.suffix.lower() == '.png':
                 # Optimize PNG
                 if not self.dry_run:
-                    img.save(image_path, 'PNG', optimize=True, compress_level=9)
+                    img.save(image_path, 'PNG', **RASTER_SETTINGS['png'])
             else:
                 # Optimize JPEG
                 if not self.dry_run:
                     # Convert RGBA to RGB if necessary
                     if img.mode == 'RGBA':
                         img = img.convert('RGB')
-                    img.save(image_path, 'JPEG', quality=85, optimize=True, progressive=True)
+                    if self.target_ssim is None:
+                        img.save(image_path, 'JPEG', **RASTER_SETTINGS['jpeg'])
+                    else:
+                        image_path.write_bytes(self.search_quality(img, image_path, 'jpeg')['data'])
             
-            # Generate WebP version
-            webp_path = image_path.with_suffix('.webp')
+            # Generate WebP version and responsive variants
+            derived = []
             if not self.dry_run:
-                img.save(webp_path, 'WEBP', quality=80, method=6)
-                print(f"  Generated WebP: {webp_path.name} ({self.format_size(webp_path.stat().st_size)})")
+                derived = self.save_derived(img, image_path)
             
             optimized_size = image_path.stat().st_size if not self.dry_run else original_size
             self.stats['optimized_size'] += optimized_size
@@ -194,19 +706,23 @@ class ImageOptimizer:
             else:
                 print(f"○ {image_path.name}: Already optimized ({self.format_size(original_size)})")
                 self.stats['skipped'] += 1
+            return derived
         
         except Exception as e:
             print(f"❌ Error optimizing {image_path.name}: {e}")
             self.stats['errors'] += 1
+            return None
     
     def print_summary(self) -> None:
         """Print optimization summary"""
         print("\n" + "=" * 60)
         print("OPTIMIZATION SUMMARY")
         print("=" * 60)
-        print(f"Processed: {self.stats['processed']}")
-        print(f"Skipped:   {self.stats['skipped']}")
-        print(f"Errors:    {self.stats['errors']}")
+        print(f"Processed:   {self.stats['processed']}")
+        print(f"Regenerated: {self.stats['regenerated']}")
+        print(f"Unchanged:   {self.stats['unchanged']}")
+        print(f"Skipped:     {self.stats['skipped']}")
+        print(f"Errors:      {self.stats['errors']}")
         print(f"\nOriginal size:  {self.format_size(self.stats['original_size'])}")
         print(f"Optimized size: {self.format_size(self.stats['optimized_size'])}")
         
@@ -215,6 +731,12 @@ class ImageOptimizer:
             savings_pct = (total_savings / self.stats['original_size'] * 100)
             print(f"Total savings:  {self.format_size(total_savings)} ({savings_pct:.1f}%)")
         
+        if self.stats['quality_searches']:
+            change = self.stats['quality_bytes'] / self.stats['baseline_bytes'] * 100 - 100
+            print(f"\nQuality search (SSIM >= {self.target_ssim}): {self.stats['quality_searches']} JPEG/WebP files, "
+                  f"{self.format_size(self.stats['quality_bytes'])} vs "
+                  f"{self.format_size(self.stats['baseline_bytes'])} at fixed quality ({change:+.1f}%)")
+        
         if self.dry_run:
             print("\n⚠️  DRY RUN: No files were modified")
         
@@ -230,6 +752,27 @@ class ImageOptimizer:
         return f"{size_bytes:.1f} TB"
 
 
+def _optimize_in_worker(task: Tuple[Path, Optional[str]], dry_run: bool, verbose: bool,
+                        widths: List[int], target_ssim: Optional[float]) -> Tuple[Dict[str, int], Dict[str, Dict], str]:
+    """Process pool entry point: run one task, return (stats, manifest records, output)"""
+    optimizer = ImageOptimizer(dry_run=dry_run, verbose=verbose, widths=widths, target_ssim=target_ssim)
+    output = io.StringIO()
+    with redirect_stdout(output):
+        optimizer.run_task(*task)
+    return optimizer.stats, optimizer.records, output.getvalue()
+
+
+def parse_widths(text: str) -> List[int]:
+    """argparse type for --widths: '480,960' -> [480, 960]"""
+    try:
+        widths = [int(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid width list: {text!r}")
+    if any(width <= 0 for width in widths):
+        raise argparse.ArgumentTypeError("widths must be positive")
+    return widths
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Optimize images for Zephyr Learning System'
@@ -250,6 +793,44 @@ def main():
         action='store_true',
         help='Show detailed processing information'
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of worker processes (default: 1, 0 uses all CPU cores)'
+    )
+    parser.add_argument(
+        '--widths',
+        type=parse_widths,
+        default=DEFAULT_WIDTHS,
+        help='Comma-separated widths of the responsive variants; empty for none '
+             f'(default: {",".join(map(str, DEFAULT_WIDTHS))})'
+    )
+    parser.add_argument(
+        '--target-ssim',
+        type=float,
+        nargs='?',
+        const=DEFAULT_TARGET_SSIM,
+        metavar='SSIM',
+        help='Search the JPEG/WebP quality of each image for the smallest encode whose SSIM '
+             f'reaches this target (default target: {DEFAULT_TARGET_SSIM}; requires NumPy)'
+    )
+    parser.add_argument(
+        '--manifest',
+        type=Path,
+        default=MANIFEST_PATH,
+        help=f'Content-hash manifest used to skip unchanged images (default: {MANIFEST_PATH})'
+    )
+    parser.add_argument(
+        '--no-manifest',
+        action='store_true',
+        help='Neither read nor write the manifest'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-optimize every image even if the manifest says it is unchanged'
+    )
     
     args = parser.parse_args()
     
@@ -262,8 +843,24 @@ def main():
         print(f"Error: Not a directory: {args.target_dir}")
         sys.exit(1)
     
+    if args.target_ssim is not None:
+        if not 0 < args.target_ssim < 1:
+            print(f"Error: --target-ssim must be between 0 and 1, got {args.target_ssim}")
+            sys.exit(1)
+        if not NUMPY_AVAILABLE:
+            print("Error: --target-ssim requires NumPy: pip install numpy")
+            sys.exit(1)
+    
     # Run optimization
-    optimizer = ImageOptimizer(dry_run=args.dry_run, verbose=args.verbose)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    manifest = None if args.no_manifest else ImageManifest.load(args.manifest)
+    if (manifest is not None and not manifest.entries and args.manifest == MANIFEST_PATH
+            and LEGACY_MANIFEST_PATH.exists()):
+        print(f"Moving the manifest from {LEGACY_MANIFEST_PATH} to {MANIFEST_PATH} (commit it)")
+        manifest.adopt(ImageManifest.load(LEGACY_MANIFEST_PATH))
+    optimizer = ImageOptimizer(dry_run=args.dry_run, verbose=args.verbose, jobs=jobs,
+                               manifest=manifest, force=args.force, widths=args.widths,
+                               target_ssim=args.target_ssim)
     optimizer.optimize_directory(args.target_dir)
 
 
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能预算模块
+按路径 glob 和资源类型确定预算，并与基线报告比较找出回归
+
+供 test-performance.py 和 measure-load-time.py 使用。预算文件格式见
+performance-budgets.yml：defaults 给出各资源类型的默认限制，rules 按顺序
+匹配，后面的规则覆盖前面的同名限制。
+"""
+
+import copy
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import yaml
+
+# 默认预算文件
+BUDGETS_PATH = Path('performance-budgets.yml')
+
+ASSET_CLASSES = ['html', 'css', 'js', 'images', 'fonts']
+
+# 未提供预算文件时的内置预算（Requirements: 11.1 / NFR 4）
+DEFAULT_BUDGETS = {
+    'defaults': {
+        'html': {
+            'max_size_kb': 200,            # 压缩后页面大小
+            'min_compression_ratio': 70.0,
+            'max_fcp_s': 2.0,
+            'max_regression_pct': 10.0,    # 相对基线的最大增长
+            'regression_floor_kb': 0.5,    # 小于该增量的变化视为噪声
+            'regression_floor_ms': 10,
+        },
+        'css': {'max_regression_pct': 10.0, 'regression_floor_kb': 0.5},
+        'js': {'max_regression_pct': 10.0, 'regression_floor_kb': 0.5},
+        'images': {'max_size_kb': 200, 'max_regression_pct': 10.0, 'regression_floor_kb': 0.5},
+        'fonts': {'max_regression_pct': 10.0, 'regression_floor_kb': 0.5},
+    },
+    'rules': [
+        {'match': 'index.html', 'max_fcp_s': 1.5},
+    ],
+}
+
+
+class Budgets:
+    """按路径和资源类型解析的性能预算"""
+
+    def __init__(self, config: Dict):
+        self.defaults = copy.deepcopy(DEFAULT_BUDGETS['defaults'])
+        for asset_class, limits in (config.get('defaults') or {}).items():
+            if asset_class not in ASSET_CLASSES:
+                raise ValueError(f"未知的资源类型: {asset_class}")
+            self.defaults[asset_class].update(limits or {})
+
+        self.rules = []
+        for rule in config.get('rules') or []:
+            if 'match' not in rule:
+                raise ValueError(f"预算规则缺少 match: {rule}")
+            asset_class = rule.get('class', 'html')
+            if asset_class not in ASSET_CLASSES:
+                raise ValueError(f"未知的资源类型: {asset_class}")
+            self.rules.append(rule)
+        self._memo: Dict = {}
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> 'Budgets':
+        """读取预算文件；未指定且默认文件不存在时使用内置预算"""
+        path = path or BUDGETS_PATH
+        if not path.exists():
+            return cls(DEFAULT_BUDGETS)
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(yaml.safe_load(f) or {})
+
+    def default_limits(self, asset_class: str = 'html') -> Dict:
+        """资源类型的默认限制（用于站点整体指标）"""
+        return self.defaults[asset_class]
+
+    def limits_for(self, path: str, asset_class: str = 'html') -> Dict:
+        """路径（相对 site/）在该资源类型下生效的限制"""
+        key = (path, asset_class)
+        if key not in self._memo:
+            posix_path = Path(path).as_posix()
+            limits = dict(self.defaults[asset_class])
+            for rule in self.rules:
+                if rule.get('class', 'html') == asset_class and fnmatchcase(posix_path, rule['match']):
+                    limits.update({k: v for k, v in rule.items() if k not in ('match', 'class')})
+            self._memo[key] = limits
+        return self._memo[key]
+
+
+def find_regressions(current: List[Dict], baseline: List[Dict], metric: Callable[[Dict], float],
+                     budgets: Budgets, asset_class: str = 'html', floor_key: str = 'regression_floor_kb',
+                     floor_scale: float = 1024) -> List[Dict]:
+    """
+    与基线比较，找出增长超过 max_regression_pct 的条目
+
+    metric 从记录中取比较值；floor_key 对应的限制乘以 floor_scale 后作为噪声下限
+    （如 regression_floor_kb × 1024 字节、regression_floor_ms × 0.001 秒）。
+    只比较两边都存在的路径。
+    """
+    baseline_by_path = {Path(r['path']).as_posix(): r for r in baseline}
+    regressions = []
+    for record in current:
+        old = baseline_by_path.get(Path(record['path']).as_posix())
+        if old is None:
+            continue
+        limits = budgets.limits_for(record['path'], asset_class)
+        max_pct = limits.get('max_regression_pct')
+        if max_pct is None:
+            continue
+
+        old_value, new_value = metric(old), metric(record)
+        delta = new_value - old_value
+        if old_value <= 0 or delta <= limits.get(floor_key, 0) * floor_scale:
+            continue
+        change_pct = delta / old_value * 100
+        if change_pct > max_pct:
+            regressions.append({
+                'path': record['path'],
+                'baseline': old_value,
+                'current': new_value,
+                'change_pct': change_pct,
+                'limit_pct': max_pct
+            })
+    return sorted(regressions, key=lambda r: r['change_pct'], reverse=True)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能历史记录
+把每次 test-performance.py / measure-load-time.py 的结果追加到本地 SQLite，
+并提供趋势查询、增长定位和 CSV 导出
+
+用法:
+    python scripts/perf_history.py runs
+    python scripts/perf_history.py trend index.html --metric gzip_size
+    python scripts/perf_history.py growth --path "stage1-foundation/**" --top 5
+    python scripts/perf_history.py export history.csv --metric fcp_time
+"""
+
+import argparse
+import csv
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 默认历史数据库
+HISTORY_PATH = Path('performance-history.sqlite')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    commit_sha TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    UNIQUE (path, kind)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path_id INTEGER NOT NULL REFERENCES paths(id),
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, path_id, metric)
+) WITHOUT ROWID;
+-- 按页面/指标查询趋势时走这个索引，避免扫描全部运行
+CREATE INDEX IF NOT EXISTS idx_metrics_path ON metrics (path_id, metric, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_commit ON runs (commit_sha);
+'''
+
+
+def git_commit() -> Tuple[Optional[str], bool]:
+    """当前 git 提交和工作区是否有未提交修改；不在 git 仓库中时返回 (None, False)"""
+    try:
+        sha = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return sha, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+class PerformanceHistory:
+    """只追加的性能历史存储"""
+
+    def __init__(self, db_path: Path = HISTORY_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript(SCHEMA)
+        self._path_ids: Dict[Tuple[str, str], int] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def _path_id(self, path: str, kind: str) -> int:
+        """路径 ID（路径表去重，指标表只存整数 ID）"""
+        key = (path, kind)
+        if key not in self._path_ids:
+            self.conn.execute('INSERT OR IGNORE INTO paths (path, kind) VALUES (?, ?)', key)
+            self._path_ids[key] = self.conn.execute(
+                'SELECT id FROM paths WHERE path = ? AND kind = ?', key
+            ).fetchone()[0]
+        return self._path_ids[key]
+
+    def record_run(self, source: str, records: Iterable[Tuple[str, str, Dict[str, float]]]) -> int:
+        """
+        记录一次运行
+
+        records 为 (路径, 类型, {指标: 值}) 序列；返回运行 ID。
+        """
+        commit_sha, dirty = git_commit()
+        with self.conn:
+            run_id = self.conn.execute(
+                'INSERT INTO runs (timestamp, commit_sha, dirty, source) VALUES (?, ?, ?, ?)',
+                (time.strftime('%Y-%m-%d %H:%M:%S'), commit_sha, int(dirty), source)
+            ).lastrowid
+            self.conn.executemany(
+                'INSERT INTO metrics VALUES (?, ?, ?, ?)',
+                (
+                    (run_id, self._path_id(path, kind), metric, float(value))
+                    for path, kind, values in records
+                    for metric, value in values.items()
+                    if value is not None
+                )
+            )
+        return run_id
+
+    def runs(self, limit: int = 20) -> List[Tuple]:
+        """最近的运行"""
+        return self.conn.execute(
+            'SELECT r.id, r.timestamp, r.commit_sha, r.dirty, r.source, COUNT(m.path_id) '
+            'FROM runs r LEFT JOIN metrics m ON m.run_id = r.id '
+            'GROUP BY r.id ORDER BY r.id DESC LIMIT ?', (limit,)
+        ).fetchall()
+
+    def trend(self, path: str, metric: str, limit: int = 50) -> List[Tuple]:
+        """单个页面/资源某个指标的历史（按运行顺序）"""
+        rows = self.conn.execute(
+            'SELECT r.id, r.timestamp, r.commit_sha, m.value '
+            'FROM paths p JOIN metrics m ON m.path_id = p.id AND m.metric = ? '
+            'JOIN runs r ON r.id = m.run_id '
+            'WHERE p.path = ? ORDER BY r.id DESC LIMIT ?',
+            (metric, path, limit)
+        ).fetchall()
+        return rows[::-1]
+
+    def growth(self, metric: str, path_glob: str = '*', top: int = 10) -> List[Tuple]:
+        """
+        相邻两次运行之间增长最多的 (页面, 提交)
+
+        用窗口函数 LAG 在索引顺序上计算差值，返回
+        (路径, 提交, 之前的值, 之后的值, 增量)。
+        """
+        return self.conn.execute(
+            'SELECT path, commit_sha, prev_value, value, value - prev_value AS delta FROM ('
+            '  SELECT p.path, r.commit_sha, m.value,'
+            '         LAG(m.value) OVER (PARTITION BY m.path_id ORDER BY m.run_id) AS prev_value'
+            '  FROM paths p JOIN metrics m ON m.path_id = p.id AND m.metric = ?'
+            '  JOIN runs r ON r.id = m.run_id'
+            '  WHERE p.path GLOB ?'
+            ') WHERE prev_value IS NOT NULL AND value > prev_value '
+            'ORDER BY delta DESC LIMIT ?',
+            (metric, path_glob, top)
+        ).fetchall()
+
+    def export_csv(self, out_path: Path, metric: Optional[str] = None, path_glob: str = '*') -> int:
+        """导出为 CSV（逐行写出，不在内存中汇总），返回行数"""
+        query = (
+            'SELECT r.id, r.timestamp, r.commit_sha, r.source, p.path, p.kind, m.metric, m.value '
+            'FROM metrics m JOIN runs r ON r.id = m.run_id JOIN paths p ON p.id = m.path_id '
+            'WHERE p.path GLOB ?'
+        )
+        params: List = [path_glob]
+        if metric:
+            query += ' AND m.metric = ?'
+            params.append(metric)
+        query += ' ORDER BY r.id, p.path, m.metric'
+
+        count = 0
+        with open(out_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['run_id', 'timestamp', 'commit', 'source', 'path', 'kind', 'metric', 'value'])
+            for row in self.conn.execute(query, params):
+                writer.writerow(row)
+                count += 1
+        return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='性能历史查询工具')
+    parser.add_argument('--db', type=Path, default=HISTORY_PATH,
+                        help=f'历史数据库（默认: {HISTORY_PATH}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    runs_parser = sub.add_parser('runs', help='列出最近的运行')
+    runs_parser.add_argument('--limit', type=int, default=20)
+
+    trend_parser = sub.add_parser('trend', help='查看页面或资源的指标趋势')
+    trend_parser.add_argument('path', help='相对 site/ 的路径，如 index.html')
+    trend_parser.add_argument('--metric', default='gzip_size',
+                              help='指标名（如 gzip_size、original_size、fcp_time、lcp_time）')
+    trend_parser.add_argument('--limit', type=int, default=50)
+
+    growth_parser = sub.add_parser('growth', help='找出增长最多的提交')
+    growth_parser.add_argument('--path', default='*', help='路径 glob（默认全部）')
+    growth_parser.add_argument('--metric', default='gzip_size')
+    growth_parser.add_argument('--top', type=int, default=10)
+
+    export_parser = sub.add_parser('export', help='导出 CSV')
+    export_parser.add_argument('output', type=Path)
+    export_parser.add_argument('--path', default='*', help='路径 glob（默认全部）')
+    export_parser.add_argument('--metric', help='只导出指定指标')
+
+    args = parser.parse_args()
+    if not args.db.exists():
+        print(f"错误: 历史数据库不存在: {args.db}")
+        return 1
+
+    history = PerformanceHistory(args.db)
+    try:
+        if args.command == 'runs':
+            for run_id, timestamp, sha, dirty, source, count in history.runs(args.limit):
+                commit = (sha or '-')[:10] + ('+' if dirty else '')
+                print(f"{run_id:>6}  {timestamp}  {commit:<11}  {source:<10}  {count} 条指标")
+        elif args.command == 'trend':
+            rows = history.trend(args.path, args.metric, args.limit)
+            if not rows:
+                print(f"没有 {args.path} 的 {args.metric} 记录")
+                return 1
+            previous = None
+            for run_id, timestamp, sha, value in rows:
+                change = '' if previous is None else f"{value - previous:+,.3f}"
+                print(f"{run_id:>6}  {timestamp}  {(sha or '-')[:10]:<10}  {value:>14,.3f}  {change}")
+                previous = value
+        elif args.command == 'growth':
+            rows = history.growth(args.metric, args.path, args.top)
+            if not rows:
+                print("没有找到增长记录")
+            for path, sha, before, after, delta in rows:
+                pct = delta / before * 100 if before else 0.0
+                print(f"{(sha or '-')[:10]:<10}  {path}  {before:,.3f} → {after:,.3f} (+{delta:,.3f}, +{pct:.1f}%)")
+        elif args.command == 'export':
+            count = history.export_csv(args.output, args.metric, args.path)
+            print(f"已导出 {count} 行到 {args.output}")
+    finally:
+        history.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式报告输出
+逐条写出分析结果，下游可以在扫描结束前开始处理
+
+- NdjsonWriter: 每条记录一行 JSON，写完立即 flush
+- JUnitWriter:  JUnit XML，供 CI 展示每个页面/资源的检查结果
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+
+class NdjsonWriter:
+    """NDJSON 报告：{"type": ..., ...记录字段} 每行一条"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, record_type: str, record: Dict):
+        """写出一条记录并立即 flush"""
+        line = json.dumps({'type': record_type, **record}, ensure_ascii=False, separators=(',', ':'))
+        self._file.write(line + '\n')
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+
+class JUnitWriter:
+    """
+    JUnit XML 报告
+
+    测试用例在检查完成时立即写出；由于用例数在开始时未知，
+    <testsuite> 不带 tests/failures 计数属性（Jenkins、GitLab 等会按子元素统计）。
+    """
+
+    def __init__(self, path: Path, name: str):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self._file.write(f'<testsuites name={quoteattr(name)}>\n')
+        self._suite: Optional[str] = None
+        self.failures = 0
+        self.count = 0
+
+    def start_suite(self, name: str):
+        """开始一个测试套件（自动结束上一个）"""
+        self.end_suite()
+        self._suite = name
+        self._file.write(f'  <testsuite name={quoteattr(name)}>\n')
+
+    def case(self, name: str, failure: Optional[str] = None, skipped: Optional[str] = None):
+        """写出一个测试用例；failure/skipped 为失败或跳过原因"""
+        classname = quoteattr(self._suite or '')
+        self._file.write(f'    <testcase classname={classname} name={quoteattr(name)}')
+        if failure is not None:
+            self._file.write(f'>\n      <failure message={quoteattr(failure)}>{escape(failure)}</failure>\n'
+                             f'    </testcase>\n')
+            self.failures += 1
+        elif skipped is not None:
+            self._file.write(f'>\n      <skipped message={quoteattr(skipped)}/>\n    </testcase>\n')
+        else:
+            self._file.write('/>\n')
+        self.count += 1
+        self._file.flush()
+
+    def end_suite(self):
+        if self._suite is not None:
+            self._file.write('  </testsuite>\n')
+            self._suite = None
+
+    def close(self):
+        self.end_suite()
+        self._file.write('</testsuites>\n')
+        self._file.close()
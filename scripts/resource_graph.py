@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面资源引用图
+从 HTML 和 CSS 中提取浏览器实际会请求的资源，供 test-performance.py 和
+measure-load-time.py 共用
+
+- HTML: <link rel=stylesheet/preload/modulepreload/icon>、<script src>、
+  <img src/srcset>、<picture><source srcset>，单引号、双引号和无引号属性均可
+- CSS: @import 和 url()（字体、图片），递归跟踪到任意深度；
+  @font-face 的 src 只取第一个候选（浏览器只下载第一个支持的格式）
+- 每个 CSS 文件在一次运行中只解析一次（ResourceGraph 内缓存）
+- classify() 按属性和位置判断资源是否阻塞首次渲染
+"""
+
+import posixpath
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 标签与属性（属性值可为双引号、单引号或无引号）。
+# 注释、<script> 和 <style> 的内容整体匹配，其中的文本不会被误认为标签
+TAG_PATTERN = re.compile(
+    r'<!--.*?-->'
+    r'|<script\b([^>]*)>(.*?)</script\s*>'
+    r'|<style\b[^>]*>(.*?)</style\s*>'
+    r'|<(/?)(link|img|source|picture)\b([^>]*)>',
+    re.IGNORECASE | re.DOTALL
+)
+# TAG_PATTERN 各分支的开头；流式解析时用来找到可能尚未完整到达的结构
+TAG_START_PATTERN = re.compile(r'<(?:!--|script\b|style\b|/?(?:link|img|source|picture)\b)', re.IGNORECASE)
+TAG_START_LENGTH = len('</picture')
+ATTR_PATTERN = re.compile(r'''([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+)))?''')
+
+# CSS 引用
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_IMPORT_PATTERN = re.compile(r'''@import\s+(?:url\(\s*)?["']?([^"')\s;]+)["']?''', re.IGNORECASE)
+CSS_URL_PATTERN = re.compile(r'''url\(\s*["']?([^"')]+?)["']?\s*\)''', re.IGNORECASE)
+CSS_FONT_SRC_PATTERN = re.compile(r'@font-face\s*\{[^}]*?\bsrc\s*:([^;}]*)', re.IGNORECASE)
+
+# 按扩展名判断资源类型
+FONT_SUFFIXES = {'.woff2', '.woff', '.ttf', '.otf', '.eot'}
+IMAGE_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico'}
+
+# <link rel=preload as=...> -> 资源类型
+PRELOAD_KINDS = {'style': 'css', 'script': 'js', 'font': 'font', 'image': 'img'}
+
+# srcset 和 media 查询使用的视口宽度（CSS 像素，DPR 1）
+TARGET_WIDTH = 1280
+
+# <body> 的开始（没有 <body> 标签时为 </head> 之后）
+BODY_PATTERN = re.compile(r'<body\b|</head\s*>', re.IGNORECASE)
+
+# 浏览器会执行（因而会下载）的脚本类型；其他类型（如 application/json）只是数据块
+SCRIPT_TYPES = {'', 'text/javascript', 'application/javascript', 'module'}
+
+# media 查询中的宽度条件
+MEDIA_WIDTH_PATTERN = re.compile(r'\(\s*(min|max)-width\s*:\s*([\d.]+)(px|em|rem)\s*\)')
+
+# sizes 属性中的长度（calc() 等其他形式的条目忽略）
+SIZE_LENGTH_PATTERN = re.compile(r'([\d.]+)(px|em|rem|vw)')
+
+# 资源的阻塞分类
+RENDER_BLOCKING = 'render-blocking'   # <head> 中的样式表和同步脚本，以及它们 @import 的样式表
+PARSER_BLOCKING = 'parser-blocking'   # <body> 中的同步脚本：阻塞其后内容的解析，之前的内容可以先绘制
+ASYNC = 'async'
+DEFER = 'defer'
+MODULE = 'module'                     # type="module" 默认延迟执行
+MEDIA_MISMATCH = 'media'              # media 不匹配屏幕的样式表（如 print），低优先级下载
+NON_BLOCKING = 'non-blocking'         # 图片、字体、预加载等
+
+# 请求优先级（数值越小越先发送）：阻塞渲染的资源先发送，字体其次，
+# 图片、图标和不匹配的样式表最后
+PRIORITY = {'css': 0, 'js': 0, 'deferred_js': 1, 'font': 1, 'img': 2, 'other': 3, 'deferred_css': 3}
+
+
+class Reference(NamedTuple):
+    """源文件中的一个资源引用"""
+    url: str
+    kind: str                 # css / js / img / font / other
+    offset: int               # 引用在源文本中的结束位置
+    attrs: Dict[str, str]     # 标签属性（CSS 中的引用为空）
+    in_head: bool = False     # 是否位于 <head> 中
+
+
+class Node(NamedTuple):
+    """页面资源图中的一个资源"""
+    path: str                 # 相对 site/ 的路径；外部资源为完整 URL
+    kind: str
+    offset: int               # 被发现的位置：HTML 中的字符位置（CSS 子资源取所属样式表的位置）
+    attrs: Dict[str, str]
+    parent: Optional[str]     # 引用它的样式表；直接由 HTML 引用时为 None
+    external: bool
+    in_head: bool             # 所在标签（CSS 子资源取所属样式表）是否位于 <head> 中
+
+
+def parse_attrs(text: str) -> Dict[str, str]:
+    """解析标签属性，名称转为小写；无值属性（如 async）的值为空字符串"""
+    attrs = {}
+    for match in ATTR_PATTERN.finditer(text):
+        name = match.group(1).lower()
+        value = next((g for g in match.group(2, 3, 4) if g is not None), '')
+        attrs.setdefault(name, value)
+    return attrs
+
+
+def kind_from_url(url: str) -> str:
+    """按扩展名判断资源类型"""
+    suffix = posixpath.splitext(url.split('?', 1)[0].split('#', 1)[0])[1].lower()
+    if suffix == '.css':
+        return 'css'
+    if suffix in ('.js', '.mjs'):
+        return 'js'
+    if suffix in FONT_SUFFIXES:
+        return 'font'
+    if suffix in IMAGE_SUFFIXES:
+        return 'img'
+    return 'other'
+
+
+def source_size(sizes: Optional[str], width: int = TARGET_WIDTH) -> float:
+    """
+    sizes 属性在视口宽度 width 下给出的显示宽度（CSS 像素）
+
+    取第一个媒体条件匹配（或没有条件）的条目；支持 px、em、rem 和 vw 长度，
+    无法解析的条目跳过。没有 sizes 或没有条目可用时按浏览器默认值 100vw。
+    """
+    for entry in (sizes or '').split(','):
+        parts = entry.strip().rsplit(None, 1)
+        if not parts:
+            continue
+        length = SIZE_LENGTH_PATTERN.fullmatch(parts[-1].lower())
+        if length is None:
+            continue
+        if len(parts) > 1 and not media_matches(parts[0], width):
+            continue
+        value, unit = float(length.group(1)), length.group(2)
+        if unit == 'vw':
+            return value * width / 100
+        return value * (16 if unit != 'px' else 1)
+    return float(width)
+
+
+def pick_srcset(srcset: str, fallback: Optional[str] = None, sizes: Optional[str] = None) -> Optional[str]:
+    """
+    按浏览器的选择规则从 srcset 中取一个候选
+
+    宽度描述符（480w）取不小于 sizes 显示宽度（视口宽度 TARGET_WIDTH 下，DPR 1）
+    的最小候选（都小于时取最大）；密度描述符取 1x。
+    """
+    candidates = []
+    for item in srcset.split(','):
+        parts = item.split()
+        if not parts:
+            continue
+        descriptor = parts[1] if len(parts) > 1 else '1x'
+        candidates.append((parts[0], descriptor))
+    if not candidates:
+        return fallback
+
+    widths = [(int(d[:-1]), url) for url, d in candidates if d.endswith('w') and d[:-1].isdigit()]
+    if widths:
+        widths.sort()
+        display_width = source_size(sizes)
+        for width, url in widths:
+            if width >= display_width:
+                return url
+        return widths[-1][1]
+    for url, descriptor in candidates:
+        if descriptor == '1x':
+            return url
+    return fallback or candidates[0][0]
+
+
+def extract_html_references(html: str, inline: Optional[List[Reference]] = None) -> List[Reference]:
+    """
+    按出现顺序提取 HTML 中会被请求的资源
+
+    内联 <style> 中的 url() / @import 同样提取（相对页面解析）；
+    注释中的内容、非 JavaScript 类型和 nomodule 的脚本忽略。
+    指定 inline 时，内联脚本（不产生请求）以空 url 追加到其中。
+    """
+    extractor = HtmlReferenceExtractor(inline)
+    extractor.feed(html)
+    return extractor.close()
+
+
+class HtmlReferenceExtractor:
+    """
+    增量版 extract_html_references：feed() 逐块输入 HTML 文本，close() 返回全部引用
+
+    每次只解析已完整到达的标签、注释、<script> 和 <style>，未闭合的部分留到下一块；
+    因此缓冲区大小取决于单个结构的长度，而不是整个页面。
+    边下载边请求时用 take() 取每次 feed() 新解析出的引用。
+    """
+
+    def __init__(self, inline: Optional[List[Reference]] = None):
+        self.inline = inline
+        self._inline: List[Reference] = []
+        self._references: List[Reference] = []
+        self._picture_source: Optional[Tuple[str, int, Dict]] = None
+        self._in_picture = False
+        self._buffer = ''
+        self._base = 0             # 缓冲区开头在整个文档中的位置
+        self._body_start: Optional[int] = None
+        self._taken = 0
+
+    @property
+    def body_start(self) -> Optional[int]:
+        """<body>（或 </head> 之后）在文档中的位置，尚未收到时为 None"""
+        return self._body_start
+
+    def feed(self, text: str):
+        """输入下一块文本"""
+        self._buffer += text
+        self._scan(final=False)
+
+    def close(self) -> List[Reference]:
+        """处理剩余文本（未闭合的结构按 extract_html_references 的规则跳过），返回按位置排序的引用"""
+        self._scan(final=True)
+        body_start = self._body_start or 0
+        references = [r._replace(in_head=r.offset <= body_start) for r in self._references]
+        if self.inline is not None:
+            self.inline.extend(r._replace(in_head=r.offset <= body_start) for r in self._inline)
+        references.sort(key=lambda r: r.offset)
+        return references
+
+    def take(self) -> List[Reference]:
+        """
+        上次 take() 以来新解析出的引用（按解析顺序）
+
+        in_head 按目前已知的 <body> 位置判断：尚未收到 <body> 时已解析的引用都在 <head> 中。
+        """
+        body_start = self._body_start
+        references = [
+            r._replace(in_head=body_start is None or r.offset <= body_start)
+            for r in self._references[self._taken:]
+        ]
+        self._taken = len(self._references)
+        return references
+
+    def _scan(self, final: bool):
+        buffer = self._buffer
+        if self._body_start is None:
+            body = BODY_PATTERN.search(buffer)
+            if body and (final or body.end() < len(buffer)):
+                self._body_start = self._base + body.start()
+
+        position = 0
+        keep = len(buffer)
+        while True:
+            start = TAG_START_PATTERN.search(buffer, position)
+            if start is None:
+                # 末尾可能是被截断的标签开头（如 "<scr"）
+                keep = len(buffer) if final else max(position, len(buffer) - TAG_START_LENGTH)
+                break
+            match = TAG_PATTERN.match(buffer, start.start())
+            if match is None:
+                if final:
+                    position = start.start() + 1
+                    continue
+                keep = start.start()
+                break
+            self._handle(match)
+            position = match.end()
+
+        self._buffer = buffer[keep:]
+        self._base += keep
+
+    def _handle(self, match: re.Match):
+        references = self._references
+        base = self._base
+        offset = base + match.end()
+        if match.group(1) is not None:
+            attrs = parse_attrs(match.group(1))
+            if attrs.get('type', '').lower() not in SCRIPT_TYPES or 'nomodule' in attrs:
+                return
+            if attrs.get('src'):
+                references.append(Reference(attrs['src'], 'js', base + match.start(2), attrs))
+            elif self.inline is not None and match.group(2).strip():
+                self._inline.append(Reference('', 'js', base + match.start(2), attrs))
+            return
+        if match.group(3) is not None:
+            for ref in extract_css_references(match.group(3)):
+                references.append(ref._replace(offset=offset))
+            return
+        if match.group(5) is None:
+            return  # 注释
+        closing, tag, attr_text = match.group(4), match.group(5).lower(), match.group(6)
+        if tag == 'picture':
+            source = self._picture_source
+            if closing and source is not None:
+                references.append(Reference(source[0], 'img', source[1], source[2]))
+            self._in_picture = not closing
+            self._picture_source = None
+            return
+        if closing:
+            return
+        attrs = parse_attrs(attr_text)
+
+        if tag == 'link':
+            rel = attrs.get('rel', '').lower().split()
+            href = attrs.get('href')
+            if not href:
+                return
+            if 'stylesheet' in rel:
+                references.append(Reference(href, 'css', offset, attrs))
+            elif 'modulepreload' in rel:
+                references.append(Reference(href, 'js', offset, attrs))
+            elif 'preload' in rel:
+                kind = PRELOAD_KINDS.get(attrs.get('as', '').lower(), kind_from_url(href))
+                references.append(Reference(href, kind, offset, attrs))
+            elif 'icon' in rel:
+                references.append(Reference(href, 'other', offset, attrs))
+        elif tag == 'source':
+            # <picture> 中浏览器使用第一个匹配的 <source>，其后的 <img> 不再下载
+            if self._in_picture and self._picture_source is None and attrs.get('srcset'):
+                url = pick_srcset(attrs['srcset'], sizes=attrs.get('sizes'))
+                if url:
+                    self._picture_source = (url, offset, attrs)
+        elif tag == 'img':
+            if self._in_picture and self._picture_source is not None:
+                return
+            url = attrs.get('src')
+            if attrs.get('srcset'):
+                url = pick_srcset(attrs['srcset'], url, attrs.get('sizes'))
+            if url:
+                references.append(Reference(url, 'img', offset, attrs))
+                if self._in_picture:
+                    # 没有可用 <source> 的 <picture> 由 <img> 决定
+                    self._picture_source = None
+                    self._in_picture = False
+
+
+def media_matches(media: str, width: int = TARGET_WIDTH) -> bool:
+    """
+    media 属性是否匹配屏幕（视口宽度 width，浅色模式）
+
+    支持媒体类型、not / only 和 min-width / max-width（px、em、rem）；
+    其他特性条件视为匹配。
+    """
+    for query in media.lower().split(','):
+        query = query.strip()
+        if not query:
+            continue
+        negate = query.startswith('not ')
+        words = query[4:].split() if negate else query.split()
+        media_type = words[0] if words and not words[0].startswith('(') else 'all'
+        if media_type == 'only' and len(words) > 1:
+            media_type = words[1]
+        matches = media_type in ('all', 'screen') and 'prefers-color-scheme: dark' not in query
+        for bound, value, unit in MEDIA_WIDTH_PATTERN.findall(query):
+            pixels = float(value) * (16 if unit != 'px' else 1)
+            matches = matches and (width >= pixels if bound == 'min' else width <= pixels)
+        if matches != negate:
+            return True
+    return False
+
+
+def classify(kind: str, attrs: Dict[str, str], in_head: bool, parent_class: Optional[str] = None) -> str:
+    """
+    资源对首次渲染的阻塞分类（见 RENDER_BLOCKING 等常量）
+
+    样式表：rel=stylesheet 且 media 匹配屏幕时阻塞渲染（无论位于 <head> 还是 <body>），
+    rel 含 alternate 或带 disabled 的不阻塞；样式表 @import 的样式表继承所属样式表的
+    分类 parent_class，样式表引用的字体和图片不阻塞。
+    脚本：async、defer、type="module" 不阻塞；其余同步脚本在 <head> 中阻塞渲染，
+    在 <body> 中只阻塞其后内容的解析。预加载（rel=preload / modulepreload）不阻塞。
+    """
+    rel = attrs.get('rel', '').lower().split()
+    if parent_class is not None:
+        return parent_class if kind == 'css' else NON_BLOCKING
+    if kind == 'css':
+        if 'stylesheet' not in rel:
+            return NON_BLOCKING
+        if 'alternate' in rel or 'disabled' in attrs or not media_matches(attrs.get('media', 'all')):
+            return MEDIA_MISMATCH
+        return RENDER_BLOCKING
+    if kind == 'js' and 'src' in attrs:
+        if 'async' in attrs:
+            return ASYNC
+        if attrs.get('type', '').lower() == 'module':
+            return MODULE
+        if 'defer' in attrs:
+            return DEFER
+        return RENDER_BLOCKING if in_head else PARSER_BLOCKING
+    return NON_BLOCKING
+
+
+def extract_css_references(css: str) -> List[Reference]:
+    """
+    提取 CSS 中的 @import 和 url() 引用（按出现顺序）
+
+    data: URI 和仅含片段的引用（如 SVG 滤镜 #id）不会产生请求，已排除。
+    """
+    css = CSS_COMMENT_PATTERN.sub('', css)
+
+    # @font-face 的 src 只保留第一个 url()
+    skipped = set()
+    for match in CSS_FONT_SRC_PATTERN.finditer(css):
+        urls = list(CSS_URL_PATTERN.finditer(css, match.start(1), match.end(1)))
+        skipped.update(u.start() for u in urls[1:])
+
+    references = []
+    for match in CSS_IMPORT_PATTERN.finditer(css):
+        references.append(Reference(match.group(1), 'css', match.end(), {}))
+    imports = {match.start(1) for match in CSS_IMPORT_PATTERN.finditer(css)}
+    for match in CSS_URL_PATTERN.finditer(css):
+        url = match.group(1).strip()
+        if match.start() in skipped or match.start(1) in imports:
+            continue
+        if url.startswith(('data:', '#')):
+            continue
+        references.append(Reference(url, kind_from_url(url), match.end(), {}))
+    references.sort(key=lambda r: r.offset)
+    return references
+
+
+def is_external(url: str) -> bool:
+    """是否为其他源的资源（http://、https:// 或协议相对 URL）"""
+    return url.startswith(('http://', 'https://', '//'))
+
+
+def resolve_url(url: str, base_dir: str) -> str:
+    """
+    把引用解析为相对 site/ 的路径（base_dir 为引用所在文件的目录）
+
+    以 / 开头的引用相对站点根目录；查询串和片段被去掉。外部 URL 原样返回。
+    """
+    if is_external(url):
+        return 'https:' + url if url.startswith('//') else url
+    path = url.split('#', 1)[0].split('?', 1)[0]
+    if path.startswith('/'):
+        return posixpath.normpath(path.lstrip('/'))
+    return posixpath.normpath(posixpath.join(base_dir, path))
+
+
+class ResourceGraph:
+    """
+    站点资源引用图
+
+    exists 判断相对 site/ 的路径是否存在；样式表的子资源解析结果按路径缓存，
+    同一主题 CSS 在所有页面间只读取和解析一次。
+    """
+
+    def __init__(self, site_dir: Path, exists: Callable[[str], bool]):
+        self.site_dir = site_dir
+        self.exists = exists
+        self._css: Dict[str, List[Tuple[str, str]]] = {}
+
+    def css_children(self, css_path: str) -> List[Tuple[str, str]]:
+        """样式表直接引用的 (路径, 类型)，按出现顺序（记忆化）"""
+        if css_path not in self._css:
+            children = []
+            file_path = self.site_dir / css_path
+            if not is_external(css_path) and file_path.is_file():
+                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    css = f.read()
+                base_dir = posixpath.dirname(css_path)
+                for ref in extract_css_references(css):
+                    children.append((resolve_url(ref.url, base_dir), ref.kind))
+            self._css[css_path] = children
+        return self._css[css_path]
+
+    def prime(self, css_paths: List[str]):
+        """预先解析样式表（在分发到进程池之前调用，结果随对象传给 worker）"""
+        for css_path in css_paths:
+            self.css_children(css_path)
+
+    def page_resources(self, html: str, page_path: str,
+                       inline: Optional[List[Reference]] = None) -> List[Node]:
+        """
+        页面会请求的全部资源：HTML 直接引用的资源在前（按出现顺序），
+        样式表引用的字体、图片和 @import 紧随所属样式表之后递归展开。
+        inline 见 extract_html_references()。
+        """
+        base_dir = posixpath.dirname(page_path)
+        return self.expand((resolve_url(ref.url, base_dir), ref.kind, ref.offset, ref.attrs, ref.in_head)
+                           for ref in extract_html_references(html, inline))
+
+    def expand(self, references: Iterable[Tuple[str, str, int, Dict, bool]]) -> List[Node]:
+        """
+        展开页面直接引用的 (路径, 类型, 位置, 属性, 是否在 <head>)，递归加入样式表的子资源
+
+        站点内不存在的文件被忽略；外部资源保留（external=True）。
+        每个资源只出现一次；同时被 HTML 直接引用（如 preload 的字体）的资源
+        按 HTML 中的位置发现，不算作样式表的子资源。
+        """
+        references = list(references)
+        direct = {ref[0] for ref in references}
+        nodes: List[Node] = []
+        seen = set()
+
+        def add(path: str, kind: str, offset: int, attrs: Dict, in_head: bool, parent: Optional[str]):
+            if path in seen or (parent is not None and path in direct):
+                return
+            external = is_external(path)
+            if not external and not self.exists(path):
+                return
+            seen.add(path)
+            nodes.append(Node(path, kind, offset, attrs, parent, external, in_head))
+            if kind == 'css' and not external:
+                for child, child_kind in self.css_children(path):
+                    add(child, child_kind, offset, {}, in_head, path)
+
+        for path, kind, offset, attrs, in_head in references:
+            add(path, kind, offset, attrs, in_head, None)
+        return nodes
+
+
+def request_priority(kind: str, cls: str) -> int:
+    """按资源类型和阻塞分类确定请求优先级"""
+    if cls in (ASYNC, DEFER, MODULE):
+        return PRIORITY['deferred_js']
+    if cls == MEDIA_MISMATCH:
+        return PRIORITY['deferred_css']
+    return PRIORITY[kind]
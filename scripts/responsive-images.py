@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应式图片改写脚本（构建后执行）
+按 optimize-images.py 生成的 image-variants.json，把 site/ 中页面的 <img>
+改写为 <picture>：AVIF / WebP 的 <source srcset> 按宽度列出全部变体，sizes 按正文栏宽度给出，
+原 <img> 作为回退并补上 width / height
+
+已在 <picture> 中或已有 srcset 的图片不改写，重复执行结果不变。
+
+用法:
+    mkdocs build && python scripts/responsive-images.py
+    python scripts/responsive-images.py --sizes "(min-width: 76.25em) 640px, 100vw"
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+from image_variants import VARIANTS_INDEX, load_site_variants, rewrite_images
+
+# 设置 UTF-8 输出
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# 颜色输出
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BOLD = '\033[1m'
+    END = '\033[0m'
+
+def print_success(text: str):
+    """打印成功信息"""
+    print(f"{Colors.GREEN}✓ {text}{Colors.END}")
+
+def print_warning(text: str):
+    """打印警告信息"""
+    print(f"{Colors.YELLOW}⚠ {text}{Colors.END}")
+
+def print_error(text: str):
+    """打印错误信息"""
+    print(f"{Colors.RED}✗ {text}{Colors.END}")
+
+def rewrite_site(site_dir: Path, sizes: str = None, dry_run: bool = False, verbose: bool = False) -> int:
+    """改写 site/ 中所有页面，返回改写的 <img> 数"""
+    variants = load_site_variants(site_dir)
+    if not variants:
+        print_warning(f"site/ 中没有 {VARIANTS_INDEX}，请先运行 optimize-images.py 生成响应式变体")
+        return 0
+
+    total = 0
+    pages = 0
+    images = set()
+    for html_path in sorted(site_dir.rglob('*.html')):
+        page_path = html_path.relative_to(site_dir).as_posix()
+        html = html_path.read_text(encoding='utf-8')
+        rewritten_html, rewritten = rewrite_images(html, page_path, variants, sizes)
+        if not rewritten:
+            continue
+        if not dry_run:
+            html_path.write_text(rewritten_html, encoding='utf-8')
+        if verbose:
+            print(f"  {page_path}: {len(rewritten)} 张图片")
+        total += len(rewritten)
+        pages += 1
+        images.update(rewritten)
+
+    unused = sorted(set(variants) - images)
+    print_success(f"{pages} 个页面中的 {total} 个 <img> 已改写为 <picture>（{len(images)} 张不同图片，"
+                  f"索引共 {len(variants)} 张）")
+    if verbose:
+        for path in unused:
+            print(f"  未被页面引用: {path}")
+    return total
+
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='把 site/ 中的 <img> 改写为响应式 <picture> / srcset')
+    parser.add_argument(
+        '--site-dir',
+        type=Path,
+        default=Path('site'),
+        help='构建输出目录（默认: site）'
+    )
+    parser.add_argument(
+        '--sizes',
+        help='所有图片统一使用的 sizes 属性（默认按正文栏宽度和图片宽度计算）'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='只统计，不修改页面'
+    )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='列出每个页面改写的图片数和未被引用的图片'
+    )
+    return parser.parse_args()
+
+def main():
+    """主函数"""
+    args = parse_args()
+    if not args.site_dir.exists():
+        print_error(f"错误: {args.site_dir} 目录不存在，请先运行 'mkdocs build' 构建站点")
+        sys.exit(1)
+    rewrite_site(args.site_dir, args.sizes, args.dry_run, args.verbose)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多页面会话模拟
+按导航序列依次"访问"页面，跟踪浏览器缓存状态，估算每一步的延迟和传输字节
+
+- 第一步是完整的文档加载；之后的步骤复用已建立的连接（不再解析域名和握手）
+- 启用 navigation.instant 时，之后的步骤只通过 XHR 获取 HTML，
+  CSS/JS 不会重新加载，只请求页面中尚未缓存的图片
+- 冷会话从空缓存开始；热会话模拟回访用户，所有子资源已在缓存中
+- 缓存策略决定已缓存资源是否需要条件请求（304 往返）
+"""
+
+import random
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from network_sim import NetworkConditions, Resource, paint_times, simulate_page
+
+# 页面加载器：页面路径 -> (HTML 大小, 子资源列表)
+PageLoader = Callable[[str], Tuple[int, List[Resource]]]
+
+# 缓存策略：
+# - immutable:  缓存后不再请求（Cache-Control: immutable，适合带内容哈希的文件名）
+# - revalidate: 本次会话内直接使用；回访时缓存已过期，需条件请求（max-age + ETag）
+# - no-cache:   每次使用前都要条件请求
+CACHE_POLICIES = ['immutable', 'revalidate', 'no-cache']
+
+# 304 响应只有响应头
+NOT_MODIFIED_BYTES = 200
+
+
+class CachePolicy:
+    """按路径 glob 确定资源的缓存策略"""
+
+    # 默认与 GitHub Pages 一致：所有文件 max-age=600 并带 ETag
+    DEFAULT = 'revalidate'
+
+    def __init__(self, default: str = DEFAULT, rules: Optional[List[Dict]] = None):
+        for policy in [default] + [rule.get('policy') for rule in rules or []]:
+            if policy not in CACHE_POLICIES:
+                raise ValueError(f"未知的缓存策略: {policy}（可用: {', '.join(CACHE_POLICIES)}）")
+        self.default = default
+        self.rules = rules or []
+        self._memo: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> 'CachePolicy':
+        """
+        读取缓存策略文件；未指定时使用默认策略
+
+        文件格式:
+            default: revalidate
+            rules:
+              - match: "assets/javascripts/bundle.*.min.js"
+                policy: immutable
+        """
+        if path is None:
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        return cls(config.get('default', cls.DEFAULT), config.get('rules'))
+
+    def policy_for(self, path: str) -> str:
+        """路径（相对 site/）的缓存策略，后面的规则覆盖前面的"""
+        if path not in self._memo:
+            policy = self.default
+            for rule in self.rules:
+                if fnmatchcase(path, rule['match']):
+                    policy = rule['policy']
+            self._memo[path] = policy
+        return self._memo[path]
+
+
+def simulate_session(steps: List[str], load_page: PageLoader, conditions: NetworkConditions,
+                     instant: bool = True, warm: bool = False,
+                     cache_policy: Optional[CachePolicy] = None) -> Dict:
+    """
+    模拟一次会话
+
+    返回 {'steps': [每步结果], 'total_bytes', 'total_time', 'revalidations'}；每步结果含
+    path、mode（full / instant）、fcp_time、lcp_time、bytes、requests、revalidations。
+    total_time 为各步 LCP 之和（不含用户阅读时间）。
+    """
+    cache_policy = cache_policy or CachePolicy()
+    cached = set()   # 浏览器缓存中的资源
+    fresh = set()    # 本次会话内已获取或验证过的资源
+    if warm:
+        for path in steps:
+            cached.update(r.path for r in load_page(path)[1])
+
+    def request_for(resource: Resource) -> Optional[Resource]:
+        """已缓存的资源：不请求（None）或改为 304 条件请求"""
+        if resource.path not in cached:
+            return resource
+        policy = cache_policy.policy_for(resource.path)
+        if policy == 'immutable' or (policy == 'revalidate' and resource.path in fresh):
+            return None
+        return resource._replace(size=NOT_MODIFIED_BYTES)
+
+    results = []
+    for i, path in enumerate(steps):
+        html_size, resources = load_page(path)
+        first = i == 0
+        mode = 'full' if first or not instant else 'instant'
+        step_conditions = conditions if first else conditions._replace(handshake_rtts=0, dns_rtts=0)
+
+        # 即时导航不重新加载 CSS/JS，只加载新内容中的图片
+        if mode == 'instant':
+            resources = [r for r in resources if r.kind == 'img']
+        fetched = [req for req in map(request_for, resources) if req is not None]
+        waterfall = simulate_page(path, html_size, fetched, step_conditions)
+        revalidations = sum(1 for r in fetched if r.path in cached)
+        cached.update(r.path for r in fetched)
+        fresh.update(r.path for r in fetched)
+
+        paint = paint_times(waterfall)
+        results.append({
+            'path': path,
+            'mode': mode,
+            'fcp_time': paint['fcp_time'],
+            'lcp_time': paint['lcp_time'],
+            'bytes': sum(w['size'] for w in waterfall),
+            'requests': len(waterfall),
+            'revalidations': revalidations
+        })
+
+    return {
+        'steps': results,
+        'total_bytes': sum(r['bytes'] for r in results),
+        'total_time': sum(r['lcp_time'] for r in results),
+        'revalidations': sum(r['revalidations'] for r in results)
+    }
+
+
+def synthetic_clicks(pages: List[str], steps: int, seed: int = 0) -> List[str]:
+    """
+    合成点击序列：从随机页面开始，按导航顺序浏览
+
+    每一步 60% 进入下一页、15% 返回上一页、25% 跳到任意页面（如通过搜索或目录）。
+    固定种子保证结果可复现。
+    """
+    rng = random.Random(seed)
+    index = rng.randrange(len(pages))
+    sequence = [pages[index]]
+    for _ in range(steps - 1):
+        roll = rng.random()
+        if roll < 0.60:
+            index = min(index + 1, len(pages) - 1)
+        elif roll < 0.75:
+            index = max(index - 1, 0)
+        else:
+            index = rng.randrange(len(pages))
+        sequence.append(pages[index])
+    return sequence
+
+
+def url_to_page(url_path: str) -> str:
+    """站点 URL 路径（如 /stage1-foundation/ 或 /about/index.html）-> 相对 site/ 的 HTML 路径"""
+    path = url_path.split('#', 1)[0].split('?', 1)[0].strip().lstrip('/')
+    if not path or path.endswith('/'):
+        return path + 'index.html'
+    if not path.endswith('.html'):
+        return path + '/index.html'
+    return path
+
+
+def read_click_log(log_path: Path, known_pages: Optional[set] = None) -> Tuple[List[str], List[str]]:
+    """
+    读取点击记录：每行一个 URL 路径，# 开头为注释
+
+    返回 (页面序列, 站点中不存在而被跳过的路径)。
+    """
+    sequence = []
+    skipped = []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            page = url_to_page(line)
+            if known_pages is not None and page not in known_pages:
+                skipped.append(line)
+                continue
+            sequence.append(page)
+    return sequence, skipped
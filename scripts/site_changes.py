@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量分析辅助模块
+根据 git 变更找出需要重新分析的构建页面
+
+供 test-performance.py 和 measure-load-time.py 的 --changed-only / --since 模式使用：
+- docs/**/*.md 的变更按 mkdocs.yml 的 nav 映射到 site/**/index.html
+- 主题、配置或静态资源的变更会影响所有页面，此时返回 None 表示需要全量分析
+
+nav_html_pages() 同时供 measure-load-time.py 的会话模拟按导航顺序浏览页面。
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+
+class _MkDocsLoader(yaml.SafeLoader):
+    """忽略 mkdocs.yml 中 !!python/name 等标签的 YAML 加载器"""
+
+
+_MkDocsLoader.add_multi_constructor(
+    'tag:yaml.org,2002:python/', lambda loader, suffix, node: None
+)
+
+
+def load_mkdocs_config(config_path: Path = Path('mkdocs.yml')) -> Dict:
+    """读取 mkdocs.yml"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_MkDocsLoader) or {}
+
+
+def nav_pages(nav) -> List[str]:
+    """展开 nav，按导航顺序返回 Markdown 源文件路径（相对 docs/）"""
+    pages = []
+    if isinstance(nav, str):
+        if not nav.startswith(('http://', 'https://')):
+            pages.append(nav)
+    elif isinstance(nav, list):
+        for item in nav:
+            pages.extend(nav_pages(item))
+    elif isinstance(nav, dict):
+        for value in nav.values():
+            pages.extend(nav_pages(value))
+    return pages
+
+
+def md_to_html(md_path: str, use_directory_urls: bool = True) -> str:
+    """
+    Markdown 源文件路径 -> 构建后的 HTML 路径（均相对于各自根目录）
+
+    与 MkDocs 规则一致：index.md / README.md 对应目录的 index.html，
+    其余页面在 use_directory_urls 下对应 <name>/index.html。
+    """
+    path = Path(md_path)
+    if path.stem in ('index', 'README'):
+        html_path = path.parent / 'index.html'
+    elif use_directory_urls:
+        html_path = path.parent / path.stem / 'index.html'
+    else:
+        html_path = path.with_suffix('.html')
+    return html_path.as_posix()
+
+
+def nav_html_pages(config: Dict) -> List[str]:
+    """按 nav 顺序返回构建后的页面路径（相对 site/，去重）"""
+    use_directory_urls = config.get('use_directory_urls', True)
+    pages = []
+    for md in nav_pages(config.get('nav')):
+        html_path = md_to_html(md, use_directory_urls)
+        if html_path not in pages:
+            pages.append(html_path)
+    return pages
+
+
+def git_changed_files(since: Optional[str] = None) -> List[str]:
+    """
+    列出相对 since（默认 HEAD）变更的文件，包含未提交和未跟踪的文件
+    """
+    ref = since or 'HEAD'
+    changed = subprocess.run(
+        ['git', 'diff', '--name-only', ref],
+        capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    untracked = subprocess.run(
+        ['git', 'ls-files', '--others', '--exclude-standard'],
+        capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return sorted(set(changed) | set(untracked))
+
+
+def changed_site_pages(since: Optional[str] = None,
+                       config_path: Path = Path('mkdocs.yml')) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    找出受变更影响的构建页面
+
+    返回 (changed, removed)：需要重新分析的页面和已删除源文件对应的页面，
+    路径均相对 site/。配置、主题或非 Markdown 文档资源变更时返回 None（需全量分析）。
+    """
+    config = load_mkdocs_config(config_path)
+    docs_dir = config.get('docs_dir', 'docs').rstrip('/') + '/'
+    theme = config.get('theme') or {}
+    custom_dir = theme.get('custom_dir') if isinstance(theme, dict) else None
+    use_directory_urls = config.get('use_directory_urls', True)
+
+    # nav 中的页面按 nav 映射；不在 nav 中的页面 MkDocs 同样会构建，按相同规则映射
+    nav_html = {md: md_to_html(md, use_directory_urls) for md in nav_pages(config.get('nav'))}
+
+    changed = []
+    removed = []
+    for file_path in git_changed_files(since):
+        if file_path == config_path.as_posix():
+            return None
+        if custom_dir and file_path.startswith(custom_dir.rstrip('/') + '/'):
+            return None
+        if not file_path.startswith(docs_dir):
+            continue
+        if not file_path.endswith('.md'):
+            return None
+
+        md_path = file_path[len(docs_dir):]
+        html_path = nav_html.get(md_path) or md_to_html(md_path, use_directory_urls)
+        if Path(file_path).exists():
+            changed.append(html_path)
+        else:
+            removed.append(html_path)
+    return changed, removed
@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVG 压缩
+optimize-images.py 使用：删除注释、<metadata> 和编辑器命名空间（Inkscape、Sodipodi、Illustrator、Sketch 等），
+折叠空白，降低路径数据和数值属性的精度，合并冗余的 <g>，删除未被引用的 id，压缩 <style> 中的 CSS。
+
+序列化时按源文件注册命名空间前缀（默认命名空间保持无前缀，xlink 仍为 xlink:），不会出现 ns0:。
+压缩后比较前后的渲染结构（每个绘制元素的标签、属性、继承的表现属性、变换链和文本；
+数值用原始值与压缩后的值按舍入误差比较），不一致时抛出 SvgStructureError，调用方保留原文件。
+"""
+
+import io
+import math
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+
+# 编辑器私有命名空间：其中的元素和属性不影响渲染
+EDITOR_NAMESPACES = {
+    'http://www.inkscape.org/namespaces/inkscape',
+    'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'http://www.bohemiancoding.com/sketch/ns',
+    'http://www.serif.com/',
+    'http://ns.adobe.com/AdobeIllustrator/10.0/',
+    'http://ns.adobe.com/AdobeSVGViewerExtensions/3.0/',
+    'http://ns.adobe.com/Extensibility/1.0/',
+    'http://ns.adobe.com/Flows/1.0/',
+    'http://ns.adobe.com/GenericCustomNamespace/1.0/',
+    'http://ns.adobe.com/Graphs/1.0/',
+    'http://ns.adobe.com/ImageReplacement/1.0/',
+    'http://ns.adobe.com/SaveForWeb/1.0/',
+    'http://ns.adobe.com/Variables/1.0/',
+    'http://ns.adobe.com/XPath/1.0/',
+}
+
+# 文本内容元素：空白有意义，只折叠不删除
+TEXT_ELEMENTS = {'text', 'title', 'desc'}
+# 子树原样保留的元素
+OPAQUE_ELEMENTS = {'script', 'foreignObject'}
+
+# 会被子元素继承的表现属性：单子元素的 <g> 可以把这些属性下移到子元素
+INHERITED_ATTRS = {
+    'clip-rule', 'color', 'direction', 'fill', 'fill-opacity', 'fill-rule',
+    'font-family', 'font-size', 'font-style', 'font-variant', 'font-weight',
+    'letter-spacing', 'marker-end', 'marker-mid', 'marker-start',
+    'stroke', 'stroke-dasharray', 'stroke-dashoffset', 'stroke-linecap', 'stroke-linejoin',
+    'stroke-miterlimit', 'stroke-opacity', 'stroke-width', 'text-anchor', 'visibility',
+    'word-spacing', 'writing-mode',
+}
+TRANSFORM_ATTRS = {'transform', 'gradientTransform', 'patternTransform'}
+# 变换的系数会放大其后的全部坐标，比其他数值多保留两位（同 svgo：transformPrecision 5，floatPrecision 3）
+TRANSFORM_EXTRA_PRECISION = 2
+
+# 取值为数字或数字列表的属性（数值按精度舍入）
+NUMBER_ATTRS = {
+    'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'fx', 'fy', 'dx', 'dy',
+    'width', 'height', 'offset', 'opacity', 'fill-opacity', 'stroke-opacity', 'stop-opacity',
+    'stroke-width', 'stroke-dasharray', 'stroke-dashoffset', 'stroke-miterlimit',
+    'font-size', 'letter-spacing', 'word-spacing', 'refX', 'refY', 'markerWidth', 'markerHeight',
+    'viewBox', 'rotate', 'startOffset', 'textLength', 'stdDeviation',
+}
+
+NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+SEPARATOR_PATTERN = re.compile(r'[\s,]*')
+TRANSFORM_PATTERN = re.compile(r'([A-Za-z]+)\s*\(([^)]*)\)')
+# 每个路径命令的参数个数
+PATH_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+
+class SvgStructureError(ValueError):
+    """压缩改变了渲染结构或丢失了被引用的 id"""
+
+
+def local_name(tag) -> str:
+    """去掉 {命名空间} 的标签或属性名"""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def namespace(tag) -> str:
+    """标签或属性的命名空间（无命名空间时为空字符串）"""
+    return tag[1:].split('}', 1)[0] if isinstance(tag, str) and tag.startswith('{') else ''
+
+
+def format_number(value: float, precision: int) -> str:
+    """
+    数值的最短写法：保留 precision 位小数，绝对值小于 1 时至少保留 precision 位有效数字
+    （0.0005 不会变成 .001 或 0）；去掉多余的 0 和前导 0（0.5 -> .5），更短时用指数形式
+    """
+    decimals = precision
+    if value and abs(value) < 1:
+        decimals = max(precision, precision - 1 - math.floor(math.log10(abs(value))))
+    text = _strip_zeros(f'{round(value, decimals):.{decimals}f}')
+    if decimals > precision:
+        mantissa, exponent = f'{value:.{precision - 1}e}'.split('e')
+        scientific = f'{_strip_zeros(mantissa)}e{int(exponent)}'
+        if len(scientific) < len(text):
+            return scientific
+    return text
+
+
+def _strip_zeros(text: str) -> str:
+    """去掉小数末尾的 0 和整数部分的前导 0"""
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('', '-0'):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def join_numbers(numbers: List[str]) -> str:
+    """用最少的分隔符连接数值：负号和第二个小数点本身就能分隔"""
+    parts = []
+    for i, number in enumerate(numbers):
+        if i and not (number[0] == '-' or (number[0] == '.' and '.' in numbers[i - 1]
+                                           and 'e' not in numbers[i - 1].lower())):
+            parts.append(' ')
+        parts.append(number)
+    return ''.join(parts)
+
+
+def parse_path(d: str) -> List[Tuple[str, List[float]]]:
+    """把路径数据解析为 [(命令, 参数), ...]，隐式重复的命令拆成独立的段；格式错误时抛出 ValueError"""
+    segments = []
+    pos = 0
+    command = None
+    args: List[float] = []
+    while True:
+        pos = SEPARATOR_PATTERN.match(d, pos).end()
+        if pos >= len(d):
+            break
+        char = d[pos]
+        if char.upper() in PATH_ARGS:
+            if command is not None and args:
+                raise ValueError(f"路径命令 {command} 的参数不完整")
+            command = char
+            pos += 1
+            if command.upper() == 'Z':
+                segments.append((command, []))
+            continue
+        if command is None or command.upper() == 'Z':
+            raise ValueError(f"路径数据在位置 {pos} 缺少命令")
+        if command.upper() == 'A' and len(args) in (3, 4):
+            # 弧线的两个标志位只有一个字符，可以与后面的数值紧贴
+            if char not in '01':
+                raise ValueError(f"弧线标志位无效: {char}")
+            args.append(float(char))
+            pos += 1
+        else:
+            match = NUMBER_PATTERN.match(d, pos)
+            if not match:
+                raise ValueError(f"路径数据在位置 {pos} 无法解析")
+            args.append(float(match.group(0)))
+            pos = match.end()
+        if len(args) == PATH_ARGS[command.upper()]:
+            segments.append((command, args))
+            args = []
+            # M 之后的隐式坐标对是 L
+            if command == 'M':
+                command = 'L'
+            elif command == 'm':
+                command = 'l'
+    if args:
+        raise ValueError(f"路径命令 {command} 的参数不完整")
+    return segments
+
+
+def format_path(segments: List[Tuple[str, List[float]]], precision: int) -> str:
+    """序列化路径：省略可隐式重复的命令字母（M 后的 L 也可省略，重复的 M 不能省略）"""
+    chunks: List[Tuple[str, List[str]]] = []
+    for command, args in segments:
+        numbers = [format_number(v, precision) for v in args]
+        previous = chunks[-1][0] if chunks else None
+        implicit = bool(numbers) and previous is not None and (
+            (command == previous and command not in 'Mm')
+            or (previous == 'M' and command == 'L') or (previous == 'm' and command == 'l')
+        )
+        if implicit:
+            chunks[-1][1].extend(numbers)
+        else:
+            chunks.append((command, numbers))
+    return ''.join(command + join_numbers(numbers) for command, numbers in chunks)
+
+
+def minify_path(d: str, precision: int) -> str:
+    """压缩路径数据；无法解析时原样返回"""
+    try:
+        return format_path(parse_path(d), precision)
+    except ValueError:
+        return d
+
+
+def minify_transform(value: str, precision: int) -> str:
+    """压缩 transform：数值舍入，参数用最少的分隔符"""
+    functions = TRANSFORM_PATTERN.findall(value)
+    if not functions or TRANSFORM_PATTERN.sub('', value).strip(' \t\r\n,'):
+        return value
+    return ' '.join(
+        f"{name}({join_numbers([format_number(float(n), precision) for n in NUMBER_PATTERN.findall(args)])})"
+        for name, args in functions
+    )
+
+
+def minify_numbers(value: str, precision: int, compact: bool = False) -> str:
+    """数值属性：舍入其中的每个数值，分隔符折叠为一个空格（compact 时尽量省略）"""
+    if compact:
+        tokens = re.split(r'[\s,]+', value.strip())
+        if tokens and all(NUMBER_PATTERN.fullmatch(t) for t in tokens):
+            return join_numbers([format_number(float(t), precision) for t in tokens])
+    rounded = NUMBER_PATTERN.sub(lambda m: format_number(float(m.group(0)), precision), value)
+    return re.sub(r'\s*,\s*|\s+', ' ', rounded).strip()
+
+
+def minify_css(css: str) -> str:
+    """压缩 CSS：删除注释，折叠空白，去掉标点两侧和规则末尾多余的字符"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_style_attr(style: str) -> str:
+    """压缩 style 属性中的声明（没有选择器，冒号两侧的空白都可以删除）"""
+    return re.sub(r'\s*:', ':', minify_css(style)).rstrip(';')
+
+
+def minify_attr(name: str, value: str, precision: int) -> str:
+    """按属性类型压缩取值"""
+    if name == 'd':
+        return minify_path(value, precision)
+    if name in TRANSFORM_ATTRS:
+        return minify_transform(value, precision + TRANSFORM_EXTRA_PRECISION)
+    if name == 'points':
+        return minify_numbers(value, precision, compact=True)
+    if name in NUMBER_ATTRS:
+        return minify_numbers(value, precision)
+    if name == 'style':
+        return minify_style_attr(value)
+    return value
+
+
+def _parse(data: bytes) -> Tuple[ET.Element, List[Tuple[str, str]]]:
+    """解析 SVG（保留注释以便统计），同时返回源文件声明的命名空间前缀"""
+    prefixes = [value for _, value in ET.iterparse(io.BytesIO(data), events=('start-ns',))]
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    parser.feed(data)
+    return parser.close(), prefixes
+
+
+def _register_prefixes(prefixes: List[Tuple[str, str]]):
+    """
+    按源文件注册命名空间前缀，序列化时保持原样（不产生 ns0:）；
+    同一命名空间既是默认命名空间又有前缀（Inkscape 的 xmlns:svg）时使用默认命名空间
+    """
+    for prefix, uri in sorted(prefixes, key=lambda item: item[0] == ''):
+        if uri in EDITOR_NAMESPACES:
+            continue
+        try:
+            ET.register_namespace(prefix, uri)
+        except ValueError:
+            pass  # ns0 形式的前缀是 ElementTree 保留的
+
+
+def _is_editor(tag) -> bool:
+    """编辑器命名空间或 <metadata> 中的元素"""
+    return namespace(tag) in EDITOR_NAMESPACES or local_name(tag) == 'metadata'
+
+
+def _referenced_ids(root: ET.Element) -> Optional[set]:
+    """被 url(#id)、href="#id"、CSS 选择器或动画时间引用的 id；有 <script> 时返回 None（全部保留）"""
+    referenced = set()
+    for element in root.iter():
+        name = local_name(element.tag)
+        if name == 'script':
+            return None
+        if name == 'style' and element.text:
+            referenced.update(re.findall(r'#([\w-]+)', element.text))
+        for attr, value in element.attrib.items():
+            referenced.update(re.findall(r'url\(\s*["\']?#([^)"\'\s]+)', value))
+            if local_name(attr) == 'href' and value.startswith('#'):
+                referenced.add(value[1:])
+            if local_name(attr) in ('begin', 'end'):
+                referenced.update(re.findall(r'([\w-]+)\.', value))
+    return referenced
+
+
+def _simple_selectors(root: ET.Element) -> bool:
+    """<style> 中只有单个类、id 或非 g 的类型选择器时，合并 <g> 不会改变选择器的匹配结果"""
+    for element in root.iter():
+        if local_name(element.tag) != 'style' or not element.text:
+            continue
+        css = re.sub(r'/\*.*?\*/', '', element.text, flags=re.S)
+        for selectors in re.findall(r'([^{}]*)\{', css):
+            for selector in selectors.split(','):
+                selector = selector.strip()
+                if not re.fullmatch(r'[.#]?[\w-]+', selector) or selector == 'g':
+                    return False
+    return True
+
+
+class _Minifier:
+    """对一棵 SVG 树就地执行各项压缩，并统计改动"""
+
+    def __init__(self, root: ET.Element, precision: int):
+        self.root = root
+        self.precision = precision
+        self.changes = {
+            'comments': 0, 'editor_elements': 0, 'editor_attrs': 0,
+            'ids': 0, 'groups': 0, 'attrs': 0
+        }
+
+    def run(self):
+        self.remove_editor_content(self.root)
+        referenced = _referenced_ids(self.root)
+        self.clean(self.root, referenced, in_text=False, preserve=False)
+        if _simple_selectors(self.root):
+            self.collapse_groups(self.root)
+
+    def remove_editor_content(self, parent: ET.Element):
+        """删除注释、<metadata> 和编辑器命名空间中的元素与属性（任意深度）"""
+        for child in list(parent):
+            if child.tag is ET.Comment:
+                self._remove(parent, child)
+            elif child.tag is ET.ProcessingInstruction or _is_editor(child.tag):
+                self._remove(parent, child)
+                self.changes['editor_elements'] += 1
+            else:
+                self.remove_editor_content(child)
+        for attr in list(parent.attrib):
+            if namespace(attr) in EDITOR_NAMESPACES:
+                del parent.attrib[attr]
+                self.changes['editor_attrs'] += 1
+
+    @staticmethod
+    def _remove(parent: ET.Element, child: ET.Element):
+        """删除子元素，把它的 tail 文本接到前一个兄弟（或父元素）上"""
+        if child.tail and child.tail.strip():
+            index = list(parent).index(child)
+            if index:
+                previous = parent[index - 1]
+                previous.tail = (previous.tail or '') + child.tail
+            else:
+                parent.text = (parent.text or '') + child.tail
+        parent.remove(child)
+
+    def clean(self, element: ET.Element, referenced: Optional[set], in_text: bool, preserve: bool):
+        """折叠空白、压缩属性值、删除未被引用的 id"""
+        name = local_name(element.tag)
+        space = element.get(f'{{{XML_NS}}}space')
+        if space is not None:
+            preserve = space == 'preserve'
+        in_text = in_text or name in TEXT_ELEMENTS
+
+        if name in OPAQUE_ELEMENTS:
+            return
+        if name == 'style':
+            if element.text:
+                element.text = minify_css(element.text)
+        elif in_text:
+            if not preserve:
+                element.text = _collapse(element.text)
+        elif element.text is not None and not element.text.strip():
+            element.text = None
+
+        element_id = element.get('id')
+        if (element_id is not None and referenced is not None and element_id not in referenced
+                and name not in ('symbol', 'view')):
+            del element.attrib['id']
+            self.changes['ids'] += 1
+
+        for attr, value in list(element.attrib.items()):
+            minified = minify_attr(attr, value, self.precision)
+            if minified != value:
+                element.set(attr, minified)
+                self.changes['attrs'] += 1
+
+        for child in element:
+            if in_text:
+                if not preserve:
+                    child.tail = _collapse(child.tail)
+            elif child.tail is not None and not child.tail.strip():
+                child.tail = None
+            self.clean(child, referenced, in_text, preserve)
+
+    def collapse_groups(self, parent: ET.Element):
+        """自底向上合并冗余的 <g>：无属性的组展开到父元素，单子元素组的继承属性和变换下移"""
+        if local_name(parent.tag) in OPAQUE_ELEMENTS:
+            return
+        for child in list(parent):
+            self.collapse_groups(child)
+        if local_name(parent.tag) == 'switch':
+            return  # <switch> 只渲染第一个匹配的子元素，不能改变子元素数量
+
+        index = 0
+        while index < len(parent):
+            group = parent[index]
+            if group.tag != f'{{{SVG_NS}}}g' or (group.text and group.text.strip()):
+                index += 1
+                continue
+            if not group.attrib:
+                # 展开：子元素按原位置插入父元素
+                children = list(group)
+                if children and group.tail:
+                    children[-1].tail = (children[-1].tail or '') + group.tail
+                parent.remove(group)
+                for offset, child in enumerate(children):
+                    parent.insert(index + offset, child)
+                self.changes['groups'] += 1
+                continue  # 展开后的第一个子元素可能也是可合并的组
+            if len(group) == 1 and self._push_down(group, group[0]):
+                parent.remove(group)
+                group[0].tail = group.tail
+                parent.insert(index, group[0])
+                self.changes['groups'] += 1
+                continue
+            index += 1
+
+    @staticmethod
+    def _push_down(group: ET.Element, child: ET.Element) -> bool:
+        """把单子元素组的继承属性和变换移到子元素上；不能无损下移时返回 False"""
+        if child.tag is ET.Comment or local_name(child.tag) in OPAQUE_ELEMENTS:
+            return False
+        for attr in group.attrib:
+            if attr in TRANSFORM_ATTRS:
+                if attr != 'transform':
+                    return False
+            elif attr not in INHERITED_ATTRS or attr in child.attrib:
+                return False
+        for attr, value in group.attrib.items():
+            if attr == 'transform' and 'transform' in child.attrib:
+                child.set('transform', f"{value} {child.get('transform')}")
+            else:
+                child.set(attr, value)
+        return True
+
+
+def _collapse(text: Optional[str]) -> Optional[str]:
+    """按 xml:space="default" 的规则折叠连续空白"""
+    if text is None:
+        return None
+    return re.sub(r'\s+', ' ', text)
+
+
+class _Numbers:
+    """
+    数值属性的比较形式：非数值部分（路径命令、变换函数名等）必须相同，
+    数值允许相差 precision 位有效数字的舍入误差，用原始值与压缩后的值比较
+    """
+    __slots__ = ('skeleton', 'numbers', 'rel_tol')
+
+    def __init__(self, name: str, value: str, precision: int):
+        if name in TRANSFORM_ATTRS:
+            precision += TRANSFORM_EXTRA_PRECISION
+        self.rel_tol = 10.0 ** (1 - precision)
+        self.skeleton, self.numbers = value, ()
+        if name == 'd':
+            try:
+                segments = parse_path(value)
+            except ValueError:
+                return  # 无法解析的路径原样保留，按字符串比较
+            self.skeleton = tuple(command for command, _ in segments)
+            self.numbers = tuple(v for _, args in segments for v in args)
+        elif name in TRANSFORM_ATTRS:
+            functions = TRANSFORM_PATTERN.findall(value)
+            if functions and not TRANSFORM_PATTERN.sub('', value).strip(' \t\r\n,'):
+                numbers = [NUMBER_PATTERN.findall(args) for _, args in functions]
+                self.skeleton = tuple((fn, len(args)) for (fn, _), args in zip(functions, numbers))
+                self.numbers = tuple(float(n) for args in numbers for n in args)
+        else:
+            # 分隔符可以被压缩掉（1 -2 -> 1-2），只比较数值以外的内容
+            self.skeleton = re.sub(r'[\s,]+', '', NUMBER_PATTERN.sub('#', value))
+            self.numbers = tuple(float(n) for n in NUMBER_PATTERN.findall(value))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, _Numbers):
+            return NotImplemented
+        return (self.skeleton == other.skeleton and len(self.numbers) == len(other.numbers)
+                and all(math.isclose(a, b, rel_tol=self.rel_tol, abs_tol=0.0)
+                        for a, b in zip(self.numbers, other.numbers)))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'_Numbers({self.skeleton!r}, {self.numbers!r})'
+
+
+def _comparable(name: str, value: str, precision: int):
+    """属性值在渲染结构签名中的形式：数值属性按误差比较，style 按压缩后的声明比较"""
+    if name == 'd' or name == 'points' or name in TRANSFORM_ATTRS or name in NUMBER_ATTRS:
+        return _Numbers(name, value, precision)
+    if name == 'style':
+        return minify_style_attr(value)
+    return value
+
+
+def render_structure(root: ET.Element, precision: int) -> List[Tuple]:
+    """
+    渲染结构签名：按文档顺序列出每个非 <g> 元素的标签、自身属性、继承到的表现属性、
+    累积的变换链、所在的合成组（带 opacity、filter 等非继承属性的 <g>）和文本；
+    数值不做归一化，比较时允许 precision 位有效数字的舍入误差（原值和压缩后的值各自参与比较），
+    编辑器内容、注释和 id 不计入（被引用的 id 单独检查）
+    """
+    signature = []
+
+    def visit(element: ET.Element, inherited: Dict[str, str], transforms: Tuple[str, ...],
+              frames: Tuple, preserve: bool):
+        if element.tag is ET.Comment or element.tag is ET.ProcessingInstruction or _is_editor(element.tag):
+            return
+        name = local_name(element.tag)
+        space = element.get(f'{{{XML_NS}}}space')
+        if space is not None:
+            preserve = space == 'preserve'
+        own = {attr: value for attr, value in element.attrib.items()
+               if namespace(attr) not in EDITOR_NAMESPACES and attr != 'id'}
+        inherited = dict(inherited)
+        for attr in INHERITED_ATTRS & own.keys():
+            inherited[attr] = _comparable(attr, own.pop(attr), precision)
+        if 'transform' in own:
+            transforms = transforms + (own.pop('transform'),)
+        own = {attr: _comparable(attr, value, precision) for attr, value in own.items()}
+        if element.tag == f'{{{SVG_NS}}}g':
+            if own:
+                frames = frames + (tuple(sorted(own.items())),)
+        else:
+            if name == 'style':
+                text = minify_css(element.text or '')
+            elif name in OPAQUE_ELEMENTS or preserve:
+                text = element.text or ''
+            else:
+                text = re.sub(r'\s+', ' ', element.text or '').strip()
+            tails = tuple(re.sub(r'\s+', ' ', c.tail or '').strip() if not preserve else (c.tail or '')
+                          for c in element if not _is_editor(c.tag))
+            signature.append((element.tag, tuple(sorted(own.items())), tuple(sorted(inherited.items())),
+                              _Numbers('transform', ' '.join(transforms), precision), frames, text, tails if name in TEXT_ELEMENTS else ()))
+        if name in OPAQUE_ELEMENTS:
+            signature.append(tuple((e.tag, tuple(sorted(e.attrib.items())), e.text, e.tail if e is not element else None)
+                                   for e in element.iter()))
+            return
+        for child in element:
+            visit(child, inherited, transforms, frames, preserve)
+
+    visit(root, {}, (), (), False)
+    return signature
+
+
+def _ids(root: ET.Element) -> set:
+    return {e.get('id') for e in root.iter() if e.get('id') is not None}
+
+
+def minify_svg(data: bytes, precision: int = 3) -> Tuple[bytes, Dict[str, int]]:
+    """
+    压缩 SVG，返回 (压缩后的字节, 各项改动计数)
+
+    压缩后的渲染结构与原文件不一致，或被引用的 id 丢失时抛出 SvgStructureError。
+    """
+    root, prefixes = _parse(data)
+    before = render_structure(root, precision)
+    referenced = _referenced_ids(root)
+    original_ids = _ids(root)
+
+    minifier = _Minifier(root, precision)
+    minifier.run()
+
+    if render_structure(root, precision) != before:
+        raise SvgStructureError("压缩后渲染结构发生变化")
+    if referenced is not None and (referenced & original_ids) - _ids(root):
+        raise SvgStructureError("压缩后丢失了被引用的 id")
+
+    _register_prefixes(prefixes)
+    text = ET.tostring(root, encoding='unicode', short_empty_elements=True)
+    # ElementTree 在自闭合标签前加空格；文本和属性中的 > 已被转义，可以安全替换
+    text = text.replace(' />', '/>')
+    if data.lstrip().startswith(b'<?xml'):
+        text = '<?xml version="1.0" encoding="UTF-8"?>' + text
+    # 根元素外的注释在解析时已丢弃，按前后差值统计
+    minifier.changes['comments'] = data.count(b'<!--') - text.count('<!--')
+    return text.encode('utf-8'), minifier.changes
@@ -11,20 +11,42 @@ Requirements: 11.1 - 页面加载性能要求
 """
 
 import os
+import posixpath
 import sys
 import json
-import gzip
 import time
+import argparse
+import codecs
+import hashlib
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 import statistics
 
+from asset_dedup import find_exact_duplicates, find_near_duplicates, fingerprint_file
+from compression import BASELINE_ENCODING, CHUNK_SIZE, COMPRESSORS
+from image_variants import CONTENT_WIDTH, FORMATS, load_site_variants, pick_candidate
+from perf_budgets import ASSET_CLASSES, Budgets, find_regressions
+from perf_history import HISTORY_PATH, PerformanceHistory
+from resource_graph import HtmlReferenceExtractor, ResourceGraph, resolve_url
+from report_writers import JUnitWriter, NdjsonWriter
+from site_changes import changed_site_pages
+from third_party import THIRD_PARTY_PATH, ThirdPartyManifest
+
 # 设置 UTF-8 输出
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# 性能报告路径（增量模式从这里读取上次结果）
+REPORT_PATH = Path('performance-report.json')
+NDJSON_REPORT_PATH = Path('performance-report.ndjson')
+JUNIT_REPORT_PATH = Path('performance-report.junit.xml')
+
 # 颜色输出
 class Colors:
     GREEN = '\033[92m'
@@ -56,12 +78,132 @@ def get_file_size(file_path: Path) -> int:
     """获取文件大小（字节）"""
     return file_path.stat().st_size
 
+class SiteFile(NamedTuple):
+    """站点清单中的单个文件（大小和 mtime 在扫描时一次性记录）"""
+    path: Path
+    rel_path: str
+    size: int
+    mtime_ns: int
+
+class SiteInventory:
+    """
+    站点文件清单
+
+    一次 os.scandir 遍历完成全部分类，之后各分析函数、报告和建议
+    都从内存索引中取文件，不再重复遍历目录或 stat()。
+    """
+
+    CATEGORIES = {
+        '.html': 'html',
+        '.css': 'css',
+        '.js': 'js',
+        '.png': 'images', '.jpg': 'images', '.jpeg': 'images',
+        '.gif': 'images', '.svg': 'images', '.webp': 'images', '.avif': 'images',
+        '.woff': 'fonts', '.woff2': 'fonts', '.ttf': 'fonts', '.eot': 'fonts',
+    }
+
+    def __init__(self, site_dir: Path):
+        self.site_dir = site_dir
+        self.files: Dict[str, List[SiteFile]] = {
+            category: [] for category in ['html', 'css', 'js', 'images', 'fonts', 'other']
+        }
+        self.by_path: Dict[str, SiteFile] = {}
+
+    @classmethod
+    def scan(cls, site_dir: Path) -> 'SiteInventory':
+        """遍历站点目录并按类型分类（结果按路径排序）"""
+        inventory = cls(site_dir)
+        stack = [(str(site_dir), '')]
+        while stack:
+            dir_path, rel_prefix = stack.pop()
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    rel_path = os.path.join(rel_prefix, entry.name) if rel_prefix else entry.name
+                    if entry.is_dir():
+                        stack.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        st = entry.stat()
+                        inventory._add(SiteFile(Path(entry.path), rel_path, st.st_size, st.st_mtime_ns))
+        for files in inventory.files.values():
+            files.sort(key=lambda f: f.rel_path)
+        return inventory
+
+    def _add(self, site_file: SiteFile):
+        """登记文件"""
+        category = self.CATEGORIES.get(os.path.splitext(site_file.rel_path)[1].lower(), 'other')
+        self.files[category].append(site_file)
+        self.by_path[site_file.rel_path] = site_file
+
+    @classmethod
+    def from_paths(cls, site_dir: Path, rel_paths: List[str]) -> 'SiteInventory':
+        """只登记指定的文件（增量模式使用，不遍历整个站点）"""
+        inventory = cls(site_dir)
+        for rel_path in sorted(set(rel_paths)):
+            file_path = site_dir / rel_path
+            if file_path.is_file():
+                st = file_path.stat()
+                inventory._add(SiteFile(file_path, str(Path(rel_path)), st.st_size, st.st_mtime_ns))
+        return inventory
+
+    def get(self, rel_path: str) -> Optional[SiteFile]:
+        """按相对路径查找文件"""
+        return self.by_path.get(rel_path)
+
+    def __len__(self) -> int:
+        return len(self.by_path)
+
+class TagCounter:
+    """
+    流式标签计数器
+
+    只保留每个标签 len(tag) - 1 字节的尾部，用于统计跨块边界的匹配，
+    结果与对完整内容调用 count() 相同。
+    """
+
+    def __init__(self, tags: List[bytes]):
+        self.counts = {tag: 0 for tag in tags}
+        self.tails = {tag: b'' for tag in tags}
+
+    def feed(self, chunk: bytes):
+        """处理一个数据块"""
+        for tag in self.counts:
+            keep = len(tag) - 1
+            tail = self.tails[tag]
+            # 跨边界的匹配必然从尾部开始、在本块前 keep 字节内结束
+            self.counts[tag] += chunk.count(tag) + (tail + chunk[:keep]).count(tag)
+            self.tails[tag] = (tail + chunk[-keep:])[-keep:]
+
+def analyze_stream(file_path: Path, tags: List[bytes] = (),
+                   encodings: List[str] = (BASELINE_ENCODING,),
+                   sink: Optional[Callable[[bytes], None]] = None) -> Tuple[Dict[str, int], Dict[bytes, int]]:
+    """
+    单次分块读取文件，同时计算各编码的压缩大小和标签计数
+
+    返回 (sizes, counts)。每个数据块依次送入所有压缩器，
+    增加编码不会增加 I/O；压缩输出只累计长度不保存。
+    指定 sink 时每个数据块也交给它（如收集页面内容提取资源引用）。
+    """
+    compressors = {name: COMPRESSORS[name]() for name in encodings}
+    sizes = {name: 0 for name in encodings}
+    counter = TagCounter(list(tags))
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            for name, compressor in compressors.items():
+                sizes[name] += len(compressor.compress(chunk))
+            counter.feed(chunk)
+            if sink:
+                sink(chunk)
+    for name, compressor in compressors.items():
+        sizes[name] += len(compressor.flush())
+    return sizes, counter.counts
+
 def get_gzip_size(file_path: Path) -> int:
     """获取 Gzip 压缩后的文件大小"""
-    with open(file_path, 'rb') as f:
-        content = f.read()
-    compressed = gzip.compress(content, compresslevel=9)
-    return len(compressed)
+    return analyze_stream(file_path)[0][BASELINE_ENCODING]
+
+def transfer_size(file_info: Dict, encoding: str) -> int:
+    """获取文件在指定编码下的传输大小"""
+    return file_info.get('compressed_sizes', {}).get(encoding, file_info['gzip_size'])
 
 def format_size(size_bytes: int) -> str:
     """格式化文件大小"""
@@ -72,46 +214,320 @@ def format_size(size_bytes: int) -> str:
     else:
         return f"{size_bytes / (1024 * 1024):.2f} MB"
 
-def analyze_html_file(file_path: Path) -> Dict:
+def analyze_html_file(site_file: SiteFile, encodings: List[str] = (BASELINE_ENCODING,)) -> Dict:
     """分析单个 HTML 文件"""
-    original_size = get_file_size(file_path)
-    gzip_size = get_gzip_size(file_path)
-    compression_ratio = (1 - gzip_size / original_size) * 100
+    original_size = site_file.size
     
-    # 读取文件内容分析
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    # 单次读取：压缩、资源引用统计和引用提取共用同一个数据块；
+    # 引用在读取过程中逐块提取，不需要在内存中拼出整个页面
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    extractor = HtmlReferenceExtractor()
+    sizes, counts = analyze_stream(
+        site_file.path, [b'<link', b'<style', b'<script', b'<img'], encodings,
+        lambda chunk: extractor.feed(decoder.decode(chunk))
+    )
+    extractor.feed(decoder.decode(b'', final=True))
+    # 保存页面中的原始 URL：结果按内容缓存，同样的页面可能位于不同目录，
+    # 由 scan_html_files 按页面路径解析
+    urls = {}
+    for ref in extractor.close():
+        urls.setdefault(ref.url, ref.kind)
+    gzip_size = sizes[BASELINE_ENCODING]
+    compression_ratio = (1 - gzip_size / original_size) * 100
     
     # 统计资源引用
-    css_count = content.count('<link') + content.count('<style')
-    js_count = content.count('<script')
-    img_count = content.count('<img')
+    css_count = counts[b'<link'] + counts[b'<style']
+    js_count = counts[b'<script']
+    img_count = counts[b'<img']
     
     return {
-        'path': str(file_path.relative_to(Path('site'))),
+        'path': site_file.rel_path,
         'original_size': original_size,
         'gzip_size': gzip_size,
+        'compressed_sizes': sizes,
         'compression_ratio': compression_ratio,
         'css_count': css_count,
         'js_count': js_count,
-        'img_count': img_count
+        'img_count': img_count,
+        'references': [[url, kind] for url, kind in urls.items()]
+    }
+
+def page_references(urls: List[List[str]], page_path: str) -> List[List[str]]:
+    """
+    把页面中的原始引用 [URL, 类型] 解析为页面直接引用的资源 [路径, 类型]
+    （路径相对 site/，外部资源为 URL），按出现顺序去重
+    """
+    base_dir = posixpath.dirname(page_path)
+    references = {}
+    for url, kind in urls:
+        references.setdefault(resolve_url(url, base_dir), kind)
+    return [[path, kind] for path, kind in references.items()]
+
+def analyze_resource_file(site_file: SiteFile, encodings: List[str] = (BASELINE_ENCODING,)) -> Dict:
+    """分析单个 CSS/JS 文件"""
+    sizes, _ = analyze_stream(site_file.path, encodings=encodings)
+    return {
+        'path': site_file.rel_path,
+        'size': site_file.size,
+        'gzip_size': sizes[BASELINE_ENCODING],
+        'compressed_sizes': sizes
     }
 
-def scan_html_files(site_dir: Path) -> List[Dict]:
-    """扫描所有 HTML 文件"""
-    html_files = []
-    for html_file in site_dir.rglob('*.html'):
-        if html_file.is_file():
-            html_files.append(analyze_html_file(html_file))
-    return html_files
+class AnalysisCache:
+    """
+    分析结果的持久化缓存（SQLite）
+
+    两级查找：
+    1. 路径 + 大小 + mtime 命中时无需读取文件（主进程中查找）
+    2. 否则按内容 SHA-256 查找，重新构建后字节相同的文件同样命中
+       （在分析进程中计算摘要并查找，见 analyze_with_cache）
+
+    超过 max_age_days 未使用的条目在 close() 时淘汰。
+    """
+
+    # 分析逻辑变化时递增，旧缓存自动失效
+    VERSION = 4
+
+    def __init__(self, db_path: Path, max_age_days: float = 30,
+                 encodings: List[str] = (BASELINE_ENCODING,)):
+        self.db_path = db_path
+        self.encodings = set(encodings)
+        self.max_age_days = max_age_days
+        self.now = time.time()
+        self.stats = {'stat_hits': 0, 'content_hits': 0, 'misses': 0, 'evicted': 0}
+
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS entries (
+                digest TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+        ''')
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != self.VERSION:
+            self.conn.execute('DELETE FROM entries')
+            self.conn.execute('DELETE FROM paths')
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(self.VERSION),))
+            # 立即提交：分析进程通过独立连接读取，不能看到旧版本的条目
+            self.conn.commit()
+
+    def lookup(self, site_file: SiteFile) -> Optional[Dict]:
+        """按路径 + 大小 + mtime 查找缓存结果（不读取文件），未命中时返回 None"""
+        rel_path = site_file.rel_path
+        row = self.conn.execute(
+            'SELECT e.digest, e.data FROM paths p JOIN entries e ON e.digest = p.digest '
+            'WHERE p.path = ? AND p.size = ? AND p.mtime_ns = ?',
+            (rel_path, site_file.size, site_file.mtime_ns)
+        ).fetchone()
+        if row and self._covers(self.encodings, row[1]):
+            self.stats['stat_hits'] += 1
+            return self._touch(row[0], row[1], rel_path)
+        return None
+
+    def reader(self) -> Tuple[str, frozenset]:
+        """传给分析进程的只读查找参数（可 pickle）"""
+        return str(self.db_path), frozenset(self.encodings)
+
+    @staticmethod
+    def find_content(reader: Tuple[str, frozenset], digest: str) -> Optional[str]:
+        """
+        在分析进程中按内容摘要查找缓存条目，返回原始 JSON 或 None
 
-def test_page_sizes(html_files: List[Dict]) -> Tuple[int, int, int]:
-    """测试页面大小"""
-    print_header("页面大小测试")
+        每个进程使用自己的只读连接；主进程未提交的写入对其不可见，
+        只影响本次运行中内容相同的文件是否重复分析。
+        """
+        db_path, encodings = reader
+        key = (db_path, os.getpid())
+        conn = _cache_readers.get(key)
+        if conn is None:
+            conn = _cache_readers[key] = sqlite3.connect(
+                Path(db_path).resolve().as_uri() + '?mode=ro', uri=True
+            )
+        # fetchall() 让语句立即结束，不持有读锁妨碍主进程提交
+        rows = conn.execute('SELECT data FROM entries WHERE digest = ?', (digest,)).fetchall()
+        if rows and AnalysisCache._covers(encodings, rows[0][0]):
+            return rows[0][0]
+        return None
+
+    def remember(self, site_file: SiteFile, digest: str, result: Dict, cached: Optional[str]) -> Dict:
+        """
+        记录分析进程返回的结果：cached 为内容命中的条目，否则保存新结果
+
+        返回带路径的结果。
+        """
+        self.conn.execute(
+            'INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)',
+            (site_file.rel_path, site_file.size, site_file.mtime_ns, digest)
+        )
+        if cached is not None:
+            self.stats['content_hits'] += 1
+            return self._touch(digest, cached, site_file.rel_path)
+        self.stats['misses'] += 1
+        self.store(digest, result)
+        return result
+
+    def store(self, digest: str, result: Dict):
+        """保存分析结果（不含路径，内容相同的文件共享条目）"""
+        data = {k: v for k, v in result.items() if k != 'path'}
+        self.conn.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?)',
+            (digest, json.dumps(data), self.now)
+        )
+
+    @staticmethod
+    def _covers(encodings, data: str) -> bool:
+        """缓存条目是否包含本次要求的全部编码"""
+        return encodings <= json.loads(data).get('compressed_sizes', {}).keys()
+
+    def _touch(self, digest: str, data: str, rel_path: str) -> Dict:
+        """更新最近使用时间并还原结果"""
+        self.conn.execute('UPDATE entries SET last_used = ? WHERE digest = ?', (self.now, digest))
+        result = {'path': rel_path}
+        result.update(json.loads(data))
+        return result
+
+    def close(self):
+        """淘汰过期条目并提交"""
+        cutoff = self.now - self.max_age_days * 86400
+        self.stats['evicted'] = self.conn.execute(
+            'DELETE FROM entries WHERE last_used < ?', (cutoff,)
+        ).rowcount
+        self.conn.execute('DELETE FROM paths WHERE digest NOT IN (SELECT digest FROM entries)')
+        self.conn.commit()
+        self.conn.close()
+
+    def print_summary(self):
+        """打印缓存命中统计"""
+        hits = self.stats['stat_hits'] + self.stats['content_hits']
+        total = hits + self.stats['misses']
+        hit_rate = hits / total * 100 if total else 0.0
+        print(f"{Colors.BOLD}分析缓存:{Colors.END} {self.db_path}")
+        print(f"  命中: {hits} (元数据 {self.stats['stat_hits']}, 内容 {self.stats['content_hits']})")
+        print(f"  未命中: {self.stats['misses']}")
+        print(f"  命中率: {hit_rate:.1f}%")
+        print(f"  淘汰过期条目: {self.stats['evicted']}")
+
+# 分析进程中的只读缓存连接：(数据库路径, 进程号) -> 连接
+_cache_readers: Dict[Tuple[str, int], sqlite3.Connection] = {}
+
+def analyze_with_cache(func: Callable, reader: Tuple[str, frozenset],
+                       site_file: SiteFile) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """
+    在分析进程中计算内容摘要并查缓存，未命中时再分析
+
+    返回 (摘要, 分析结果, 命中的缓存条目)：命中时分析结果为 None。
+    摘要和分析都在进程池中并行执行，主进程只做元数据查找和写入。
+    """
+    hasher = hashlib.sha256()
+    with open(site_file.path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    cached = AnalysisCache.find_content(reader, digest)
+    if cached is not None:
+        return digest, None, cached
+    return digest, func(site_file), None
+
+def run_analysis(func: Callable, items: List, jobs: int = 1, label: str = '文件',
+                 cache: Optional[AnalysisCache] = None,
+                 on_result: Optional[Callable[[Dict], None]] = None) -> List:
+    """
+    逐个分析文件，jobs > 1 时分发到进程池
+
+    结果顺序与输入顺序一致，保证报告输出稳定；
+    进度计数器报告吞吐量（文件/秒）。提供 cache 时命中的文件不再重新分析。
+    on_result 在每个文件得到结果时立即调用（用于流式报告），调用时结果已写入缓存，
+    可以在其中补充与文件路径相关的字段。
+    """
+    total = len(items)
+    results = [None] * total
+    if total == 0:
+        return results
+
+    start = time.perf_counter()
+    done = 0
+
+    # 先在主进程中按元数据查缓存（不读文件），未命中的文件交给分析进程按内容查找或分析
+    pending = []
+    for i, item in enumerate(items):
+        if cache is not None:
+            cached = cache.lookup(item)
+            if cached is not None:
+                results[i] = cached
+                if on_result is not None:
+                    on_result(cached)
+                done += 1
+                _print_progress(label, done, total, start)
+                continue
+        pending.append(i)
+
+    worker = func
+    if cache is not None:
+        worker = partial(analyze_with_cache, func, cache.reader())
+    
+    def collect(i: int, output):
+        nonlocal done
+        if cache is not None:
+            digest, result, cached = output
+            result = cache.remember(items[i], digest, result, cached)
+        else:
+            result = output
+        results[i] = result
+        if on_result is not None:
+            on_result(result)
+        done += 1
+        _print_progress(label, done, total, start)
+
+    if jobs > 1 and len(pending) > 1:
+        # 按每个 worker 约 4 批切分，减少进程间通信开销
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending_items = [items[i] for i in pending]
+            for i, result in zip(pending, executor.map(worker, pending_items, chunksize=chunksize)):
+                collect(i, result)
+    else:
+        for i in pending:
+            collect(i, worker(items[i]))
+    print()
+    return results
+
+def _print_progress(label: str, done: int, total: int, start: float):
+    """打印分析进度和吞吐量（每 100 个文件或结束时刷新一次）"""
+    if done % 100 and done != total:
+        return
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"\r  {label}: {done}/{total} ({rate:.1f} 文件/秒)", end='', flush=True)
+
+def scan_html_files(inventory: SiteInventory, jobs: int = 1,
+                    cache: Optional[AnalysisCache] = None,
+                    encodings: List[str] = (BASELINE_ENCODING,),
+                    ndjson: Optional[NdjsonWriter] = None) -> List[Dict]:
+    """分析清单中的所有 HTML 文件"""
+    analyze = partial(analyze_html_file, encodings=list(encodings))
     
-    # 性能要求
-    MAX_SIZE_KB = 200  # 200KB 压缩后
-    MAX_SIZE_BYTES = MAX_SIZE_KB * 1024
+    def on_result(page: Dict):
+        # 缓存条目按内容共享，其中是原始 URL；在写入缓存之后按本页路径解析
+        page['references'] = page_references(page['references'], Path(page['path']).as_posix())
+        if ndjson:
+            ndjson.write('html', page)
+    
+    return run_analysis(analyze, inventory.files['html'], jobs, 'HTML', cache, on_result)
+
+def test_page_sizes(html_files: List[Dict], budgets: Budgets, encoding: str = BASELINE_ENCODING,
+                    junit: Optional[JUnitWriter] = None) -> Tuple[int, int, int]:
+    """测试页面大小（按指定编码的传输大小检查各页面的预算）"""
+    print_header(f"页面大小测试 ({encoding})")
+    if junit:
+        junit.start_suite(f'页面大小 ({encoding})')
     
     passed = 0
     failed = 0
@@ -119,24 +535,28 @@ def test_page_sizes(html_files: List[Dict]) -> Tuple[int, int, int]:
     
     # 找出首页和最大的页面
     index_page = next((f for f in html_files if f['path'] == 'index.html'), None)
-    largest_page = max(html_files, key=lambda x: x['gzip_size'])
+    largest_page = max(html_files, key=lambda x: transfer_size(x, encoding))
     
     print(f"总页面数: {len(html_files)}")
-    print(f"最大页面: {largest_page['path']} ({format_size(largest_page['gzip_size'])} 压缩后)\n")
+    print(f"最大页面: {largest_page['path']} ({format_size(transfer_size(largest_page, encoding))} 压缩后)\n")
     
     # 测试首页
     if index_page:
+        max_size_kb = budgets.limits_for(index_page['path']).get('max_size_kb')
         print(f"{Colors.BOLD}首页性能:{Colors.END}")
         print(f"  路径: {index_page['path']}")
         print(f"  原始大小: {format_size(index_page['original_size'])}")
-        print(f"  压缩大小: {format_size(index_page['gzip_size'])}")
+        for name, size in index_page['compressed_sizes'].items():
+            print(f"  压缩大小 ({name}): {format_size(size)}")
         print(f"  压缩率: {index_page['compression_ratio']:.1f}%")
         
-        if index_page['gzip_size'] <= MAX_SIZE_BYTES:
-            print_success(f"首页大小符合要求 (< {MAX_SIZE_KB}KB)")
+        if max_size_kb is None:
+            pass
+        elif transfer_size(index_page, encoding) <= max_size_kb * 1024:
+            print_success(f"首页大小符合要求 (< {max_size_kb}KB)")
             passed += 1
         else:
-            print_error(f"首页大小超标: {format_size(index_page['gzip_size'])} > {MAX_SIZE_KB}KB")
+            print_error(f"首页大小超标: {format_size(transfer_size(index_page, encoding))} > {max_size_kb}KB")
             failed += 1
         print()
     
@@ -145,12 +565,21 @@ def test_page_sizes(html_files: List[Dict]) -> Tuple[int, int, int]:
     oversized_pages = []
     
     for file_info in html_files:
-        if file_info['gzip_size'] > MAX_SIZE_BYTES:
+        max_size_kb = budgets.limits_for(file_info['path']).get('max_size_kb')
+        if max_size_kb is None:
+            if junit:
+                junit.case(file_info['path'], skipped='没有大小预算')
+            continue
+        size = transfer_size(file_info, encoding)
+        if junit:
+            over = size > max_size_kb * 1024
+            junit.case(file_info['path'], failure=f"{format_size(size)} > {max_size_kb}KB" if over else None)
+        if size > max_size_kb * 1024:
             oversized_pages.append(file_info)
-            print_error(f"{file_info['path']}: {format_size(file_info['gzip_size'])} (超过 {MAX_SIZE_KB}KB)")
+            print_error(f"{file_info['path']}: {format_size(size)} (超过 {max_size_kb}KB)")
             failed += 1
-        elif file_info['gzip_size'] > MAX_SIZE_BYTES * 0.8:  # 80% 阈值警告
-            print_warning(f"{file_info['path']}: {format_size(file_info['gzip_size'])} (接近限制)")
+        elif size > max_size_kb * 1024 * 0.8:  # 80% 阈值警告
+            print_warning(f"{file_info['path']}: {format_size(size)} (接近 {max_size_kb}KB 限制)")
             warnings += 1
             passed += 1
         else:
@@ -163,17 +592,18 @@ def test_page_sizes(html_files: List[Dict]) -> Tuple[int, int, int]:
         for page in oversized_pages:
             print(f"  {page['path']}:")
             print(f"    原始: {format_size(page['original_size'])}")
-            print(f"    压缩: {format_size(page['gzip_size'])}")
+            print(f"    压缩 ({encoding}): {format_size(transfer_size(page, encoding))}")
             print(f"    CSS: {page['css_count']}, JS: {page['js_count']}, 图片: {page['img_count']}")
     
     return passed, failed, warnings
 
-def test_compression_ratio(html_files: List[Dict]) -> Tuple[int, int, int]:
+def test_compression_ratio(html_files: List[Dict], budgets: Budgets,
+                           junit: Optional[JUnitWriter] = None) -> Tuple[int, int, int]:
     """测试压缩率"""
     print_header("压缩率测试")
     
-    # 要求压缩率 > 70%
-    MIN_COMPRESSION_RATIO = 70.0
+    # 站点平均压缩率使用 html 的默认预算
+    MIN_COMPRESSION_RATIO = budgets.default_limits('html').get('min_compression_ratio', 0)
     
     passed = 0
     failed = 0
@@ -194,19 +624,116 @@ def test_compression_ratio(html_files: List[Dict]) -> Tuple[int, int, int]:
     else:
         print_error(f"平均压缩率不足: {avg_ratio:.1f}% < {MIN_COMPRESSION_RATIO}%")
         failed += 1
+    if junit:
+        junit.start_suite('压缩率')
+        junit.case('平均压缩率', failure=None if avg_ratio >= MIN_COMPRESSION_RATIO
+                   else f"{avg_ratio:.1f}% < {MIN_COMPRESSION_RATIO}%")
     
-    # 检查低压缩率页面
-    low_compression_pages = [f for f in html_files if f['compression_ratio'] < MIN_COMPRESSION_RATIO]
+    # 检查低压缩率页面（按各页面的预算）
+    low_compression_pages = [f for f in html_files if is_low_compression(f, budgets)]
     
     if low_compression_pages:
-        print(f"\n{Colors.BOLD}低压缩率页面 (< {MIN_COMPRESSION_RATIO}%):{Colors.END}")
+        print(f"\n{Colors.BOLD}低压缩率页面:{Colors.END}")
         for page in low_compression_pages[:10]:  # 只显示前 10 个
-            print_warning(f"{page['path']}: {page['compression_ratio']:.1f}%")
+            limit = budgets.limits_for(page['path'])['min_compression_ratio']
+            print_warning(f"{page['path']}: {page['compression_ratio']:.1f}% (< {limit}%)")
             warnings += 1
     
     return passed, failed, warnings
 
-def analyze_static_resources(site_dir: Path) -> Dict:
+def is_low_compression(file_info: Dict, budgets: Budgets) -> bool:
+    """页面压缩率是否低于其预算"""
+    limit = budgets.limits_for(file_info['path']).get('min_compression_ratio')
+    return limit is not None and file_info['compression_ratio'] < limit
+
+def resource_transfer_size(resource: Dict, encoding: str) -> int:
+    """静态资源的传输大小（图片和字体不再压缩，取原始大小）"""
+    return transfer_size(resource, encoding) if 'gzip_size' in resource else resource['size']
+
+def test_resource_budgets(resources: Dict, budgets: Budgets, encoding: str = BASELINE_ENCODING,
+                          junit: Optional[JUnitWriter] = None) -> Tuple[int, int, int]:
+    """按预算检查 CSS、JavaScript、图片和字体的大小"""
+    print_header(f"静态资源预算测试 ({encoding})")
+    if junit:
+        junit.start_suite(f'静态资源预算 ({encoding})')
+    
+    passed = 0
+    failed = 0
+    warnings = 0
+    
+    for asset_class in ASSET_CLASSES[1:]:
+        for resource in resources[asset_class]:
+            max_size_kb = budgets.limits_for(resource['path'], asset_class).get('max_size_kb')
+            if max_size_kb is None:
+                continue
+            size = resource_transfer_size(resource, encoding)
+            if junit:
+                over = size > max_size_kb * 1024
+                junit.case(resource['path'], failure=f"{format_size(size)} > {max_size_kb}KB" if over else None)
+            if size > max_size_kb * 1024:
+                print_error(f"{resource['path']}: {format_size(size)} (超过 {max_size_kb}KB)")
+                failed += 1
+            elif size > max_size_kb * 1024 * 0.8:
+                print_warning(f"{resource['path']}: {format_size(size)} (接近 {max_size_kb}KB 限制)")
+                warnings += 1
+                passed += 1
+            else:
+                passed += 1
+    
+    if failed == 0:
+        print_success(f"{passed} 个有预算的静态资源都符合要求")
+    
+    return passed, failed, warnings
+
+def test_regressions(html_files: List[Dict], resources: Dict, baseline_path: Path,
+                     budgets: Budgets, encoding: str = BASELINE_ENCODING,
+                     junit: Optional[JUnitWriter] = None) -> Tuple[int, int, int]:
+    """与基线报告比较，页面或资源增长超过 max_regression_pct 即失败"""
+    print_header(f"回归检查 (基线: {baseline_path})")
+    
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    regressions = find_regressions(
+        html_files, baseline.get('html_files', []),
+        lambda r: transfer_size(r, encoding), budgets, 'html'
+    )
+    for asset_class in ASSET_CLASSES[1:]:
+        regressions += find_regressions(
+            resources[asset_class], baseline.get('resources', {}).get(asset_class, []),
+            lambda r: resource_transfer_size(r, encoding), budgets, asset_class
+        )
+    
+    if junit:
+        junit.start_suite('回归检查')
+    
+    if not regressions:
+        print_success("没有超过阈值的大小回归")
+        if junit:
+            junit.case(f'相对 {baseline_path}')
+        return 1, 0, 0
+    
+    for reg in regressions:
+        message = (f"{format_size(reg['baseline'])} → {format_size(reg['current'])} "
+                   f"(+{reg['change_pct']:.1f}%，阈值 {reg['limit_pct']}%)")
+        print_error(f"{reg['path']}: {message}")
+        if junit:
+            junit.case(reg['path'], failure=message)
+    return 0, len(regressions), 0
+
+def encoding_totals(files: List[Dict], encodings: List[str]) -> Dict[str, int]:
+    """按编码汇总传输大小"""
+    return {name: sum(transfer_size(f, name) for f in files) for name in encodings}
+
+def print_encoding_totals(files: List[Dict], encodings: List[str]):
+    """打印各编码的传输大小合计"""
+    for name, total in encoding_totals(files, encodings).items():
+        print(f"    {name}: {format_size(total)}")
+
+def analyze_static_resources(inventory: SiteInventory, jobs: int = 1,
+                             cache: Optional[AnalysisCache] = None,
+                             encodings: List[str] = (BASELINE_ENCODING,),
+                             ndjson: Optional[NdjsonWriter] = None) -> Dict:
     """分析静态资源"""
     print_header("静态资源分析")
     
@@ -217,41 +744,20 @@ def analyze_static_resources(site_dir: Path) -> Dict:
         'fonts': []
     }
     
-    # CSS 文件
-    for css_file in site_dir.rglob('*.css'):
-        if css_file.is_file():
-            resources['css'].append({
-                'path': str(css_file.relative_to(site_dir)),
-                'size': get_file_size(css_file),
-                'gzip_size': get_gzip_size(css_file)
-            })
-    
-    # JavaScript 文件
-    for js_file in site_dir.rglob('*.js'):
-        if js_file.is_file():
-            resources['js'].append({
-                'path': str(js_file.relative_to(site_dir)),
-                'size': get_file_size(js_file),
-                'gzip_size': get_gzip_size(js_file)
-            })
-    
-    # 图片文件
-    for ext in ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp']:
-        for img_file in site_dir.rglob(ext):
-            if img_file.is_file():
-                resources['images'].append({
-                    'path': str(img_file.relative_to(site_dir)),
-                    'size': get_file_size(img_file)
-                })
+    # CSS 和 JavaScript 文件（需要压缩，可并行）
+    analyze = partial(analyze_resource_file, encodings=list(encodings))
+    for category, label in [('css', 'CSS'), ('js', 'JavaScript')]:
+        on_result = partial(ndjson.write, category) if ndjson else None
+        resources[category] = run_analysis(analyze, inventory.files[category], jobs, label, cache, on_result)
     
-    # 字体文件
-    for ext in ['*.woff', '*.woff2', '*.ttf', '*.eot']:
-        for font_file in site_dir.rglob(ext):
-            if font_file.is_file():
-                resources['fonts'].append({
-                    'path': str(font_file.relative_to(site_dir)),
-                    'size': get_file_size(font_file)
-                })
+    # 图片和字体文件（大小已在清单中）
+    for category in ['images', 'fonts']:
+        resources[category] = [
+            {'path': f.rel_path, 'size': f.size} for f in inventory.files[category]
+        ]
+        if ndjson:
+            for resource in resources[category]:
+                ndjson.write(category, resource)
     
     # 打印统计
     print(f"{Colors.BOLD}CSS 文件:{Colors.END}")
@@ -262,6 +768,7 @@ def analyze_static_resources(site_dir: Path) -> Dict:
     print(f"  压缩后: {format_size(total_css_gzip)}")
     if resources['css']:
         print(f"  压缩率: {(1 - total_css_gzip / total_css_size) * 100:.1f}%")
+        print_encoding_totals(resources['css'], encodings)
     
     print(f"\n{Colors.BOLD}JavaScript 文件:{Colors.END}")
     total_js_size = sum(r['size'] for r in resources['js'])
@@ -271,6 +778,7 @@ def analyze_static_resources(site_dir: Path) -> Dict:
     print(f"  压缩后: {format_size(total_js_gzip)}")
     if resources['js']:
         print(f"  压缩率: {(1 - total_js_gzip / total_js_size) * 100:.1f}%")
+        print_encoding_totals(resources['js'], encodings)
     
     print(f"\n{Colors.BOLD}图片文件:{Colors.END}")
     total_img_size = sum(r['size'] for r in resources['images'])
@@ -291,8 +799,208 @@ def analyze_static_resources(site_dir: Path) -> Dict:
     
     return resources
 
-def generate_performance_report(html_files: List[Dict], resources: Dict) -> Dict:
-    """生成性能报告"""
+def analyze_page_weights(html_files: List[Dict], resources: Dict, site_dir: Path,
+                         encoding: str = BASELINE_ENCODING,
+                         third_party: Optional[ThirdPartyManifest] = None, top: int = 10):
+    """
+    计算每个页面首次访问的总传输字节：HTML 加上资源引用图中的全部子资源
+    （样式表递归引用的字体、图片和 @import 也计入），写入各页面的
+    page_weight、resource_count、external_resources 和 third_party_bytes
+
+    外部资源的大小取自第三方清单，计入 page_weight；清单中没有的按 0 字节计。
+    """
+    print_header(f"页面总字节 ({encoding})")
+    
+    sizes = {}
+    for asset_class in ASSET_CLASSES[1:]:
+        for resource in resources[asset_class]:
+            sizes[Path(resource['path']).as_posix()] = resource_transfer_size(resource, encoding)
+    # 每个样式表在所有页面间只解析一次
+    graph = ResourceGraph(site_dir, sizes.__contains__)
+    third_party = third_party or ThirdPartyManifest()
+    unknown = set()
+    
+    weighed = []
+    for page in html_files:
+        if 'references' not in page:
+            continue  # 旧版本报告中的页面没有引用信息
+        nodes = graph.expand((path, kind, 0, {}, False) for path, kind in page['references'])
+        local = [n for n in nodes if not n.external]
+        external = [n.path for n in nodes if n.external]
+        third_party_bytes = 0
+        for url in external:
+            known = third_party.sizes(url, encoding)
+            if known is None:
+                unknown.add(url)
+            else:
+                third_party_bytes += known[1]
+        page['third_party_bytes'] = third_party_bytes
+        page['page_weight'] = (transfer_size(page, encoding) + sum(sizes[n.path] for n in local)
+                               + third_party_bytes)
+        page['resource_count'] = len(local)
+        page['external_resources'] = external
+        weighed.append(page)
+    
+    if not weighed:
+        print_warning("报告中的页面没有资源引用信息，请重新完整分析")
+        return
+    
+    weights = [p['page_weight'] for p in weighed]
+    print(f"  平均: {format_size(int(statistics.mean(weights)))}，最大: {format_size(max(weights))}")
+    print(f"\n  {Colors.BOLD}最重的页面:{Colors.END}")
+    for page in sorted(weighed, key=lambda p: p['page_weight'], reverse=True)[:top]:
+        note = ''
+        if page['external_resources']:
+            note = (f"，第三方 {len(page['external_resources'])} 个 "
+                    f"{format_size(page['third_party_bytes'])}")
+        print(f"    {page['path']}: {format_size(page['page_weight'])} "
+              f"({page['resource_count']} 个资源{note})")
+    for url in sorted(unknown):
+        print_warning(f"第三方清单中没有 {url}，未计入页面总字节")
+
+def fingerprint_asset(site_file: SiteFile, chunked: bool = True) -> Dict:
+    """计算资源的内容摘要和分块指纹（供进程池调用）"""
+    return fingerprint_file(site_file.path, site_file.rel_path, chunked)
+
+def analyze_duplicates(inventory: SiteInventory, jobs: int = 1) -> Dict:
+    """检测完全相同和共享大段代码的 CSS/JS/图片资源"""
+    print_header("重复资源分析")
+    
+    # CSS/JS 需要分块指纹（近似重复检测），同时得到内容摘要
+    code_files = inventory.files['css'] + inventory.files['js']
+    fingerprints = run_analysis(fingerprint_asset, code_files, jobs, '分块指纹')
+    
+    # 图片只可能完全重复：大小唯一的图片不可能与其他图片相同，无需读取
+    images_by_size = defaultdict(list)
+    for image in inventory.files['images']:
+        images_by_size[image.size].append(image)
+    candidates = [f for group in images_by_size.values() if len(group) > 1 for f in group]
+    fingerprints += run_analysis(partial(fingerprint_asset, chunked=False), candidates, jobs, '图片摘要')
+    
+    exact = find_exact_duplicates(fingerprints)
+    near = find_near_duplicates([fp for fp in fingerprints if fp['chunks']])
+    wasted_bytes = sum(group['wasted_bytes'] for group in exact)
+    
+    print(f"{Colors.BOLD}完全相同的资源:{Colors.END}")
+    if not exact:
+        print_success("未发现字节完全相同的资源")
+    for group in exact[:10]:
+        print_warning(f"{group['count']} 个副本，每个 {format_size(group['size'])}，"
+                      f"浪费 {format_size(group['wasted_bytes'])}")
+        for path in group['paths']:
+            print(f"    {path}")
+    if exact:
+        print(f"  合计浪费: {format_size(wasted_bytes)}")
+    
+    print(f"\n{Colors.BOLD}近似重复的资源（共享代码块）:{Colors.END}")
+    if not near:
+        print_success("未发现共享大段代码的资源")
+    for pair in near[:10]:
+        print_warning(f"共享 {format_size(pair['shared_bytes'])} ({pair['similarity'] * 100:.0f}%)")
+        for path in pair['paths']:
+            print(f"    {path}")
+    
+    return {
+        'wasted_bytes': wasted_bytes,
+        'exact': exact,
+        'near': near
+    }
+
+# 响应式图片按这两种设备估算实际下载的变体：360px 宽 2x 屏手机、正文栏宽 2x 屏桌面
+MOBILE_IMAGE_WIDTH = 360 * 2
+DESKTOP_IMAGE_WIDTH = CONTENT_WIDTH * 2
+
+def analyze_responsive_images(site_dir: Path, resources: Dict) -> Dict:
+    """
+    列出每张图片的响应式变体（来自 optimize-images.py 写入的 image-variants.json），
+    并按 srcset 选择规则估算手机和桌面实际下载的字节
+
+    没有变体的 PNG/JPEG 单独列出。
+    """
+    print_header("响应式图片")
+    
+    variants = load_site_variants(site_dir)
+    variant_files = {path for entry in variants.values()
+                     for candidates in entry['sources'].values() for _, path in candidates}
+    
+    images = []
+    for path, entry in sorted(variants.items()):
+        image_path = site_dir / path
+        if not image_path.exists():
+            continue
+        record = {
+            'path': path,
+            'width': entry['width'],
+            'height': entry['height'],
+            'size': get_file_size(image_path),
+            'variants': []
+        }
+        if 'quality' in entry:
+            # optimize-images.py --target-ssim 选定的编码质量
+            record['quality'] = entry['quality']
+        for fmt in FORMATS:
+            for width, variant in entry['sources'].get(fmt, []):
+                if not (site_dir / variant).exists():
+                    continue
+                record['variants'].append({
+                    'format': fmt, 'width': width, 'path': variant,
+                    'size': get_file_size(site_dir / variant)
+                })
+        if record['variants']:
+            # 浏览器使用 <source> 中第一个支持的格式（AVIF 优先）
+            preferred = record['variants'][0]['format']
+            candidates = [[v['width'], v['size']] for v in record['variants'] if v['format'] == preferred]
+            record['mobile_bytes'] = pick_candidate(candidates, MOBILE_IMAGE_WIDTH)[1]
+            record['desktop_bytes'] = pick_candidate(candidates, DESKTOP_IMAGE_WIDTH)[1]
+        images.append(record)
+    
+    missing = sorted(
+        r['path'] for r in resources['images']
+        if Path(r['path']).suffix.lower() in ('.png', '.jpg', '.jpeg')
+        and Path(r['path']).as_posix() not in variants and Path(r['path']).as_posix() not in variant_files
+    )
+    
+    measured = [r for r in images if 'mobile_bytes' in r]
+    original_bytes = sum(r['size'] for r in measured)
+    mobile_bytes = sum(r['mobile_bytes'] for r in measured)
+    desktop_bytes = sum(r['desktop_bytes'] for r in measured)
+    
+    if not images:
+        print_warning("站点中没有响应式图片变体（运行 optimize-images.py 生成）")
+    else:
+        print(f"  有变体的图片: {len(images)} 张，变体文件 {sum(len(r['variants']) for r in images)} 个")
+        if original_bytes:
+            print(f"  原图合计: {format_size(original_bytes)}")
+            print(f"  手机 ({MOBILE_IMAGE_WIDTH}w): {format_size(mobile_bytes)} "
+                  f"(节省 {(1 - mobile_bytes / original_bytes) * 100:.1f}%)")
+            print(f"  桌面 ({DESKTOP_IMAGE_WIDTH}w): {format_size(desktop_bytes)} "
+                  f"(节省 {(1 - desktop_bytes / original_bytes) * 100:.1f}%)")
+        print(f"\n  {Colors.BOLD}节省最多的图片（手机）:{Colors.END}")
+        for record in sorted(measured, key=lambda r: r['size'] - r['mobile_bytes'], reverse=True)[:5]:
+            ladder = ', '.join(sorted({f"{v['width']}w" for v in record['variants']}, key=lambda w: int(w[:-1])))
+            print(f"    {record['path']}: {format_size(record['size'])} -> "
+                  f"{format_size(record['mobile_bytes'])} ({ladder})")
+    if missing:
+        print_warning(f"{len(missing)} 张 PNG/JPEG 没有响应式变体")
+        for path in missing[:5]:
+            print(f"    {path}")
+    
+    return {
+        'mobile_width': MOBILE_IMAGE_WIDTH,
+        'desktop_width': DESKTOP_IMAGE_WIDTH,
+        'original_bytes': original_bytes,
+        'mobile_bytes': mobile_bytes,
+        'desktop_bytes': desktop_bytes,
+        'images': images,
+        'missing': missing
+    }
+
+def generate_performance_report(html_files: List[Dict], resources: Dict,
+                                encodings: List[str] = (BASELINE_ENCODING,),
+                                write_json: bool = True,
+                                duplicates: Optional[Dict] = None,
+                                responsive_images: Optional[Dict] = None) -> Dict:
+    """生成性能报告（write_json=False 时只汇总不写 JSON 文件）"""
     print_header("性能报告生成")
     
     # 计算总体统计
@@ -316,18 +1024,28 @@ def generate_performance_report(html_files: List[Dict], resources: Dict) -> Dict
             'total_js_size': total_js_size,
             'total_img_size': total_img_size,
             'total_font_size': total_font_size,
-            'total_site_size': total_site_size
+            'total_site_size': total_site_size,
+            'transfer_sizes': {
+                'html': encoding_totals(html_files, encodings),
+                'css': encoding_totals(resources['css'], encodings),
+                'js': encoding_totals(resources['js'], encodings)
+            }
         },
         'html_files': html_files,
         'resources': resources
     }
+    if duplicates is not None:
+        report['duplicates'] = duplicates
+    if responsive_images is not None:
+        report['responsive_images'] = responsive_images
     
     # 保存报告
-    report_path = Path('performance-report.json')
-    with open(report_path, 'w', encoding='utf-8') as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
-    
-    print_success(f"性能报告已保存到: {report_path}")
+    if write_json:
+        report_path = REPORT_PATH
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        
+        print_success(f"性能报告已保存到: {report_path}")
     
     # 打印摘要
     print(f"\n{Colors.BOLD}站点总体统计:{Colors.END}")
@@ -341,39 +1059,71 @@ def generate_performance_report(html_files: List[Dict], resources: Dict) -> Dict
     
     return report
 
-def provide_optimization_suggestions(html_files: List[Dict], resources: Dict):
+def record_history(history_path: Path, html_files: List[Dict], resources: Dict):
+    """把本次各页面和资源的大小追加到历史记录"""
+    def records():
+        for f in html_files:
+            values = {'original_size': f['original_size'], 'gzip_size': f['gzip_size']}
+            for name, size in f.get('compressed_sizes', {}).items():
+                values[f'{name}_size'] = size
+            yield f['path'], 'html', values
+        for asset_class in ASSET_CLASSES[1:]:
+            for r in resources[asset_class]:
+                values = {'size': r['size'], 'gzip_size': r.get('gzip_size')}
+                for name, size in r.get('compressed_sizes', {}).items():
+                    values[f'{name}_size'] = size
+                yield r['path'], asset_class, values
+    
+    history = PerformanceHistory(history_path)
+    try:
+        run_id = history.record_run('size', records())
+    finally:
+        history.close()
+    print_success(f"已记录到性能历史: {history_path} (运行 #{run_id})")
+
+def is_over_budget(record: Dict, asset_class: str, budgets: Budgets, encoding: str) -> bool:
+    """页面或资源是否超过其大小预算"""
+    max_size_kb = budgets.limits_for(record['path'], asset_class).get('max_size_kb')
+    if max_size_kb is None:
+        return False
+    size = transfer_size(record, encoding) if asset_class == 'html' else resource_transfer_size(record, encoding)
+    return size > max_size_kb * 1024
+
+def provide_optimization_suggestions(html_files: List[Dict], resources: Dict, budgets: Budgets,
+                                     encoding: str = BASELINE_ENCODING,
+                                     duplicates: Optional[Dict] = None):
     """提供优化建议"""
     print_header("优化建议")
     
     suggestions = []
     
     # 检查大页面
-    large_pages = [f for f in html_files if f['gzip_size'] > 200 * 1024]
+    large_pages = [f for f in html_files if is_over_budget(f, 'html', budgets, encoding)]
     if large_pages:
         suggestions.append({
             'priority': 'HIGH',
             'category': '页面大小',
-            'issue': f'发现 {len(large_pages)} 个页面超过 200KB',
+            'issue': f'发现 {len(large_pages)} 个页面超过大小预算',
             'suggestion': '考虑拆分长页面、延迟加载图片、减少内联资源'
         })
     
     # 检查低压缩率
-    low_compression = [f for f in html_files if f['compression_ratio'] < 70]
+    low_compression = [f for f in html_files if is_low_compression(f, budgets)]
     if low_compression:
         suggestions.append({
             'priority': 'MEDIUM',
             'category': '压缩率',
-            'issue': f'发现 {len(low_compression)} 个页面压缩率低于 70%',
+            'issue': f'发现 {len(low_compression)} 个页面压缩率低于预算',
             'suggestion': '检查是否包含大量不可压缩内容（如 base64 图片）'
         })
     
     # 检查大图片
-    large_images = [r for r in resources['images'] if r['size'] > 200 * 1024]
+    large_images = [r for r in resources['images'] if is_over_budget(r, 'images', budgets, encoding)]
     if large_images:
         suggestions.append({
             'priority': 'HIGH',
             'category': '图片优化',
-            'issue': f'发现 {len(large_images)} 个图片超过 200KB',
+            'issue': f'发现 {len(large_images)} 个图片超过大小预算',
             'suggestion': '使用图片压缩工具、转换为 WebP 格式、实现响应式图片'
         })
     
@@ -395,6 +1145,16 @@ def provide_optimization_suggestions(html_files: List[Dict], resources: Dict):
             'suggestion': '考虑合并 JS 文件、使用代码分割、延迟加载非关键脚本'
         })
     
+    # 检查重复资源
+    if duplicates and (duplicates['exact'] or duplicates['near']):
+        suggestions.append({
+            'priority': 'MEDIUM',
+            'category': '重复资源',
+            'issue': f'{len(duplicates["exact"])} 组完全相同的资源（浪费 {format_size(duplicates["wasted_bytes"])}），'
+                     f'{len(duplicates["near"])} 对共享大段代码的资源',
+            'suggestion': '移除重复副本、合并共享代码到公共文件，或改为引用同一资源'
+        })
+    
     # 打印建议
     if not suggestions:
         print_success("未发现明显的性能问题，站点性能良好！")
@@ -405,8 +1165,148 @@ def provide_optimization_suggestions(html_files: List[Dict], resources: Dict):
             print(f"   问题: {sug['issue']}")
             print(f"   建议: {sug['suggestion']}\n")
 
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='Zephyr RTOS 学习系统 - 性能测试工具'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='并行分析的进程数（默认: 1，0 表示使用全部 CPU 核心）'
+    )
+    parser.add_argument(
+        '--cache',
+        type=Path,
+        default=Path('performance-cache.sqlite'),
+        help='分析结果缓存文件（默认: performance-cache.sqlite）'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='禁用分析结果缓存'
+    )
+    parser.add_argument(
+        '--changed-only',
+        action='store_true',
+        help='只分析相对 HEAD 有变更的页面，并合并到上次的性能报告'
+    )
+    parser.add_argument(
+        '--since',
+        metavar='GIT_REF',
+        help='只分析相对指定 git 引用有变更的页面（隐含 --changed-only）'
+    )
+    parser.add_argument(
+        '--budgets',
+        type=Path,
+        help='性能预算文件（默认: performance-budgets.yml，不存在时使用内置预算）'
+    )
+    parser.add_argument(
+        '--third-party',
+        type=Path,
+        help=f'第三方资源大小清单（默认: {THIRD_PARTY_PATH}）'
+    )
+    parser.add_argument(
+        '--baseline',
+        type=Path,
+        metavar='REPORT',
+        help='基线性能报告；页面或资源增长超过 max_regression_pct 时测试失败'
+    )
+    parser.add_argument(
+        '--format',
+        dest='formats',
+        action='append',
+        choices=['json', 'ndjson', 'junit'],
+        help=f'报告格式，可重复指定（默认: json）。ndjson 边分析边写出到 {NDJSON_REPORT_PATH}，'
+             f'junit 写出到 {JUNIT_REPORT_PATH}'
+    )
+    parser.add_argument(
+        '--history',
+        type=Path,
+        default=HISTORY_PATH,
+        help=f'性能历史数据库（默认: {HISTORY_PATH}）'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='不记录本次运行到性能历史'
+    )
+    parser.add_argument(
+        '--encodings',
+        default=','.join(COMPRESSORS),
+        help=f'要评估的压缩编码，逗号分隔（可用: {", ".join(COMPRESSORS)}；默认全部）'
+    )
+    parser.add_argument(
+        '--budget-encoding',
+        default=BASELINE_ENCODING,
+        help=f'页面大小预算使用的编码（默认: {BASELINE_ENCODING}）'
+    )
+    parser.add_argument(
+        '--cache-max-age',
+        type=float,
+        default=30,
+        help='缓存条目超过多少天未使用即淘汰（默认: 30）'
+    )
+    args = parser.parse_args()
+    
+    encodings = [name.strip() for name in args.encodings.split(',') if name.strip()]
+    unknown = [name for name in encodings + [args.budget_encoding] if name not in COMPRESSORS]
+    if unknown:
+        parser.error(f"不支持的编码: {', '.join(unknown)}（可用: {', '.join(COMPRESSORS)}；"
+                     f"br-11 需要 brotli，zstd-3 需要 zstandard）")
+    # 基准编码和预算编码总是参与评估
+    for name in [BASELINE_ENCODING, args.budget_encoding]:
+        if name not in encodings:
+            encodings.append(name)
+    args.encodings = encodings
+    if args.since:
+        args.changed_only = True
+    args.formats = args.formats or ['json']
+    if args.baseline and not args.baseline.exists():
+        parser.error(f"基线报告不存在: {args.baseline}")
+    return args
+
+def load_incremental_plan(args: argparse.Namespace) -> Optional[Tuple[Dict, List[str], List[str]]]:
+    """
+    增量模式：确定需要重新分析的页面
+
+    返回 (上次报告, 变更页面, 删除页面)；无法增量分析时返回 None（回退到全量分析）。
+    """
+    if not REPORT_PATH.exists():
+        print_warning(f"未找到上次的报告 {REPORT_PATH}，执行全量分析")
+        return None
+    
+    plan = changed_site_pages(args.since)
+    if plan is None:
+        print_warning("配置、主题或静态资源有变更，执行全量分析")
+        return None
+    
+    with open(REPORT_PATH, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    changed, removed = plan
+    print(f"增量模式: 相对 {args.since or 'HEAD'} 有 {len(changed)} 个页面变更，{len(removed)} 个页面删除")
+    for page in changed:
+        print(f"  ~ {page}")
+    for page in removed:
+        print(f"  - {page}")
+    print()
+    return previous, changed, removed
+
+def merge_html_results(previous: List[Dict], updated: List[Dict], removed: List[str]) -> List[Dict]:
+    """把重新分析的页面合并到上次的结果中（按路径排序）"""
+    merged = {Path(f['path']).as_posix(): f for f in previous}
+    for page in removed:
+        merged.pop(page, None)
+    for f in updated:
+        merged[Path(f['path']).as_posix()] = f
+    return [merged[path] for path in sorted(merged)]
+
 def main():
     """主函数"""
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
     print(f"{Colors.BOLD}{Colors.BLUE}")
     print("=" * 80)
     print("Zephyr RTOS 学习系统 - 性能测试工具".center(80))
@@ -419,10 +1319,37 @@ def main():
         print_error("错误: site 目录不存在，请先运行 'mkdocs build' 构建站点")
         sys.exit(1)
     
-    # 扫描 HTML 文件
-    print("正在扫描 HTML 文件...")
-    html_files = scan_html_files(site_dir)
-    print_success(f"找到 {len(html_files)} 个 HTML 文件\n")
+    cache = None
+    if not args.no_cache:
+        cache = AnalysisCache(args.cache, args.cache_max_age, args.encodings)
+    
+    budgets = Budgets.load(args.budgets)
+    plan = load_incremental_plan(args) if args.changed_only else None
+    
+    # 流式报告：记录在分析完成时立即写出
+    ndjson = NdjsonWriter(NDJSON_REPORT_PATH) if 'ndjson' in args.formats else None
+    junit = JUnitWriter(JUNIT_REPORT_PATH, 'performance') if 'junit' in args.formats else None
+    
+    if plan is not None:
+        # 增量模式：只分析变更页面，静态资源沿用上次报告
+        previous, changed, removed = plan
+        inventory = SiteInventory.from_paths(site_dir, changed)
+        print(f"正在分析变更的 HTML 文件（{jobs} 个进程）...")
+        updated = scan_html_files(inventory, jobs, cache, args.encodings)
+        html_files = merge_html_results(previous['html_files'], updated, removed)
+        print_success(f"已合并 {len(updated)} 个页面，报告共 {len(html_files)} 个 HTML 文件\n")
+        if ndjson:
+            for file_info in html_files:
+                ndjson.write('html', file_info)
+    else:
+        # 建立站点文件清单（单次遍历）
+        inventory = SiteInventory.scan(site_dir)
+        print_success(f"站点清单: {len(inventory)} 个文件\n")
+        
+        # 扫描 HTML 文件
+        print(f"正在扫描 HTML 文件（{jobs} 个进程）...")
+        html_files = scan_html_files(inventory, jobs, cache, args.encodings, ndjson)
+        print_success(f"找到 {len(html_files)} 个 HTML 文件\n")
     
     # 运行测试
     total_passed = 0
@@ -430,28 +1357,79 @@ def main():
     total_warnings = 0
     
     # 测试页面大小
-    passed, failed, warnings = test_page_sizes(html_files)
+    passed, failed, warnings = test_page_sizes(html_files, budgets, args.budget_encoding, junit)
     total_passed += passed
     total_failed += failed
     total_warnings += warnings
     
     # 测试压缩率
-    passed, failed, warnings = test_compression_ratio(html_files)
+    passed, failed, warnings = test_compression_ratio(html_files, budgets, junit)
     total_passed += passed
     total_failed += failed
     total_warnings += warnings
     
     # 分析静态资源
-    resources = analyze_static_resources(site_dir)
+    if plan is not None:
+        resources = plan[0]['resources']
+        print_success("静态资源未变更，沿用上次报告中的资源统计")
+        if ndjson:
+            for category in ASSET_CLASSES[1:]:
+                for resource in resources[category]:
+                    ndjson.write(category, resource)
+    else:
+        resources = analyze_static_resources(inventory, jobs, cache, args.encodings, ndjson)
+    
+    # 重复资源检测（增量模式下静态资源未变，沿用上次结果）
+    if plan is not None:
+        duplicates = plan[0].get('duplicates')
+    else:
+        duplicates = analyze_duplicates(inventory, jobs)
+    
+    # 响应式图片变体（索引很小，增量模式下也重新读取）
+    responsive_images = analyze_responsive_images(site_dir, resources)
+    
+    # 每个页面的总字节（资源引用图）
+    analyze_page_weights(html_files, resources, site_dir, args.budget_encoding,
+                         ThirdPartyManifest.load(args.third_party))
+    
+    # 测试静态资源预算
+    passed, failed, warnings = test_resource_budgets(resources, budgets, args.budget_encoding, junit)
+    total_passed += passed
+    total_failed += failed
+    total_warnings += warnings
+    
+    # 与基线比较
+    if args.baseline:
+        passed, failed, warnings = test_regressions(
+            html_files, resources, args.baseline, budgets, args.budget_encoding, junit
+        )
+        total_passed += passed
+        total_failed += failed
+        total_warnings += warnings
     
     # 生成性能报告
-    report = generate_performance_report(html_files, resources)
+    report = generate_performance_report(
+        html_files, resources, args.encodings, 'json' in args.formats, duplicates, responsive_images
+    )
+    if ndjson:
+        ndjson.write('summary', report['summary'])
+        ndjson.close()
+        print_success(f"NDJSON 报告已保存到: {NDJSON_REPORT_PATH} ({ndjson.count} 条记录)")
+    if junit:
+        junit.close()
+        print_success(f"JUnit 报告已保存到: {JUNIT_REPORT_PATH} ({junit.count} 个用例, {junit.failures} 个失败)")
+    if not args.no_history:
+        record_history(args.history, html_files, resources)
     
     # 提供优化建议
-    provide_optimization_suggestions(html_files, resources)
+    provide_optimization_suggestions(html_files, resources, budgets, args.budget_encoding, duplicates)
     
     # 打印测试总结
     print_header("测试总结")
+    if cache is not None:
+        cache.close()
+        cache.print_summary()
+        print()
     print(f"通过: {Colors.GREEN}{total_passed}{Colors.END}")
     print(f"失败: {Colors.RED}{total_failed}{Colors.END}")
     print(f"警告: {Colors.YELLOW}{total_warnings}{Colors.END}")
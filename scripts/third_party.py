@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+第三方资源大小清单
+外部资源（CDN 脚本、字体等）不在 site/ 中，其大小取自清单文件
+third-party-sizes.yml：直接给出大小，或指向仓库中的本地副本（vendored）
+
+供 test-performance.py 和 measure-load-time.py 使用。
+"""
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import yaml
+
+from compression import IDENTITY, file_compressed_size, is_compressible
+
+# 默认清单文件
+THIRD_PARTY_PATH = Path('third-party-sizes.yml')
+
+
+def origin_of(url: str) -> str:
+    """URL 的源（scheme://host[:port]）"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ThirdPartyManifest:
+    """
+    外部资源的原始大小和传输大小
+
+    条目可以给出 size / transfer_size（字节），或 vendored 指向本地副本，
+    副本按指定编码计算传输大小。清单中没有的资源大小未知。
+    """
+
+    def __init__(self, resources: Optional[Dict[str, Dict]] = None, base_dir: Path = Path('.')):
+        self.resources = resources or {}
+        self.base_dir = base_dir
+        for url, entry in self.resources.items():
+            if 'size' not in entry and 'vendored' not in entry:
+                raise ValueError(f"第三方资源 {url} 缺少 size 或 vendored")
+        self._memo: Dict[Tuple[str, str], Optional[Tuple[int, int]]] = {}
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> 'ThirdPartyManifest':
+        """读取清单文件；未指定时使用默认路径，文件不存在时清单为空"""
+        path = path or THIRD_PARTY_PATH
+        if not path.exists():
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        return cls(config.get('resources'), path.parent)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.resources
+
+    def sizes(self, url: str, encoding: str = IDENTITY) -> Optional[Tuple[int, int]]:
+        """(原始大小, 传输大小)；清单中没有时返回 None（记忆化）"""
+        key = (url, encoding)
+        if key not in self._memo:
+            entry = self.resources.get(url)
+            if entry is None:
+                self._memo[key] = None
+            elif 'vendored' in entry:
+                local = self.base_dir / entry['vendored']
+                size = local.stat().st_size
+                if encoding != IDENTITY and is_compressible(local.name):
+                    self._memo[key] = (size, file_compressed_size(local, encoding))
+                else:
+                    self._memo[key] = (size, size)
+            else:
+                size = entry['size']
+                transfer = size if encoding == IDENTITY else entry.get('transfer_size', size)
+                self._memo[key] = (size, transfer)
+        return self._memo[key]
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+限速 HTTP 服务器
+用 asyncio 提供 site/ 目录，按 NetworkConditions 注入延迟和限制带宽，
+供 measure-real-load.py 在本机实测页面加载（无需浏览器和外网）
+
+- 新连接在 handshake_rtts 个 RTT 后才开始处理请求（模拟 TCP + TLS 握手）
+- 每个请求的响应头在收到请求 1 个 RTT 后发出（请求和响应的传播延迟）
+- 响应体按令牌桶限速：默认所有连接共享一条链路（与 network_sim 的带宽模型一致），
+  也可以每个连接单独限速
+- 按 Accept-Encoding 协商 gzip / br / zstd 压缩（只压缩文本类型），压缩结果按文件缓存
+- 只实现 HTTP/1.1（keep-alive），GET / HEAD
+"""
+
+import asyncio
+import mimetypes
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from compression import CONTENT_ENCODINGS, IDENTITY, compress, is_compressible
+from network_sim import NetworkConditions
+
+# 响应体按块发送；块越小，多个连接共享链路时越接近平分带宽
+SEND_CHUNK = 4 * 1024
+
+# 请求头的最大长度
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class Link:
+    """
+    令牌桶限速链路
+
+    每个数据块按到达顺序预约发送时间（上一块预约结束或当前时间，取较晚者），
+    多个连接交替预约，近似平分带宽。
+    """
+
+    def __init__(self, bandwidth_bps: float):
+        self.bandwidth_bps = bandwidth_bps
+        self._next_free = 0.0
+
+    async def send(self, nbytes: int):
+        """等待 nbytes 字节的发送时间"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self._next_free = max(now, self._next_free) + nbytes / self.bandwidth_bps
+        await asyncio.sleep(self._next_free - now)
+
+
+class ThrottledServer:
+    """
+    限速静态文件服务器
+
+    encodings 为服务器支持的压缩编码（如 ['gzip-6', 'br-11']），按顺序取第一个
+    客户端接受的；为空时不压缩。shared_link=False 时每个连接单独限速。
+    """
+
+    def __init__(self, site_dir: Path, conditions: NetworkConditions = NetworkConditions(),
+                 encodings: List[str] = (), shared_link: bool = True):
+        self.site_dir = site_dir.resolve()
+        self.conditions = conditions
+        self.encodings = [e for e in encodings if e != IDENTITY]
+        self.shared_link = shared_link
+        self.link = Link(conditions.bandwidth_bps)
+        self.stats = {'connections': 0, 'requests': 0, 'bytes_sent': 0}
+        self._bodies: Dict[Tuple[Path, str], bytes] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        """开始监听，返回实际端口（port=0 时由系统分配）"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def resolve(self, target: str) -> Optional[Path]:
+        """请求路径 -> site/ 中的文件；目录取 index.html，越出 site/ 或不存在时返回 None"""
+        path = unquote(urlsplit(target).path).lstrip('/')
+        file_path = (self.site_dir / path).resolve()
+        if file_path != self.site_dir and self.site_dir not in file_path.parents:
+            return None
+        if file_path.is_dir():
+            file_path = file_path / 'index.html'
+        return file_path if file_path.is_file() else None
+
+    def negotiate(self, file_path: Path, accept_encoding: str) -> str:
+        """选择响应的压缩编码"""
+        if not is_compressible(file_path.name):
+            return IDENTITY
+        accepted = {token.split(';')[0].strip().lower() for token in accept_encoding.split(',')}
+        for encoding in self.encodings:
+            if CONTENT_ENCODINGS[encoding] in accepted:
+                return encoding
+        return IDENTITY
+
+    def body(self, file_path: Path, encoding: str) -> bytes:
+        """响应体（压缩结果按文件和编码缓存）"""
+        key = (file_path, encoding)
+        if key not in self._bodies:
+            self._bodies[key] = compress(file_path.read_bytes(), encoding)
+        return self._bodies[key]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        c = self.conditions
+        ready = loop.time() + c.handshake_rtts * c.rtt_s
+        link = self.link if self.shared_link else Link(c.bandwidth_bps)
+        self.stats['connections'] += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if len(head) > MAX_HEADER_BYTES:
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split()
+                if len(parts) != 3:
+                    break
+                method, target, _ = parts
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+
+                # 连接建立（握手）之后，再经 1 个 RTT 到达首字节
+                arrival = loop.time()
+                await asyncio.sleep(max(arrival, ready) + c.rtt_s - arrival)
+
+                status, body, extra = self._respond(method, target, headers)
+                response_head = [f'HTTP/1.1 {status}', f'Content-Length: {len(body)}',
+                                 'Cache-Control: no-store'] + extra
+                writer.write(('\r\n'.join(response_head) + '\r\n\r\n').encode('latin-1'))
+                await writer.drain()
+                if method != 'HEAD':
+                    for start in range(0, len(body), SEND_CHUNK):
+                        chunk = body[start:start + SEND_CHUNK]
+                        await link.send(len(chunk))
+                        writer.write(chunk)
+                        await writer.drain()
+                    self.stats['bytes_sent'] += len(body)
+                self.stats['requests'] += 1
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[str, bytes, List[str]]:
+        """返回 (状态行, 响应体, 额外响应头)"""
+        if method not in ('GET', 'HEAD'):
+            return '405 Method Not Allowed', b'', ['Allow: GET, HEAD']
+        file_path = self.resolve(target)
+        if file_path is None:
+            return '404 Not Found', b'', []
+        encoding = self.negotiate(file_path, headers.get('accept-encoding', ''))
+        content_type = mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream'
+        extra = [f'Content-Type: {content_type}', 'Vary: Accept-Encoding']
+        if encoding != IDENTITY:
+            extra.append(f'Content-Encoding: {CONTENT_ENCODINGS[encoding]}')
+        return '200 OK', self.body(file_path, encoding), extra